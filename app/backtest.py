@@ -0,0 +1,128 @@
+import itertools
+import numpy as np
+import pandas as pd
+from app.config import get_config
+from app.devig import Devigger
+from app.engine import edge_and_ev, kelly_fractions
+from app.modeling.metrics import match_outcomes
+from app.modeling.selector import ModelSelector
+from app.modeling.validation import walk_forward_splits
+
+
+PRICE_COLUMNS = ["home_odds", "draw_odds", "away_odds"]
+
+
+class Backtester:
+    """Replays historical results against their stored closing prices.
+    
+    Model probabilities are produced walk-forward (each block of matches
+    is priced by a model fitted only on earlier blocks), then the scanner's
+    devig, edge, EV and fractional-Kelly rules are applied to a whole grid
+    of (min_edge, kelly_fraction, kelly_cap) settings at once. Bets on the
+    same day are staked from that morning's bankroll, so each bankroll path
+    is a cumulative product over days.
+    """
+    
+    def __init__(self, selector=None, devigger=None):
+        self.config = get_config()
+        self.selector = selector or ModelSelector()
+        self.devigger = devigger or Devigger()
+    
+    def walk_forward(self, sport, leagues, folds=10, model_type=None):
+        """Results of ``leagues`` in date order with out-of-sample model probabilities.
+        
+        Matches in the first block, which no model has been fitted before,
+        get NaN probabilities and are never bet on.
+        """
+        frames = []
+        for league in leagues:
+            df = self.selector.load_results(sport, league)
+            if len(df) == 0:
+                continue
+            df = df.sort_values('match_date', kind='stable').reset_index(drop=True)
+            league_model = model_type or self.selector.model_type_for(sport, league)
+            
+            probs = np.full((len(df), 3), np.nan)
+            for train_rows, test_rows in walk_forward_splits(len(df), folds):
+                model = self.selector.new_model(league_model)
+                model.fit(df.iloc[train_rows])
+                test = df.iloc[test_rows]
+                probs[test_rows] = model.predict_probs_batch(test['home_id'].to_numpy(), test['away_id'].to_numpy())
+            frames.append(df.assign(prob_home=probs[:, 0], prob_draw=probs[:, 1], prob_away=probs[:, 2]))
+        
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames).sort_values('match_date', kind='stable').reset_index(drop=True)
+    
+    def simulate(self, results, min_edges, kelly_fractions_grid, kelly_caps, bankroll=None, chunk_size=None):
+        """Bankroll outcome of every grid configuration over ``results``.
+        
+        Returns one row per (min_edge_pct, kelly_fraction, kelly_cap) with
+        final bankroll, ROI on turnover, bet count, hit rate and maximum
+        drawdown, best final bankroll first.
+        """
+        if bankroll is None:
+            bankroll = self.config.betting.bankroll
+        grid = np.array(list(itertools.product(min_edges, kelly_fractions_grid, kelly_caps)), dtype=float)
+        
+        prices = results[PRICE_COLUMNS].to_numpy(dtype=float)
+        model_probs = results[["prob_home", "prob_draw", "prob_away"]].to_numpy(dtype=float)
+        market_probs, _ = self.devigger.devig_prices(prices)
+        edge_pct, ev = edge_and_ev(model_probs, prices, market_probs)
+        valid = ~np.isnan(model_probs) & ~np.isnan(prices) & ~np.isnan(market_probs)
+        candidates = valid & (ev > self.config.filters.min_ev)
+        
+        # Return per unit staked on each outcome
+        won = np.zeros(prices.shape, dtype=bool)
+        won[np.arange(len(results)), match_outcomes(results['home_score'], results['away_score'])] = True
+        returns = np.where(won, prices - 1, -1.0)
+        returns = np.where(candidates, returns, 0.0)
+        
+        # Matches are date-sorted; reduceat sums each day's bets
+        days = results['match_date'].dt.tz_convert(None).dt.floor('D').to_numpy()
+        day_starts = np.flatnonzero(np.concatenate([[True], days[1:] != days[:-1]])[:len(days)])
+        
+        # Bound the (configs x matches x outcomes) temporaries
+        if chunk_size is None:
+            chunk_size = max(1, 4_000_000 // max(1, prices.size))
+        rows = []
+        for start in range(0, len(grid), chunk_size):
+            rows.append(self._simulate_chunk(
+                grid[start:start + chunk_size], model_probs, prices, edge_pct, candidates,
+                returns, won, day_starts, bankroll
+            ))
+        summary = pd.DataFrame(
+            np.concatenate(rows) if rows else np.empty((0, 8)),
+            columns=["min_edge_pct", "kelly_fraction", "kelly_cap", "final_bankroll",
+                     "roi", "bets", "hit_rate", "max_drawdown"]
+        )
+        summary["bets"] = summary["bets"].astype(int)
+        return summary.sort_values("final_bankroll", ascending=False).reset_index(drop=True)
+    
+    def _simulate_chunk(self, grid, model_probs, prices, edge_pct, candidates, returns, won, day_starts, bankroll):
+        min_edge = grid[:, 0, None, None]
+        mask = candidates & (edge_pct >= min_edge)
+        fractions = kelly_fractions(model_probs, prices, grid[:, 1, None, None], grid[:, 2, None, None])
+        fractions = np.where(mask, fractions, 0.0)
+        
+        match_growth = (fractions * returns).sum(axis=2)
+        match_staked = fractions.sum(axis=2)
+        if len(day_starts):
+            day_growth = np.add.reduceat(match_growth, day_starts, axis=1)
+            day_staked = np.add.reduceat(match_staked, day_starts, axis=1)
+        else:
+            day_growth = day_staked = np.zeros((len(grid), 0))
+        
+        # A day that loses more than the bankroll is ruin; zero stays zero
+        growth = np.cumprod(np.maximum(1 + day_growth, 0.0), axis=1)
+        equity = bankroll * np.concatenate([np.ones((len(grid), 1)), growth], axis=1)
+        final = equity[:, -1]
+        turnover = (equity[:, :-1] * day_staked).sum(axis=1)
+        drawdown = (1 - equity / np.maximum.accumulate(equity, axis=1)).max(axis=1)
+        
+        bets = mask.sum(axis=(1, 2))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            roi = np.where(turnover > 0, (final - bankroll) / turnover, 0.0)
+            hit_rate = np.where(bets > 0, (mask & won).sum(axis=(1, 2)) / bets, 0.0)
+        
+        return np.column_stack([grid, final, roi, bets, hit_rate, drawdown])
@@ -1,68 +1,281 @@
 import asyncio
+from datetime import datetime
+from typing import Optional
 import typer
 from rich.console import Console
 from rich.table import Table
+from app.backtest import Backtester
+from app.config import get_config
+from app.models import Sport
+from app.modeling.evaluation import ModelEvaluator
+from app.modeling.selector import ModelSelector
+from app.modeling.soccer import MODEL_TYPES
+from app.providers.manager import ProviderManager
+from app.providers.recording import ReplayProvider, ResponseRecorder
 from app.scanner import ValueBetScanner
+from app.snapshots import OddsSnapshotStore
 
 app = typer.Typer()
 console = Console()
 
 
+RECORD_HELP = "Append raw provider responses to this JSON-lines file"
+REPLAY_HELP = "Serve provider responses from a recording instead of the API"
+SPEED_HELP = "Replay speed multiplier (0 = as fast as possible)"
+
+
 @app.command()
-def scan():
+def scan(
+    record: Optional[str] = typer.Option(None, help=RECORD_HELP),
+    replay: Optional[str] = typer.Option(None, help=REPLAY_HELP),
+    speed: float = typer.Option(0.0, help=SPEED_HELP),
+    max_age: Optional[int] = typer.Option(
+        None, help="Serve cached provider responses up to this many seconds old"
+    )
+):
     """Scan for value bets"""
     console = Console()
     console.print("\n[bold cyan]Starting value bet scan...[/bold cyan]\n")
     
-    scanner = ValueBetScanner()
+    scanner = _build_scanner(record, replay, speed, max_age)
+    value_bets = asyncio.run(_run_and_close(scanner, scanner.scan()))
+    
+    if not value_bets:
+        console.print("[yellow]No value bets found.[/yellow]")
+        return
+    
+    console.print(f"\n[bold green]Found {len(value_bets)} value bets![/bold green]\n")
+    console.print(_value_bet_table(value_bets[:20]))
+    scanner.export_to_csv(value_bets)
+
+
+@app.command()
+def watch(
+    interval: Optional[int] = typer.Option(
+        None, help="Seconds between polls (defaults to providers.refresh_interval_seconds)"
+    ),
+    record: Optional[str] = typer.Option(None, help=RECORD_HELP),
+    replay: Optional[str] = typer.Option(None, help=REPLAY_HELP),
+    speed: float = typer.Option(1.0, help=SPEED_HELP)
+):
+    """Keep scanning and stream new or changed value bets"""
+    console.print("\n[bold cyan]Watching for value bets (Ctrl+C to stop)...[/bold cyan]\n")
     
+    scanner = _build_scanner(record, replay, speed)
+    if replay:
+        # The recording's own timestamps pace the cycles
+        interval = 0
     try:
-        # Run the async scan
-        value_bets = asyncio.run(scanner.scan())
-        
-        if not value_bets:
-            console.print("[yellow]No value bets found.[/yellow]")
-            return
-        
-        console.print(f"\n[bold green]Found {len(value_bets)} value bets![/bold green]\n")
-        
-        table = Table(show_header=True, header_style="bold magenta")
-        table.add_column("League")
-        table.add_column("Match")
-        table.add_column("Time")
-        table.add_column("Book")
-        table.add_column("Outcome")
-        table.add_column("Odds", justify="right")
-        table.add_column("Edge %", justify="right")
-        table.add_column("EV", justify="right")
-        table.add_column("Kelly $", justify="right")
-        
-        for bet in value_bets[:20]:
-            match_str = f"{bet.home_team} vs {bet.away_team}"
-            time_str = bet.start_time_local.strftime("%m/%d %H:%M")
+        asyncio.run(_run_and_close(scanner, _stream_value_bets(scanner, interval)))
+    except KeyboardInterrupt:
+        console.print("\n[yellow]Stopped watching.[/yellow]")
+
+
+@app.command("select-models")
+def select_models(
+    league: Optional[list[str]] = typer.Option(
+        None, help="League to evaluate (repeatable; defaults to leagues.soccer)"
+    )
+):
+    """Cross-validate the configured models and cache the best one per league"""
+    config = get_config()
+    leagues = league or config.leagues.soccer
+    console.print(f"\n[bold cyan]Selecting models for {len(leagues)} league(s)...[/bold cyan]\n")
+    
+    winners = ModelSelector().select_models(Sport.SOCCER, leagues)
+    if not winners:
+        console.print("[yellow]Not enough historical results to cross-validate.[/yellow]")
+        return
+    
+    table = Table(show_header=True, header_style="bold magenta")
+    table.add_column("League")
+    table.add_column("Model")
+    table.add_column("Log loss", justify="right")
+    table.add_column("Brier", justify="right")
+    table.add_column("Test games", justify="right")
+    for league_name, (winner, scores) in winners.items():
+        for model_type, score in sorted(scores.items(), key=lambda item: item[1]["log_loss"]):
+            name = f"[bold green]{model_type}[/bold green]" if model_type == winner else model_type
             table.add_row(
-                bet.league,
-                match_str,
-                time_str,
-                bet.bookmaker,
-                bet.outcome.value,
-                f"{bet.price_decimal:.2f}",
-                f"{bet.edge_pct:.1f}%",
-                f"{bet.ev:.3f}",
-                f"${bet.kelly_stake:.0f}"
+                league_name,
+                name,
+                f"{score['log_loss']:.4f}",
+                f"{score['brier']:.4f}",
+                str(score["n"])
             )
-        
-        console.print(table)
-        scanner.export_to_csv(value_bets)
+    console.print(table)
+
+
+@app.command()
+def backtest(
+    league: Optional[list[str]] = typer.Option(
+        None, help="League to replay (repeatable; defaults to leagues.soccer)"
+    ),
+    model: Optional[str] = typer.Option(
+        None, help="Model type to use (defaults to each league's selected model)"
+    ),
+    folds: int = typer.Option(10, help="Walk-forward refits across the history"),
+    min_edge: Optional[list[float]] = typer.Option(None, help="Minimum edge % to bet (repeatable grid axis)"),
+    kelly_fraction: Optional[list[float]] = typer.Option(None, help="Kelly multiplier (repeatable grid axis)"),
+    kelly_cap: Optional[list[float]] = typer.Option(None, help="Largest stake as a share of bankroll (repeatable grid axis)"),
+    top: int = typer.Option(20, help="Configurations to show"),
+    output: Optional[str] = typer.Option(None, help="Write every configuration's results to this CSV file")
+):
+    """Replay historical closing prices and simulate bankrolls over a parameter grid"""
+    config = get_config()
+    leagues = league or config.leagues.soccer
+    if model is not None and model not in MODEL_TYPES:
+        console.print(f"[red]Unknown model {model}; choose from {', '.join(MODEL_TYPES)}[/red]")
+        raise typer.Exit(1)
+    
+    backtester = Backtester()
+    results = backtester.walk_forward(Sport.SOCCER, leagues, folds=folds, model_type=model)
+    if len(results) == 0:
+        console.print("[yellow]No historical results to replay.[/yellow]")
+        return
+    
+    summary = backtester.simulate(
+        results,
+        min_edge or [config.filters.min_edge_pct],
+        kelly_fraction or [config.betting.kelly_fraction],
+        kelly_cap or [config.betting.kelly_cap]
+    )
+    console.print(
+        f"\n[bold green]Replayed {len(results)} matches across {len(summary)} configurations[/bold green]\n"
+    )
+    
+    table = Table(show_header=True, header_style="bold magenta")
+    for column in ("Min edge %", "Kelly x", "Cap", "Final $", "ROI", "Bets", "Hit %", "Max DD"):
+        table.add_column(column, justify="right")
+    for row in summary.head(top).itertuples():
+        table.add_row(
+            f"{row.min_edge_pct:g}",
+            f"{row.kelly_fraction:g}",
+            f"{row.kelly_cap:g}",
+            f"${row.final_bankroll:,.0f}",
+            f"{row.roi:.1%}",
+            str(row.bets),
+            f"{row.hit_rate:.1%}",
+            f"{row.max_drawdown:.1%}"
+        )
+    console.print(table)
+    
+    if output:
+        summary.to_csv(output, index=False)
+        console.print(f"\nWrote {len(summary)} configurations to {output}")
+
+
+@app.command()
+def evaluate(
+    holdout_days: int = typer.Option(365, help="Score each model on this many most recent days of results"),
+    save: bool = typer.Option(True, help="Store the scores in the model_performance table")
+):
+    """Score every cached model on held-out historical results"""
+    console.print("\n[bold cyan]Evaluating cached models...[/bold cyan]\n")
+    performances = ModelEvaluator(holdout_days=holdout_days).evaluate_cached(save=save)
+    if not performances:
+        console.print("[yellow]No cached models with held-out results to score.[/yellow]")
+        return
+    
+    table = Table(show_header=True, header_style="bold magenta")
+    table.add_column("Sport")
+    table.add_column("League")
+    table.add_column("Model")
+    for column in ("Log loss", "Brier", "Accuracy", "Calibration", "Games"):
+        table.add_column(column, justify="right")
+    for performance in performances:
+        table.add_row(
+            performance.sport.value,
+            performance.league or "all",
+            performance.model_name,
+            f"{performance.log_loss:.4f}",
+            f"{performance.brier_score:.4f}",
+            f"{performance.accuracy:.1%}",
+            f"{performance.calibration_error:.4f}",
+            str(performance.num_predictions)
+        )
+    console.print(table)
+
+
+@app.command()
+def compact_odds(
+    retention_days: Optional[int] = typer.Option(None, help="Drop snapshot days older than this"),
+    older_than_days: Optional[int] = typer.Option(None, help="Thin snapshot days older than this"),
+    interval_minutes: Optional[int] = typer.Option(None, help="Keep one price per this many minutes when thinning")
+):
+    """Apply odds snapshot retention and compaction"""
+    store = OddsSnapshotStore()
+    pruned = store.prune(retention_days)
+    removed = store.compact(older_than_days, interval_minutes)
+    console.print(
+        f"Dropped {pruned['dropped_tables']} snapshot days and {pruned['deleted_latest']} expired latest prices; "
+        f"compaction removed {removed} snapshot rows"
+    )
+
+
+def _build_scanner(record=None, replay=None, speed=1.0, max_age=None):
+    provider_manager = None
+    if replay:
+        provider_manager = ProviderManager([ReplayProvider(replay, speed=speed)])
+    scanner = ValueBetScanner(provider_manager)
+    if record:
+        recorder = ResponseRecorder(record)
+        for provider in scanner.provider_manager.providers:
+            provider.recorder = recorder
+    if max_age is not None:
+        for provider in scanner.provider_manager.providers:
+            provider.cache_max_age = max_age
+    return scanner
+
+
+async def _run_and_close(scanner, coro):
+    # Close on the loop that ran the scan so the HTTP clients shut down cleanly
+    try:
+        return await coro
     finally:
-        # Create a new event loop for cleanup since the old one is closed
-        try:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            loop.run_until_complete(scanner.close())
-            loop.close()
-        except:
-            pass  # Ignore cleanup errors
+        await scanner.close()
+
+
+async def _stream_value_bets(scanner, interval):
+    async for value_bets in scanner.watch(interval):
+        stamp = datetime.now().strftime("%H:%M:%S")
+        stats = scanner.predictions.stats()
+        cache_str = f"{stats['entries']} cached predictions, {stats['hit_rate']:.0%} hit rate"
+        if not value_bets:
+            console.print(f"[dim]{stamp} no new or changed value bets ({cache_str})[/dim]")
+            continue
+        console.print(f"\n[bold green]{stamp} {len(value_bets)} new or changed value bets[/bold green]")
+        console.print(_value_bet_table(value_bets))
+        console.print(f"[dim]{cache_str}[/dim]")
+
+
+def _value_bet_table(value_bets):
+    table = Table(show_header=True, header_style="bold magenta")
+    table.add_column("League")
+    table.add_column("Match")
+    table.add_column("Time")
+    table.add_column("Book")
+    table.add_column("Outcome")
+    table.add_column("Odds", justify="right")
+    table.add_column("Edge %", justify="right")
+    table.add_column("EV", justify="right")
+    table.add_column("Kelly $", justify="right")
+    
+    for bet in value_bets:
+        match_str = f"{bet.home_team} vs {bet.away_team}"
+        time_str = bet.start_time_local.strftime("%m/%d %H:%M")
+        table.add_row(
+            bet.league,
+            match_str,
+            time_str,
+            bet.bookmaker,
+            bet.outcome.value,
+            f"{bet.price_decimal:.2f}",
+            f"{bet.edge_pct:.1f}%",
+            f"{bet.ev:.3f}",
+            f"${bet.kelly_stake:.0f}"
+        )
+    return table
 
 
 @app.command()
@@ -1,5 +1,6 @@
 import tomllib
 from pathlib import Path
+from typing import Optional
 from pydantic import BaseModel, Field
 from pydantic_settings import BaseSettings
 
@@ -32,6 +33,11 @@ class LeaguesConfig(BaseModel):
 class ProviderSettings(BaseModel):
     enabled: bool = True
     base_url: str = ""
+    class_path: str = ""
+    timeout_seconds: Optional[float] = 30.0
+    hedge_after_seconds: Optional[float] = None
+    failure_threshold: int = 3
+    cooldown_seconds: float = 60.0
 
 
 class ProvidersConfig(BaseModel):
@@ -39,20 +45,63 @@ class ProvidersConfig(BaseModel):
     refresh_interval_seconds: int = 300
     request_timeout_seconds: int = 10
     max_retries: int = 3
+    max_concurrent_requests: int = 4
+    retry_backoff_seconds: float = 0.5
+    retry_backoff_max_seconds: float = 8.0
+    parser: str = "objects"
+    quota_scheduling: bool = True
+    monthly_request_budget: Optional[int] = None
+    quota_reserve: int = 10
+    imminent_kickoff_hours: float = 6.0
+    max_refresh_interval_seconds: int = 3600
+    response_cache: bool = True
+    response_cache_ttl_seconds: int = 60
+    response_cache_league_ttls: dict[str, int] = Field(default_factory=dict)
+    response_cache_max_mb: float = 50.0
     the_odds_api: ProviderSettings = Field(default_factory=ProviderSettings)
+    sources: dict[str, ProviderSettings] = Field(default_factory=dict)
+
+    def provider_settings(self):
+        return {"the_odds_api": self.the_odds_api, **self.sources}
 
 
 class ModelingConfig(BaseModel):
     soccer_models: list[str] = Field(default_factory=list)
     cv_folds: int = 5
+    cv_workers: Optional[int] = None
     min_historical_games: int = 100
     model_cache_days: int = 7
+    model_lru_size: int = 16
+    prediction_cache_size: int = 10000
+    dixon_coles_decay: float = 0.0018
+
+
+class TeamsConfig(BaseModel):
+    fuzzy_matching: bool = True
+    fuzzy_threshold: float = 0.6
+    fuzzy_margin: float = 0.05
 
 
 class DevigConfig(BaseModel):
     method: str = "multiplicative"
 
 
+class DatabaseConfig(BaseModel):
+    batch_size: int = 1000
+    journal_mode: str = "wal"
+    synchronous: str = "normal"
+    cache_size_kb: int = 65536
+    busy_timeout_ms: int = 5000
+    read_pool_size: int = 4
+    odds_snapshots: bool = True
+    writer_queue_size: int = 64
+    writer_flush_seconds: float = 1.0
+    writer_retry_seconds: float = 0.5
+    snapshot_retention_days: int = 90
+    snapshot_compact_after_days: int = 7
+    snapshot_compact_minutes: int = 15
+
+
 class Config(BaseSettings):
     general: GeneralConfig = Field(default_factory=GeneralConfig)
     filters: FilterConfig = Field(default_factory=FilterConfig)
@@ -61,6 +110,8 @@ class Config(BaseSettings):
     providers: ProvidersConfig = Field(default_factory=ProvidersConfig)
     modeling: ModelingConfig = Field(default_factory=ModelingConfig)
     devig: DevigConfig = Field(default_factory=DevigConfig)
+    teams: TeamsConfig = Field(default_factory=TeamsConfig)
+    database: DatabaseConfig = Field(default_factory=DatabaseConfig)
 
     @classmethod
     def load(cls, config_path: str = "config.toml"):
@@ -1,9 +1,73 @@
+import queue
 import sqlite3
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
 import pandas as pd
+from pydantic import ValidationError
 from app.config import get_config
 from app.models import RawOdds, HistoricalResult, ValueBet
+from app.teams import get_team_registry
+
+
+def configure_connection(conn, config):
+    conn.execute(f"PRAGMA busy_timeout = {int(config.busy_timeout_ms)}")
+    conn.execute(f"PRAGMA cache_size = {-int(config.cache_size_kb)}")
+    conn.execute(f"PRAGMA synchronous = {config.synchronous}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    return conn
+
+
+class ReadPool:
+    """Read-only connections to one database file, handed out one per query.
+    
+    Under WAL each reader sees the last committed snapshot and never waits
+    on the writer, so CLI or API queries can run while a scan is writing.
+    Connections are opened lazily up to ``size``; callers beyond that wait
+    for one to be returned.
+    """
+    
+    def __init__(self, db_path, config, size=4):
+        self.db_path = db_path
+        self.config = config
+        self.size = max(1, size)
+        self.idle = queue.LifoQueue()
+        self.opened = 0
+        self.lock = threading.Lock()
+    
+    @contextmanager
+    def connection(self):
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self.idle.put(conn)
+    
+    def close(self):
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                break
+    
+    def _acquire(self):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            if self.opened < self.size:
+                self.opened += 1
+                return self._open()
+        return self.idle.get()
+    
+    def _open(self):
+        uri = Path(self.db_path).resolve().as_uri() + "?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        configure_connection(conn, self.config)
+        conn.execute("PRAGMA query_only = ON")
+        return conn
 
 
 class Database:
@@ -15,7 +79,13 @@ class Database:
             db_path = str(cache_dir / "evbet.db")
         self.db_path = db_path
         self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        configure_connection(self.conn, config.database)
+        self.conn.execute(f"PRAGMA journal_mode = {config.database.journal_mode}")
         self._init_tables()
+        # An in-memory database is private to its connection
+        self.readers = None
+        if db_path != ":memory:" and not db_path.startswith("file::memory:"):
+            self.readers = ReadPool(db_path, config.database, config.database.read_pool_size)
     
     def _init_tables(self):
         cursor = self.conn.cursor()
@@ -48,33 +118,100 @@ class Database:
                 kelly_stake REAL, created_at TEXT
             )
         """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS model_performance (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                model_name TEXT, sport TEXT, league TEXT,
+                log_loss REAL, brier_score REAL, accuracy REAL,
+                calibration_error REAL, num_predictions INTEGER,
+                evaluated_at TEXT
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_historical_results_sport_league_date
+            ON historical_results (sport, league, match_date)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_value_bets_event_created
+            ON value_bets (event_id, created_at)
+        """)
         self.conn.commit()
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] < 1:
+            self._canonicalize_results()
+    
+    def _canonicalize_results(self):
+        """Re-key results imported before the team registry existed.
+        
+        Importers now build event_id from canonical team names, so rows
+        stored under the old ad-hoc spellings would otherwise be imported
+        again as new matches. Old rows that already have a canonical copy
+        are dropped.
+        """
+        teams = get_team_registry()
+        rows = self.conn.execute(
+            "SELECT id, event_id, home_team, away_team, match_date FROM historical_results"
+        ).fetchall()
+        with self.conn:
+            for row_id, event_id, home_team, away_team, match_date in rows:
+                day = str(match_date)[:10].replace('-', '')
+                # Only rows keyed the importers' way; other sources keep their IDs
+                if event_id != f"{home_team}_{away_team}_{day}":
+                    continue
+                home = teams.canonical(home_team)
+                away = teams.canonical(away_team)
+                canonical_id = f"{home}_{away}_{day}"
+                if canonical_id == event_id:
+                    continue
+                updated = self.conn.execute("""
+                    UPDATE OR IGNORE historical_results SET event_id = ?, home_team = ?, away_team = ?
+                    WHERE id = ?
+                """, (canonical_id, home, away, row_id)).rowcount
+                if not updated:
+                    self.conn.execute("DELETE FROM historical_results WHERE id = ?", (row_id,))
+            self.conn.execute("PRAGMA user_version = 1")
+    
+    @contextmanager
+    def reader(self):
+        """Connection for queries; a pooled read-only one when available"""
+        if self.readers is None:
+            yield self.conn
+            return
+        with self.readers.connection() as conn:
+            yield conn
     
     def cache_odds(self, odds):
-        cursor = self.conn.cursor()
-        cursor.execute("""
+        self.cache_odds_many([odds])
+    
+    def cache_odds_many(self, odds):
+        """Upsert RawOdds (or a DataFrame of their fields) in one transaction"""
+        return self._write_many("raw_odds", """
             INSERT OR REPLACE INTO raw_odds 
             (provider, event_id, sport, league, home_team, away_team, 
              start_time, market, outcome, price_decimal, last_updated)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (odds.provider, odds.event_id, odds.sport.value, odds.league,
-              odds.home_team, odds.away_team, odds.start_time.isoformat(),
-              odds.market.value, odds.outcome.value, odds.price_decimal,
-              odds.last_updated.isoformat()))
-        self.conn.commit()
+        """, odds, RawOdds, lambda odds: (
+            odds.provider, odds.event_id, odds.sport.value, odds.league,
+            odds.home_team, odds.away_team, odds.start_time.isoformat(),
+            odds.market.value, odds.outcome.value, odds.price_decimal,
+            odds.last_updated.isoformat()),
+            key=(("provider", "event_id", "market", "outcome"), (0, 1, 7, 8)))
     
     def save_historical_result(self, result):
-        cursor = self.conn.cursor()
-        cursor.execute("""
+        self.save_historical_results([result])
+    
+    def save_historical_results(self, results):
+        """Upsert HistoricalResults (or a DataFrame of their fields) in one transaction"""
+        return self._write_many("historical_results", """
             INSERT OR REPLACE INTO historical_results
             (event_id, sport, league, home_team, away_team, match_date,
              home_score, away_score, home_odds, draw_odds, away_odds)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (result.event_id, result.sport.value, result.league,
-              result.home_team, result.away_team, result.match_date.isoformat(),
-              result.home_score, result.away_score,
-              result.home_odds, result.draw_odds, result.away_odds))
-        self.conn.commit()
+        """, results, HistoricalResult, lambda result: (
+            result.event_id, result.sport.value, result.league,
+            result.home_team, result.away_team, result.match_date.isoformat(),
+            result.home_score, result.away_score,
+            result.home_odds, result.draw_odds, result.away_odds),
+            key=(("event_id",), (0,)))
     
     def get_historical_results(self, sport=None, league=None):
         query = "SELECT * FROM historical_results WHERE 1=1"
@@ -85,24 +222,137 @@ class Database:
         if league:
             query += " AND league = ?"
             params.append(league)
-        return pd.read_sql_query(query, self.conn, params=params)
+        with self.reader() as conn:
+            return pd.read_sql_query(query, conn, params=params)
+    
+    def get_results_fingerprint(self, sport=None, league=None):
+        """(row count, latest match date, home goals, away goals) of the matching results"""
+        where, params = self._results_filter(sport, league)
+        with self.reader() as conn:
+            cursor = conn.execute(f"""
+                SELECT COUNT(*), MAX(match_date), TOTAL(home_score), TOTAL(away_score)
+                FROM historical_results{where}
+            """, params)
+            return tuple(cursor.fetchone())
+    
+    def get_team_names(self, sport=None):
+        where, params = self._results_filter(sport)
+        query = f"SELECT home_team FROM historical_results{where} "
+        query += f"UNION SELECT away_team FROM historical_results{where}"
+        with self.reader() as conn:
+            cursor = conn.execute(query, params * 2)
+            return [row[0] for row in cursor.fetchall()]
+    
+    def _results_filter(self, sport=None, league=None):
+        # Only the filters given, so the (sport, league, match_date) index applies
+        clauses = []
+        params = []
+        if sport:
+            clauses.append("sport = ?")
+            params.append(sport)
+        if league:
+            clauses.append("league = ?")
+            params.append(league)
+        if not clauses:
+            return "", params
+        return " WHERE " + " AND ".join(clauses), params
     
     def save_value_bet(self, bet):
-        cursor = self.conn.cursor()
-        cursor.execute("""
+        self.save_value_bets([bet])
+    
+    def save_value_bets(self, bets):
+        """Insert ValueBets (or a DataFrame of their fields) in one transaction"""
+        created_at = datetime.now().isoformat()
+        return self._write_many("value_bets", """
             INSERT INTO value_bets
             (event_id, league, home_team, away_team, start_time_local,
              bookmaker, market, outcome, price_decimal, model_prob,
              market_prob_devig, edge_pct, ev, kelly_stake, created_at)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (bet.event_id, bet.league, bet.home_team, bet.away_team,
-              bet.start_time_local.isoformat(), bet.bookmaker,
-              bet.market.value, bet.outcome.value, bet.price_decimal,
-              bet.model_prob, bet.market_prob_devig, bet.edge_pct,
-              bet.ev, bet.kelly_stake, datetime.now().isoformat()))
+        """, bets, ValueBet, lambda bet: (
+            bet.event_id, bet.league, bet.home_team, bet.away_team,
+            bet.start_time_local.isoformat(), bet.bookmaker,
+            bet.market.value, bet.outcome.value, bet.price_decimal,
+            bet.model_prob, bet.market_prob_devig, bet.edge_pct,
+            bet.ev, bet.kelly_stake, created_at))
+    
+    def _write_many(self, table, sql, items, model_class, to_row, key=None):
+        """executemany over ``items`` in batch_size chunks, all in one transaction.
+        
+        ``items`` is an iterable of ``model_class`` instances or dicts, or a
+        DataFrame with one column per field. Rows that fail validation are
+        skipped rather than aborting the batch. Returns
+        {"inserted", "replaced", "skipped"}; replaced rows are upserts that
+        hit an existing unique key, given as ``key`` = (columns, row indices).
+        """
+        if isinstance(items, pd.DataFrame):
+            # NaN/NaT cells become None so required fields fail validation
+            items = items.astype(object).where(items.notna(), None).to_dict("records")
+        rows = []
+        skipped = 0
+        for item in items:
+            try:
+                if not isinstance(item, model_class):
+                    item = model_class(**item)
+                rows.append(to_row(item))
+            except (ValidationError, TypeError, ValueError, AttributeError):
+                skipped += 1
+        
+        batch_size = max(1, get_config().database.batch_size)
+        cursor = self.conn.cursor()
+        inserted = 0
+        with self.conn:
+            before = self.conn.total_changes
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                if key is not None:
+                    inserted += self._new_keys(cursor, table, key, batch)
+                cursor.executemany(sql, batch)
+            written = self.conn.total_changes - before
+        if key is None:
+            inserted = written
+        return {"inserted": inserted, "replaced": written - inserted, "skipped": skipped}
+    
+    def _new_keys(self, cursor, table, key, rows):
+        # Distinct unique keys in ``rows`` that are not in ``table`` yet
+        columns, indices = key
+        keys = list({tuple(row[i] for i in indices) for row in rows})
+        placeholders = ", ".join(["(" + ", ".join("?" * len(columns)) + ")"] * len(keys))
+        cursor.execute(
+            f"SELECT COUNT(*) FROM {table} WHERE ({', '.join(columns)}) IN (VALUES {placeholders})",
+            [value for row_key in keys for value in row_key]
+        )
+        return len(keys) - cursor.fetchone()[0]
+    
+    def save_model_performance(self, performance):
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            INSERT INTO model_performance
+            (model_name, sport, league, log_loss, brier_score, accuracy,
+             calibration_error, num_predictions, evaluated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (performance.model_name, performance.sport.value, performance.league,
+              performance.log_loss, performance.brier_score, performance.accuracy,
+              performance.calibration_error, performance.num_predictions,
+              performance.evaluated_at.isoformat()))
         self.conn.commit()
     
+    def get_model_performance(self, sport=None, league=None):
+        query = "SELECT * FROM model_performance WHERE 1=1"
+        params = []
+        if sport:
+            query += " AND sport = ?"
+            params.append(sport)
+        if league:
+            query += " AND league = ?"
+            params.append(league)
+        query += " ORDER BY evaluated_at"
+        with self.reader() as conn:
+            return pd.read_sql_query(query, conn, params=params)
+    
     def close(self):
+        if self.readers is not None:
+            self.readers.close()
         self.conn.close()
 
 
@@ -1,4 +1,5 @@
 import math
+import numpy as np
 from app.config import get_config
 from app.models import DeviggedOdds
 
@@ -29,5 +30,25 @@ class Devigger:
             overround=overround
         )
     
+    def devig_frame(self, frame):
+        """Devig every bookmaker's market in an OddsFrame at once.
+        
+        Returns (events x bookmakers x outcomes) devigged probabilities, NaN
+        where the bookmaker has no price, and the (events x bookmakers)
+        overrounds they were derived from.
+        """
+        return self.devig_prices(frame.prices)
+    
+    def devig_prices(self, prices):
+        """Devig an array of prices whose last axis holds one market's outcomes"""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            raw_probs = 1.0 / prices
+            overround = np.nansum(raw_probs, axis=-1)
+            if self.method == "multiplicative":
+                devigged = raw_probs / overround[..., None]
+            else:
+                devigged = raw_probs / overround[..., None]
+        return devigged, overround
+    
     def _multiplicative(self, raw_probs, overround):
         return {outcome: prob / overround for outcome, prob in raw_probs.items()}
@@ -0,0 +1,103 @@
+import numpy as np
+from app.config import get_config
+from app.devig import Devigger
+from app.models import ValueBet
+from app.providers.batch import OUTCOMES
+
+
+def edge_and_ev(model_probs, prices, market_probs):
+    """Edge over the devigged market in percent, and expected value per unit staked"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        edge_pct = np.where(market_probs > 0, (model_probs - market_probs) / market_probs * 100, 0.0)
+        ev = model_probs * prices - 1
+    return edge_pct, ev
+
+
+def kelly_fractions(true_probs, odds, kelly_fraction, kelly_cap):
+    """Capped fractional Kelly stake as a share of bankroll.
+    
+    ``kelly_fraction`` and ``kelly_cap`` broadcast against the probabilities,
+    so a whole grid of staking rules can be evaluated at once.
+    """
+    b = odds - 1
+    p = true_probs
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fraction = (b * p - (1 - p)) / b * kelly_fraction
+    fraction = np.clip(fraction, 0.0, kelly_cap)
+    fraction = np.where((b > 0) & (p > 0), fraction, 0.0)
+    return np.nan_to_num(fraction)
+
+
+class Evaluation:
+    """Per event and outcome arrays produced by ValueBetEngine.evaluate"""
+    
+    def __init__(self, model_probs, best_prices, best_cols, market_probs, edge_pct, ev, kelly_stakes, mask):
+        self.model_probs = model_probs
+        self.best_prices = best_prices
+        self.best_cols = best_cols
+        self.market_probs = market_probs
+        self.edge_pct = edge_pct
+        self.ev = ev
+        self.kelly_stakes = kelly_stakes
+        self.mask = mask
+
+
+class ValueBetEngine:
+    """Evaluates every fixture, bookmaker and outcome of an OddsFrame at once.
+    
+    Model probabilities come in as an (events x outcomes) matrix, NaN where
+    the model has no opinion. Best prices, devigged market probabilities,
+    edge, EV and Kelly stakes are computed as array operations and the
+    filter thresholds applied as a mask, so the Python work per cycle is
+    limited to building ValueBet objects for the bets that qualify.
+    """
+    
+    def __init__(self, devigger=None):
+        self.config = get_config()
+        self.devigger = devigger or Devigger()
+    
+    def evaluate(self, frame, model_probs):
+        model_probs = np.asarray(model_probs, dtype=float)
+        best_prices, best_cols = frame.best_prices()
+        devigged, _ = self.devigger.devig_frame(frame)
+        
+        # Devigged probability at the bookmaker offering the best price
+        rows = np.arange(len(frame))[:, None]
+        outcomes = np.arange(len(OUTCOMES))[None, :]
+        market_probs = devigged[rows, np.maximum(best_cols, 0), outcomes]
+        market_probs = np.where(best_cols >= 0, market_probs, np.nan)
+        
+        edge_pct, ev = edge_and_ev(model_probs, best_prices, market_probs)
+        kelly_stakes = self.kelly_stakes(model_probs, best_prices)
+        
+        filters = self.config.filters
+        valid = ~np.isnan(model_probs) & ~np.isnan(best_prices) & ~np.isnan(market_probs)
+        mask = valid & (edge_pct >= filters.min_edge_pct) & (ev > filters.min_ev)
+        
+        return Evaluation(model_probs, best_prices, best_cols, market_probs, edge_pct, ev, kelly_stakes, mask)
+    
+    def kelly_stakes(self, true_probs, odds):
+        betting = self.config.betting
+        fraction = kelly_fractions(true_probs, odds, betting.kelly_fraction, betting.kelly_cap)
+        return np.round(betting.bankroll * fraction, 2)
+    
+    def value_bets(self, frame, evaluation, tz):
+        value_bets = []
+        for row, k in zip(*np.nonzero(evaluation.mask)):
+            value_bets.append(ValueBet(
+                event_id=frame.event_ids[row],
+                league=frame.leagues[row],
+                home_team=frame.home_teams[row],
+                away_team=frame.away_teams[row],
+                start_time_local=frame.start_times[row].astimezone(tz),
+                bookmaker=frame.bookmakers[evaluation.best_cols[row, k]],
+                market=frame.markets[row],
+                outcome=OUTCOMES[k],
+                price_decimal=float(evaluation.best_prices[row, k]),
+                model_prob=float(evaluation.model_probs[row, k]),
+                market_prob_devig=float(evaluation.market_probs[row, k]),
+                edge_pct=float(evaluation.edge_pct[row, k]),
+                ev=float(evaluation.ev[row, k]),
+                kelly_stake=float(evaluation.kelly_stakes[row, k])
+            ))
+        return value_bets
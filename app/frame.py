@@ -0,0 +1,155 @@
+from datetime import datetime
+import numpy as np
+from app.models import MarketOdds, NormalizedEvent
+from app.providers.batch import OUTCOMES, batches_from_raw_odds
+
+
+def _id_or_missing(team_id):
+    return -1 if team_id is None else team_id
+
+
+class OddsFrame:
+    """Array-backed odds for many events across many bookmakers.
+    
+    ``prices`` is an (events x bookmakers x outcomes) float array in
+    ``OUTCOMES`` order, NaN where a bookmaker doesn't price an outcome.
+    Per-event fields are parallel arrays indexed by the first axis and
+    ``bookmakers`` labels the second. Pydantic objects are only built by
+    ``event``/``to_market_odds`` for callers that need them.
+    """
+    
+    def __init__(self, event_ids, sports, leagues, markets, home_teams, away_teams,
+                 home_team_ids, away_team_ids, start_times, bookmakers, prices, last_updated=None):
+        self.event_ids = np.asarray(event_ids, dtype=object)
+        self.sports = np.asarray(sports, dtype=object)
+        self.leagues = np.asarray(leagues, dtype=object)
+        self.markets = np.asarray(markets, dtype=object)
+        self.home_teams = np.asarray(home_teams, dtype=object)
+        self.away_teams = np.asarray(away_teams, dtype=object)
+        self.home_team_ids = np.asarray(home_team_ids, dtype=np.int64)
+        self.away_team_ids = np.asarray(away_team_ids, dtype=np.int64)
+        self.start_times = np.asarray(start_times, dtype=object)
+        self.bookmakers = list(bookmakers)
+        self.prices = prices
+        self.last_updated = last_updated or datetime.now()
+    
+    def __len__(self):
+        return len(self.event_ids)
+    
+    @property
+    def num_prices(self):
+        return int(np.count_nonzero(~np.isnan(self.prices)))
+    
+    @classmethod
+    def empty(cls):
+        return cls([], [], [], [], [], [], [], [], [], [], np.empty((0, 0, len(OUTCOMES))))
+    
+    @classmethod
+    def from_raw_odds(cls, raw_odds):
+        return cls.from_batches(batches_from_raw_odds(raw_odds))
+    
+    @classmethod
+    def from_batches(cls, batches):
+        """Merge batches into one frame, joining events on event_id and bookmakers on key"""
+        event_rows = {}
+        book_cols = {}
+        events = []
+        last_updated = None
+        for batch in batches:
+            for key in batch.bookmakers:
+                book_cols.setdefault(key, len(book_cols))
+            for code, event_id in enumerate(batch.event_ids):
+                if event_id not in event_rows:
+                    event_rows[event_id] = len(events)
+                    events.append((batch, code))
+            if last_updated is None or batch.last_updated > last_updated:
+                last_updated = batch.last_updated
+        
+        prices = np.full((len(event_rows), len(book_cols), len(OUTCOMES)), np.nan)
+        for batch in batches:
+            if len(batch) == 0:
+                continue
+            rows = np.array([event_rows[event_id] for event_id in batch.event_ids], dtype=np.int64)
+            cols = np.array([book_cols[key] for key in batch.bookmakers], dtype=np.int64)
+            prices[rows[batch.event_codes], cols[batch.bookmaker_codes], batch.outcome_codes] = batch.prices
+        
+        return cls(
+            event_ids=list(event_rows),
+            sports=[batch.sport for batch, _ in events],
+            leagues=[batch.league for batch, _ in events],
+            markets=[batch.market for batch, _ in events],
+            home_teams=[batch.home_teams[code] for batch, code in events],
+            away_teams=[batch.away_teams[code] for batch, code in events],
+            home_team_ids=[_id_or_missing(batch.home_team_ids[code]) for batch, code in events],
+            away_team_ids=[_id_or_missing(batch.away_team_ids[code]) for batch, code in events],
+            start_times=[batch.start_times[code] for batch, code in events],
+            bookmakers=list(book_cols),
+            prices=prices,
+            last_updated=last_updated
+        )
+    
+    def take(self, rows):
+        """Return a frame restricted to the given event rows (indices or boolean mask)"""
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        prices = self.prices[rows]
+        # Drop bookmakers that no longer price anything
+        cols = np.flatnonzero(~np.all(np.isnan(prices), axis=(0, 2)))
+        return OddsFrame(
+            self.event_ids[rows], self.sports[rows], self.leagues[rows], self.markets[rows],
+            self.home_teams[rows], self.away_teams[rows],
+            self.home_team_ids[rows], self.away_team_ids[rows], self.start_times[rows],
+            [self.bookmakers[c] for c in cols], prices[:, cols], self.last_updated
+        )
+    
+    def best_prices(self):
+        """Best price per event and outcome, and the bookmaker column offering it (-1 if none)"""
+        num_events, num_books, num_outcomes = self.prices.shape
+        if num_books == 0:
+            return np.full((num_events, num_outcomes), np.nan), np.full((num_events, num_outcomes), -1)
+        filled = np.where(np.isnan(self.prices), -np.inf, self.prices)
+        best_cols = np.argmax(filled, axis=1)
+        best = np.take_along_axis(filled, best_cols[:, None, :], axis=1)[:, 0, :]
+        missing = np.isneginf(best)
+        return np.where(missing, np.nan, best), np.where(missing, -1, best_cols)
+    
+    def signature(self, row):
+        """Hashable snapshot of one event's prices, for change detection"""
+        prices = self.prices[row]
+        cols = np.flatnonzero(~np.all(np.isnan(prices), axis=1))
+        return tuple(self.bookmakers[c] for c in cols), prices[cols].tobytes()
+    
+    def event(self, row):
+        return NormalizedEvent(
+            event_id=self.event_ids[row],
+            sport=self.sports[row],
+            league=self.leagues[row],
+            home_team=self.home_teams[row],
+            away_team=self.away_teams[row],
+            start_time=self.start_times[row],
+            home_team_id=self._optional_id(self.home_team_ids[row]),
+            away_team_id=self._optional_id(self.away_team_ids[row])
+        )
+    
+    def to_market_odds(self):
+        market_odds = []
+        for row in range(len(self)):
+            odds = {}
+            for col, book in enumerate(self.bookmakers):
+                outcomes = {
+                    outcome: float(price)
+                    for outcome, price in zip(OUTCOMES, self.prices[row, col]) if not np.isnan(price)
+                }
+                if outcomes:
+                    odds[book] = outcomes
+            market_odds.append(MarketOdds(
+                event=self.event(row),
+                market=self.markets[row],
+                odds=odds,
+                last_updated=self.last_updated
+            ))
+        return market_odds
+    
+    def _optional_id(self, team_id):
+        return None if team_id < 0 else int(team_id)
@@ -0,0 +1,95 @@
+import json
+import os
+import uuid
+from pathlib import Path
+import numpy as np
+from app.modeling.soccer import MODEL_TYPES
+from app.teams import get_team_registry
+
+
+FORMAT_VERSION = 1
+HEADER = "header.json"
+
+
+class ArtifactError(Exception):
+    pass
+
+
+def save_model(model, directory, metadata=None):
+    """Write ``model`` as a directory of .npy arrays plus a JSON header.
+    
+    Arrays are written under fresh names and the header is swapped in last,
+    so readers always see a complete artifact; processes that still have
+    the previous arrays memory-mapped keep reading them until they reload.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    params, arrays = model.to_arrays()
+    
+    token = uuid.uuid4().hex[:8]
+    files = {}
+    for name, values in arrays.items():
+        filename = f"{name}.{token}.npy"
+        np.save(directory / filename, np.ascontiguousarray(values))
+        files[name] = filename
+    
+    header = {
+        "format_version": FORMAT_VERSION,
+        "model_type": model.model_type,
+        "params": params,
+        "arrays": files,
+        # Names behind the integer IDs the arrays are indexed by
+        "teams": get_team_registry().names[:model.num_teams()],
+        "metadata": metadata or {}
+    }
+    tmp_path = directory / f"{HEADER}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(header, f, indent=1)
+    os.replace(tmp_path, directory / HEADER)
+    
+    for entry in os.scandir(directory):
+        if entry.name.endswith(".npy") and entry.name not in files.values():
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+
+def load_model(directory, mmap=True):
+    """Load an artifact written by save_model, returning (model, metadata).
+    
+    Arrays are memory-mapped read-only by default, so loading costs a header
+    parse and the pages actually used are shared between processes.
+    """
+    directory = Path(directory)
+    try:
+        with open(directory / HEADER) as f:
+            header = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ArtifactError(f"Cannot read model artifact {directory}: {e}")
+    
+    if header.get("format_version") != FORMAT_VERSION:
+        raise ArtifactError(f"Unsupported model artifact version {header.get('format_version')}")
+    model_class = MODEL_TYPES.get(header.get("model_type"))
+    if model_class is None:
+        raise ArtifactError(f"Unknown model type {header.get('model_type')}")
+    
+    # IDs are only meaningful with the team registry they were fitted against
+    teams = header["teams"]
+    registry = get_team_registry()
+    if len(registry.names) < len(teams):
+        # Fitted by another process that has since registered more teams
+        registry.refresh()
+    if registry.names[:len(teams)] != teams:
+        raise ArtifactError(f"Team registry no longer matches model artifact {directory}")
+    
+    mmap_mode = "r" if mmap else None
+    try:
+        arrays = {
+            name: np.load(directory / filename, mmap_mode=mmap_mode, allow_pickle=False)
+            for name, filename in header["arrays"].items()
+        }
+    except (OSError, ValueError) as e:
+        raise ArtifactError(f"Cannot read model arrays in {directory}: {e}")
+    
+    return model_class.from_arrays(header["params"], arrays), header["metadata"]
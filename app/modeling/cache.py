@@ -0,0 +1,74 @@
+from collections import OrderedDict
+import numpy as np
+from app.modeling.soccer import outcome_probs
+
+
+class PredictionCache:
+    """Bounded LRU of per-fixture model outputs.
+    
+    Entries hold the 1X2 probabilities and, for goal models, the full score
+    matrix, keyed by (model fingerprint, home ID, away ID). In watch mode the
+    same fixtures come round every cycle, so only new fixtures or a changed
+    model reach the model itself.
+    """
+    
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def predict_probs_batch(self, model, home_ids, away_ids):
+        return self._lookup(model, home_ids, away_ids)[0]
+    
+    def predict_scores_batch(self, model, home_ids, away_ids):
+        """Score matrix per fixture (None where the model has no grid or no prediction)"""
+        return self._lookup(model, home_ids, away_ids)[1]
+    
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+    
+    def clear(self):
+        self.entries.clear()
+    
+    def _lookup(self, model, home_ids, away_ids):
+        home_ids = np.asarray(home_ids, dtype=np.int64)
+        away_ids = np.asarray(away_ids, dtype=np.int64)
+        probs = np.full((len(home_ids), 3), np.nan)
+        scores = [None] * len(home_ids)
+        version = model.fingerprint()
+        
+        missing = []
+        for row, (home_id, away_id) in enumerate(zip(home_ids.tolist(), away_ids.tolist())):
+            if home_id < 0 or away_id < 0:
+                continue
+            entry = self.entries.get((version, home_id, away_id))
+            if entry is None:
+                missing.append(row)
+                continue
+            self.entries.move_to_end((version, home_id, away_id))
+            probs[row], scores[row] = entry
+            self.hits += 1
+        self.misses += len(missing)
+        
+        if missing:
+            rows = np.array(missing)
+            grids = model.predict_scores_batch(home_ids[rows], away_ids[rows])
+            if grids is None:
+                probs[rows] = model.predict_probs_batch(home_ids[rows], away_ids[rows])
+            else:
+                probs[rows] = outcome_probs(grids)
+            for i, row in enumerate(missing):
+                grid = grids[i] if grids is not None and not np.isnan(probs[row]).any() else None
+                scores[row] = grid
+                self.entries[(version, int(home_ids[row]), int(away_ids[row]))] = (probs[row].copy(), grid)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        
+        return probs, scores
@@ -0,0 +1,71 @@
+from datetime import datetime
+import pandas as pd
+from app.database import get_db
+from app.models import ModelPerformance, Sport
+from app.modeling.metrics import (
+    accuracy, base_rates, brier_score, calibration_error, fill_missing, log_loss, match_outcomes
+)
+from app.modeling.selector import ModelSelector
+
+
+class ModelEvaluator:
+    """Scores cached models on held-out historical results.
+    
+    The holdout is the most recent ``holdout_days`` of each league's
+    results. A cached model fitted before the holdout started is scored
+    as-is; otherwise a model of the same type and hyperparameters is
+    fitted on the results before it. All predictions for a league are made
+    in one batch and every metric is a single array reduction.
+    """
+    
+    def __init__(self, selector=None, holdout_days=365, calibration_bins=10):
+        self.db = get_db()
+        self.selector = selector or ModelSelector()
+        self.holdout_days = holdout_days
+        self.calibration_bins = calibration_bins
+    
+    def evaluate_cached(self, save=True):
+        performances = []
+        for key in self.selector.cached_models():
+            performance = self.evaluate(*key)
+            if performance is None:
+                continue
+            performances.append(performance)
+            if save:
+                self.db.save_model_performance(performance)
+        return performances
+    
+    def evaluate(self, sport, league, model_type):
+        sport = Sport(sport)
+        league = None if league == "all" else league
+        df = self.selector.load_results(sport, league)
+        if len(df) == 0:
+            return None
+        
+        cutoff = df['match_date'].max() - pd.Timedelta(days=self.holdout_days)
+        train = df[df['match_date'] <= cutoff]
+        test = df[df['match_date'] > cutoff]
+        if len(train) == 0 or len(test) == 0:
+            return None
+        
+        model = self.selector.cached_model((sport.value, league or "all", model_type))
+        fitted_through = getattr(model, "fitted_through", None)
+        if model is None or fitted_through is None or fitted_through > cutoff:
+            model = self.selector.new_model(model_type)
+            model.fit(train)
+        
+        outcomes = match_outcomes(test['home_score'], test['away_score'])
+        probs = model.predict_probs_batch(test['home_id'].to_numpy(), test['away_id'].to_numpy())
+        probs, _ = fill_missing(probs, base_rates(match_outcomes(train['home_score'], train['away_score'])))
+        
+        return ModelPerformance(
+            model_name=model_type,
+            sport=sport,
+            league=league,
+            log_loss=log_loss(probs, outcomes),
+            brier_score=brier_score(probs, outcomes),
+            accuracy=accuracy(probs, outcomes),
+            calibration_error=calibration_error(probs, outcomes, self.calibration_bins),
+            num_predictions=len(test),
+            evaluated_at=datetime.now()
+        )
@@ -0,0 +1,54 @@
+import numpy as np
+
+
+def match_outcomes(home_scores, away_scores):
+    """Outcome column per match in OUTCOMES order: 0 home win, 1 draw, 2 away win"""
+    diff = np.asarray(home_scores) - np.asarray(away_scores)
+    return np.where(diff > 0, 0, np.where(diff == 0, 1, 2))
+
+
+def base_rates(outcomes):
+    counts = np.bincount(outcomes, minlength=3).astype(float)
+    return (counts + 1) / (counts.sum() + 3)
+
+
+def fill_missing(probs, rates):
+    """Replace rows the model could not price with outcome base rates"""
+    probs = np.array(probs, dtype=float)
+    missing = np.isnan(probs).any(axis=1)
+    probs[missing] = rates
+    return probs, missing
+
+
+def log_loss(probs, outcomes, eps=1e-15):
+    picked = probs[np.arange(len(outcomes)), outcomes]
+    return float(-np.mean(np.log(np.clip(picked, eps, 1.0))))
+
+
+def brier_score(probs, outcomes):
+    actual = np.zeros_like(probs)
+    actual[np.arange(len(outcomes)), outcomes] = 1.0
+    return float(np.mean(np.sum((probs - actual) ** 2, axis=1)))
+
+
+def accuracy(probs, outcomes):
+    return float(np.mean(np.argmax(probs, axis=1) == outcomes))
+
+
+def calibration_error(probs, outcomes, bins=10):
+    """Expected calibration error over every (match, outcome) probability.
+    
+    Probabilities are bucketed into ``bins`` equal-width bins; the error is
+    the count-weighted mean gap between each bin's average prediction and
+    the observed frequency of those outcomes.
+    """
+    actual = np.zeros_like(probs)
+    actual[np.arange(len(outcomes)), outcomes] = 1.0
+    predicted = probs.ravel()
+    observed = actual.ravel()
+    bin_ids = np.minimum((predicted * bins).astype(int), bins - 1)
+    counts = np.bincount(bin_ids, minlength=bins)
+    predicted_sums = np.bincount(bin_ids, weights=predicted, minlength=bins)
+    observed_sums = np.bincount(bin_ids, weights=observed, minlength=bins)
+    gaps = np.abs(predicted_sums - observed_sums)
+    return float(gaps.sum() / max(1, counts.sum()))
@@ -1,47 +1,299 @@
-import pickle
+import json
+import os
+from collections import OrderedDict
 import pandas as pd
 from datetime import datetime, timedelta
 from pathlib import Path
 from app.config import get_config
 from app.database import get_db
 from app.models import Sport
-from app.modeling.soccer import PoissonModel, EloLogisticModel
+from app.modeling.artifacts import HEADER, ArtifactError, load_model, save_model
+from app.modeling.soccer import MODEL_TYPES
+from app.modeling.validation import CrossValidator
+from app.teams import get_team_registry
+
+
+# Fitted models shared by every selector in the process, most recent last
+_model_lru = OrderedDict()
+
+# Candidates when modeling.soccer_models is empty; dixon_coles is opt-in
+DEFAULT_MODELS = ("poisson", "elo_logistic")
 
 
 class ModelSelector:
+    """Builds, caches and incrementally updates one model per sport and league.
+    
+    Cached models are keyed by sport, league and model type and carry a
+    fingerprint of the results they were trained on (row count, latest
+    match date and score totals). A model is reused while the fingerprint
+    matches, updated with partial_fit when results were added, and refitted
+    otherwise or once its last full fit is older than ``model_cache_days``.
+    """
+    
     def __init__(self):
         self.config = get_config()
         self.db = get_db()
         self.model_cache_dir = Path(self.config.general.cache_dir) / "models"
         self.model_cache_dir.mkdir(parents=True, exist_ok=True)
+        self.selection_file = self.model_cache_dir / "selection.json"
+        self.cross_validator = CrossValidator(
+            folds=self.config.modeling.cv_folds,
+            max_workers=self.config.modeling.cv_workers
+        )
     
     def get_model_for_sport(self, sport, league=None):
-        cache_file = self.model_cache_dir / f"{sport.value}_best.pkl"
-        if cache_file.exists():
-            cache_age = datetime.now() - datetime.fromtimestamp(cache_file.stat().st_mtime)
-            if cache_age < timedelta(days=self.config.modeling.model_cache_days):
-                with open(cache_file, "rb") as f:
-                    return pickle.load(f)
-        
-        # Get historical results
-        df = self.db.get_historical_results(sport=sport.value, league=league)
+        fingerprint = self.db.get_results_fingerprint(sport=sport.value, league=league)
+        if league is not None and fingerprint[0] == 0:
+            # No results imported under this league key; use the sport-wide model
+            league = None
+            fingerprint = self.db.get_results_fingerprint(sport=sport.value)
+        if fingerprint[0] == 0:
+            # No results for the sport at all; don't fit and save an empty model
+            return None
         
-        # FILTER TO ONLY RECENT DATA (last 2 years)
-        if len(df) > 0 and 'match_date' in df.columns:
-            df['match_date'] = pd.to_datetime(df['match_date'], format='mixed', utc=True)
-            cutoff_date = pd.Timestamp(datetime.now() - timedelta(days=730), tz='UTC')  # Make it timezone-aware
-            df = df[df['match_date'] >= cutoff_date]
-            print(f"  Training on {len(df)} games from last 2 years (filtered from older data)")
+        model_type = self._model_type(sport, league, fingerprint[0])
+        key = (sport.value, league or "all", model_type)
+        model = _model_lru.get(key)
+        if model is None:
+            model = self._load(key)
+        if model is not None and self._expired(model):
+            model = None
+        
+        if model is not None and getattr(model, "data_fingerprint", None) == fingerprint:
+            self._remember(key, model)
+            return model
         
-        if len(df) < self.config.modeling.min_historical_games:
-            model = PoissonModel()
+        df = self.load_results(sport, league)
+        
+        new_results = None
+        if model is not None and getattr(model, "fitted_through", None) is not None:
+            new_results = self._unseen_results(model, df)
+            if not self._only_added(model, fingerprint, new_results):
+                new_results = None
+        if new_results is not None and len(new_results) > 0 and model.supports_partial_fit:
+            model.partial_fit(new_results)
+            print(f"  Updated model with {len(new_results)} new games")
         else:
-            model = PoissonModel()
+            if new_results is None or len(new_results) == 0:
+                # Nothing cached, or rows were edited or removed rather than added
+                model = None
+            if len(df) > 0 and 'match_date' in df.columns:
+                df = self._recent(df)
+                print(f"  Training on {len(df)} games from last 2 years (filtered from older data)")
+            
+            # Models without partial_fit refit in place, starting from their current ratings
+            if model is None:
+                model = self.new_model(model_type)
+            if len(df) > 0:
+                model.fit(df)
+            model.fitted_at = datetime.now()
+            new_results = df
         
-        if len(df) > 0:
-            model.fit(df)
+        self._mark_fitted(model, new_results)
+        model.data_fingerprint = fingerprint
+        self._save(key, model)
+        self._remember(key, model)
+        return model
+    
+    def model_type_for(self, sport, league=None):
+        """Model type for ``league``, cross-validating first if its selection is stale"""
+        if self.needs_selection(sport, league):
+            self.select_models(sport, [league])
+        num_results = self.db.get_results_fingerprint(sport=sport.value, league=league)[0]
+        return self._model_type(sport, league, num_results)
+    
+    def needs_selection(self, sport, league=None):
+        """Whether ``league`` has enough results and no selection newer than model_cache_days"""
+        num_results = self.db.get_results_fingerprint(sport=sport.value, league=league)[0]
+        if num_results < self.config.modeling.min_historical_games:
+            return False
+        entry = self._load_selection().get(self._selection_key(sport, league))
+        if entry is None:
+            return True
+        selected_at = datetime.fromisoformat(entry["selected_at"])
+        return datetime.now() - selected_at >= timedelta(days=self.config.modeling.model_cache_days)
+    
+    def cached_models(self):
+        """(sport, league or "all", model type) of every model artifact on disk"""
+        keys = []
+        for header in sorted(self.model_cache_dir.glob(f"*/{HEADER}")):
+            try:
+                with open(header) as f:
+                    metadata = json.load(f).get("metadata", {})
+            except (OSError, ValueError):
+                continue
+            if "sport" in metadata:
+                keys.append((metadata["sport"], metadata["league"], metadata["model_type"]))
+        return keys
+    
+    def cached_model(self, key):
+        model = _model_lru.get(key)
+        if model is None:
+            model = self._load(key)
+        return model
+    
+    def select_models(self, sport, leagues):
+        """Cross-validate the configured models for each league and cache the winners.
+        
+        Returns league -> (winning model type, scores per model type).
+        Leagues that cannot be cross-validated are recorded without a model
+        type, so they are not retried until the entry is stale.
+        """
+        datasets = {}
+        for league in leagues:
+            df = self._recent(self.load_results(sport, league))
+            if len(df) >= self.config.modeling.min_historical_games:
+                datasets[league] = df
         
-        with open(cache_file, "wb") as f:
-            pickle.dump(model, f)
+        scores = {}
+        if datasets:
+            print(f"  Cross-validating {', '.join(self._candidates())} on {len(datasets)} league(s)...")
+            scores = self.cross_validator.evaluate(datasets, self._candidates())
         
-        return model
\ No newline at end of file
+        selection = self._load_selection()
+        for league in leagues:
+            if league not in scores:
+                selection[self._selection_key(sport, league)] = {
+                    "model_type": None,
+                    "selected_at": datetime.now().isoformat(),
+                    "scores": {}
+                }
+        winners = {}
+        for league, league_scores in scores.items():
+            winner = CrossValidator.best(league_scores)
+            winners[league] = (winner, league_scores)
+            selection[self._selection_key(sport, league)] = {
+                "model_type": winner,
+                "selected_at": datetime.now().isoformat(),
+                "scores": league_scores
+            }
+        self._save_selection(selection)
+        return winners
+    
+    def _model_type(self, sport, league, num_results):
+        # Never cross-validates: this runs on the scan path, where a stale
+        # choice is kept until select_models refreshes it
+        if num_results < self.config.modeling.min_historical_games:
+            return "poisson"
+        entry = self._load_selection().get(self._selection_key(sport, league))
+        if entry is not None and entry["model_type"] in self._candidates():
+            return entry["model_type"]
+        return "poisson"
+    
+    def _candidates(self):
+        names = self.config.modeling.soccer_models or DEFAULT_MODELS
+        return {name: self._model_params(name) for name in names if name in MODEL_TYPES}
+    
+    def _model_params(self, model_type):
+        if model_type == "dixon_coles":
+            return {"xi": self.config.modeling.dixon_coles_decay}
+        return {}
+    
+    def new_model(self, model_type):
+        return MODEL_TYPES[model_type](**self._model_params(model_type))
+    
+    def load_results(self, sport, league):
+        df = self.db.get_historical_results(sport=sport.value, league=league)
+        if len(df) > 0 and 'match_date' in df.columns:
+            df['match_date'] = pd.to_datetime(df['match_date'], format='mixed', utc=True)
+        # Encode teams once here so models (and CV workers) never touch the registry
+        registry = get_team_registry()
+        return df.assign(home_id=registry.team_ids(df['home_team']), away_id=registry.team_ids(df['away_team']))
+    
+    def _recent(self, df):
+        # FILTER TO ONLY RECENT DATA (last 2 years)
+        if len(df) == 0 or 'match_date' not in df.columns:
+            return df
+        cutoff_date = pd.Timestamp(datetime.now() - timedelta(days=730), tz='UTC')  # Make it timezone-aware
+        return df[df['match_date'] >= cutoff_date]
+    
+    def _selection_key(self, sport, league):
+        return f"{sport.value}:{league or 'all'}"
+    
+    def _load_selection(self):
+        try:
+            with open(self.selection_file) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _save_selection(self, selection):
+        tmp_path = self.selection_file.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(selection, f, indent=1)
+        os.replace(tmp_path, self.selection_file)
+    
+    def _artifact_dir(self, key):
+        return self.model_cache_dir / "_".join(key)
+    
+    def _expired(self, model):
+        # Age of the last full fit; partial_fit updates never reset it, so the
+        # training window still moves forward every model_cache_days
+        fitted_at = getattr(model, "fitted_at", None)
+        if fitted_at is None:
+            return True
+        return datetime.now() - fitted_at >= timedelta(days=self.config.modeling.model_cache_days)
+    
+    def _load(self, key):
+        if not (self._artifact_dir(key) / HEADER).exists():
+            return None
+        try:
+            model, metadata = load_model(self._artifact_dir(key))
+        except ArtifactError as e:
+            print(f"  Discarding cached model: {e}")
+            return None
+        if metadata.get("fitted_through"):
+            model.fitted_through = pd.Timestamp(metadata["fitted_through"])
+            model.fitted_last_events = set(metadata["fitted_last_events"])
+        model.data_fingerprint = tuple(metadata.get("data_fingerprint", ()))
+        if metadata.get("fitted_at"):
+            model.fitted_at = datetime.fromisoformat(metadata["fitted_at"])
+        return model
+    
+    def _save(self, key, model):
+        fitted_through = getattr(model, "fitted_through", None)
+        metadata = {
+            "sport": key[0],
+            "league": key[1],
+            "model_type": key[2],
+            "fitted_through": fitted_through.isoformat() if fitted_through is not None else None,
+            "fitted_last_events": sorted(getattr(model, "fitted_last_events", ())),
+            "data_fingerprint": list(model.data_fingerprint),
+            "fitted_at": model.fitted_at.isoformat()
+        }
+        save_model(model, self._artifact_dir(key), metadata)
+    
+    def _remember(self, key, model):
+        _model_lru[key] = model
+        _model_lru.move_to_end(key)
+        while len(_model_lru) > self.config.modeling.model_lru_size:
+            _model_lru.popitem(last=False)
+    
+    def _unseen_results(self, model, df):
+        # Results dated after the last fitted day, plus late imports for that day
+        if len(df) == 0 or 'match_date' not in df.columns:
+            return df
+        newer = df['match_date'] > model.fitted_through
+        same_day = (df['match_date'] == model.fitted_through) & ~df['event_id'].isin(model.fitted_last_events)
+        return df[newer | same_day]
+    
+    def _only_added(self, model, fingerprint, new_results):
+        # An edit or delete next to the new rows would be missed by partial_fit;
+        # the counts and goal totals only add up when rows were purely appended
+        previous = getattr(model, "data_fingerprint", ())
+        if len(previous) != 4 or len(new_results) == 0:
+            return False
+        home_goals = (previous[2] or 0) + new_results['home_score'].sum()
+        away_goals = (previous[3] or 0) + new_results['away_score'].sum()
+        return (previous[0] + len(new_results) == fingerprint[0]
+                and home_goals == (fingerprint[2] or 0) and away_goals == (fingerprint[3] or 0))
+    
+    def _mark_fitted(self, model, df):
+        if len(df) == 0 or 'match_date' not in df.columns:
+            return
+        latest = df['match_date'].max()
+        events = set(df.loc[df['match_date'] == latest, 'event_id'])
+        if getattr(model, "fitted_through", None) == latest:
+            events |= model.fitted_last_events
+        model.fitted_through = latest
+        model.fitted_last_events = events
@@ -1,108 +1,457 @@
+import hashlib
+import json
 import numpy as np
 import pandas as pd
-from scipy.stats import poisson
+from scipy.optimize import minimize
 from app.models import Outcome
+from app.providers.batch import OUTCOMES
+from app.teams import get_team_registry
+
+
+MAX_GOALS = 10
+
+
+def _lookup(values, ids, default=np.nan):
+    ids = np.asarray(ids, dtype=np.int64)
+    known = (ids >= 0) & (ids < len(values))
+    out = np.full(ids.shape, default, dtype=float)
+    out[known] = values[ids[known]]
+    return out
+
+
+def _accumulate(totals, ids, weights, size):
+    grown = np.zeros(size)
+    grown[:len(totals)] = totals
+    return grown + np.bincount(ids, weights=weights, minlength=size)
+
+
+def _poisson_pmf(rates, max_goals=MAX_GOALS):
+    # P(0..max_goals) per rate, by the recurrence p(k) = p(k-1) * rate / k
+    pmf = np.empty((len(rates), max_goals + 1))
+    pmf[:, 0] = np.exp(-rates)
+    for k in range(1, max_goals + 1):
+        pmf[:, k] = pmf[:, k - 1] * rates / k
+    return pmf
+
+
+def outcome_probs(grid):
+    # Reduce score grids over the lower triangle (home wins), diagonal
+    # (draws) and upper triangle (away wins)
+    goals = np.arange(grid.shape[1])
+    probs = np.stack([
+        (grid * (goals[:, None] > goals[None, :])).sum(axis=(1, 2)),
+        np.trace(grid, axis1=1, axis2=2),
+        (grid * (goals[:, None] < goals[None, :])).sum(axis=(1, 2))
+    ], axis=1)
+    # Near-certain outcomes mean degenerate ratings rather than a real edge
+    probs[(probs > 0.99).any(axis=1)] = np.nan
+    return probs
 
 
 class SoccerModel:
+    # Whether partial_fit can fold in new results without a refit
+    supports_partial_fit = False
+    
     def fit(self, df):
         raise NotImplementedError
     
+    def partial_fit(self, df):
+        """Update the fitted model with results it has not seen yet"""
+        raise NotImplementedError
+    
     def predict_probs(self, home_team, away_team):
         raise NotImplementedError
+    
+    def num_teams(self):
+        """Number of team IDs (0..n-1) the fitted parameters cover"""
+        raise NotImplementedError
+    
+    def to_arrays(self):
+        """(JSON-safe hyperparameters and scalars, dict of NumPy arrays) for artifacts"""
+        raise NotImplementedError
+    
+    @classmethod
+    def from_arrays(cls, params, arrays):
+        raise NotImplementedError
+    
+    def fingerprint(self):
+        """Digest of the model's type, parameters and arrays.
+        
+        Computed once per fit or partial_fit, which reset it, so prediction
+        caches can tell model versions apart without rehashing the arrays.
+        """
+        if getattr(self, "_fingerprint", None) is None:
+            params, arrays = self.to_arrays()
+            digest = hashlib.sha1(self.model_type.encode())
+            digest.update(json.dumps(params, sort_keys=True).encode())
+            for name in sorted(arrays):
+                digest.update(name.encode())
+                digest.update(np.ascontiguousarray(arrays[name]).tobytes())
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+    
+    def predict_scores_batch(self, home_ids, away_ids):
+        """(fixtures x home goals x away goals) score probabilities, or None if the model has no score grid"""
+        return None
+    
+    def predict_probs_batch(self, home_ids, away_ids):
+        """(fixtures x [home, draw, away]) probabilities, NaN rows where the model has none"""
+        probs = np.full((len(home_ids), len(OUTCOMES)), np.nan)
+        for row, (home_id, away_id) in enumerate(zip(home_ids, away_ids)):
+            if home_id < 0 or away_id < 0:
+                continue
+            result = self.predict_probs(home_id, away_id)
+            if result is not None:
+                probs[row] = [result[outcome] for outcome in OUTCOMES]
+        return probs
+    
+    def _team_ids(self, df):
+        if 'home_id' in df.columns:
+            return df['home_id'].to_numpy(dtype=np.int64), df['away_id'].to_numpy(dtype=np.int64)
+        registry = get_team_registry()
+        return registry.team_ids(df['home_team']), registry.team_ids(df['away_team'])
+    
+    def _team_key(self, team):
+        # Teams may be passed as registry IDs or as any known spelling
+        if isinstance(team, str):
+            return get_team_registry().lookup(team)
+        return int(team)
+    
+    def _probs_dict(self, probs):
+        if np.isnan(probs).any():
+            return None
+        return {outcome: float(prob) for outcome, prob in zip(OUTCOMES, probs)}
 
 
 class PoissonModel(SoccerModel):
+    """Independent Poisson goals model with home/away attack and defence ratings.
+    
+    Ratings are arrays indexed by team registry ID (NaN for teams without
+    games) so a whole slate of fixtures is priced with array operations.
+    """
+    
+    model_type = "poisson"
+    supports_partial_fit = True
+    ARRAYS = (
+        "home_attack", "home_defense", "away_attack", "away_defense",
+        "home_games", "away_games", "home_scored", "home_conceded", "away_scored", "away_conceded"
+    )
+    
     def __init__(self):
-        self.home_attack = {}
-        self.home_defense = {}
-        self.away_attack = {}
-        self.away_defense = {}
+        self.home_attack = np.empty(0)
+        self.home_defense = np.empty(0)
+        self.away_attack = np.empty(0)
+        self.away_defense = np.empty(0)
         self.avg_home_goals = 0.0
         self.avg_away_goals = 0.0
+        self._reset_counts()
+    
+    def _reset_counts(self):
+        # Running per-team sums the ratings are derived from
+        self.home_games = np.zeros(0)
+        self.away_games = np.zeros(0)
+        self.home_scored = np.zeros(0)
+        self.home_conceded = np.zeros(0)
+        self.away_scored = np.zeros(0)
+        self.away_conceded = np.zeros(0)
+        self.total_home_goals = 0.0
+        self.total_away_goals = 0.0
+        self.num_matches = 0
     
     def fit(self, df):
-        self.avg_home_goals = df['home_score'].mean()
-        self.avg_away_goals = df['away_score'].mean()
+        self._reset_counts()
+        self.partial_fit(df)
+    
+    def partial_fit(self, df):
+        self._fingerprint = None
+        if len(df) == 0:
+            return
+        home_ids, away_ids = self._team_ids(df)
+        home_scores = df['home_score'].to_numpy(dtype=float)
+        away_scores = df['away_score'].to_numpy(dtype=float)
+        num_teams = max(len(self.home_games), int(max(home_ids.max(), away_ids.max())) + 1)
         
-        teams = set(df['home_team']) | set(df['away_team'])
-        for team in teams:
-            home_games = df[df['home_team'] == team]
-            away_games = df[df['away_team'] == team]
-            
-            self.home_attack[team] = home_games['home_score'].mean() / self.avg_home_goals if len(home_games) > 0 else 1.0
-            self.home_defense[team] = home_games['away_score'].mean() / self.avg_away_goals if len(home_games) > 0 else 1.0
-            self.away_attack[team] = away_games['away_score'].mean() / self.avg_away_goals if len(away_games) > 0 else 1.0
-            self.away_defense[team] = away_games['home_score'].mean() / self.avg_home_goals if len(away_games) > 0 else 1.0
+        # Per-team goal sums and game counts in one pass over the new results
+        self.home_games = _accumulate(self.home_games, home_ids, None, num_teams)
+        self.away_games = _accumulate(self.away_games, away_ids, None, num_teams)
+        self.home_scored = _accumulate(self.home_scored, home_ids, home_scores, num_teams)
+        self.home_conceded = _accumulate(self.home_conceded, home_ids, away_scores, num_teams)
+        self.away_scored = _accumulate(self.away_scored, away_ids, away_scores, num_teams)
+        self.away_conceded = _accumulate(self.away_conceded, away_ids, home_scores, num_teams)
+        self.total_home_goals += home_scores.sum()
+        self.total_away_goals += away_scores.sum()
+        self.num_matches += len(df)
+        
+        self.avg_home_goals = self.total_home_goals / self.num_matches
+        self.avg_away_goals = self.total_away_goals / self.num_matches
+        self._update_ratings()
+    
+    def _update_ratings(self):
+        home_games, away_games = self.home_games, self.away_games
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.home_attack = np.where(home_games > 0, self.home_scored / home_games / self.avg_home_goals, 1.0)
+            self.home_defense = np.where(home_games > 0, self.home_conceded / home_games / self.avg_away_goals, 1.0)
+            self.away_attack = np.where(away_games > 0, self.away_scored / away_games / self.avg_away_goals, 1.0)
+            self.away_defense = np.where(away_games > 0, self.away_conceded / away_games / self.avg_home_goals, 1.0)
+        
+        # IDs belonging to other leagues' teams have no rating at all
+        unseen = (home_games + away_games) == 0
+        for ratings in (self.home_attack, self.home_defense, self.away_attack, self.away_defense):
+            ratings[unseen] = np.nan
+    
+    def num_teams(self):
+        return len(self.home_attack)
+    
+    def to_arrays(self):
+        params = {
+            "avg_home_goals": float(self.avg_home_goals),
+            "avg_away_goals": float(self.avg_away_goals),
+            "total_home_goals": float(self.total_home_goals),
+            "total_away_goals": float(self.total_away_goals),
+            "num_matches": int(self.num_matches)
+        }
+        return params, {name: getattr(self, name) for name in self.ARRAYS}
+    
+    @classmethod
+    def from_arrays(cls, params, arrays):
+        model = cls()
+        for name, value in params.items():
+            setattr(model, name, value)
+        for name in cls.ARRAYS:
+            setattr(model, name, arrays[name])
+        return model
     
     def predict_probs(self, home_team, away_team):
-        # Check if we have data for these teams
-        if (home_team not in self.home_attack or 
-            away_team not in self.away_attack or
-            home_team not in self.away_defense or
-            away_team not in self.home_defense):
+        home_team = self._team_key(home_team)
+        away_team = self._team_key(away_team)
+        if home_team is None or away_team is None:
             return None
+        return self._probs_dict(self.predict_probs_batch([home_team], [away_team])[0])
     
-        home_expected = (self.avg_home_goals * 
-                        self.home_attack[home_team] * 
-                        self.away_defense[away_team])
-        away_expected = (self.avg_away_goals * 
-                        self.away_attack[away_team] * 
-                        self.home_defense[home_team])
-    
-        max_goals = 10
-        prob_home = 0.0
-        prob_draw = 0.0
-        prob_away = 0.0
-    
-        for h in range(max_goals + 1):
-            for a in range(max_goals + 1):
-                prob = poisson.pmf(h, home_expected) * poisson.pmf(a, away_expected)
-                if h > a:
-                    prob_home += prob
-                elif h == a:
-                    prob_draw += prob
-                else:
-                    prob_away += prob
-    
-        if prob_home > 0.99 or prob_draw > 0.99 or prob_away > 0.99:
-            return None
+    def predict_probs_batch(self, home_ids, away_ids):
+        return outcome_probs(self.predict_scores_batch(home_ids, away_ids))
     
-        return {Outcome.HOME: prob_home, Outcome.DRAW: prob_draw, Outcome.AWAY: prob_away}
+    def predict_scores_batch(self, home_ids, away_ids):
+        home_expected = (self.avg_home_goals *
+                         _lookup(self.home_attack, home_ids) *
+                         _lookup(self.away_defense, away_ids))
+        away_expected = (self.avg_away_goals *
+                         _lookup(self.away_attack, away_ids) *
+                         _lookup(self.home_defense, home_ids))
+        
+        return _poisson_pmf(home_expected)[:, :, None] * _poisson_pmf(away_expected)[:, None, :]
+
 
+class DixonColesModel(SoccerModel):
+    """Dixon-Coles (1997) model fitted by time-weighted maximum likelihood.
+    
+    Goals are Poisson with log rates ``home + attack[h] + defense[a]`` and
+    ``attack[a] + defense[h]``, with the ``rho`` correction for the 0-0,
+    1-0, 0-1 and 1-1 scores. Each match is weighted by
+    ``exp(-xi * days before the latest match)``. Teams are integer-encoded
+    so the likelihood and its gradient are a handful of array operations.
+    
+    There is no partial_fit: the time weights shift with every new match,
+    so updates are full refits, warm-started from the current ratings.
+    """
+    
+    model_type = "dixon_coles"
+    
+    def __init__(self, xi=0.0018, max_iter=200):
+        self.xi = xi
+        self.max_iter = max_iter
+        self.attack = np.empty(0)
+        self.defense = np.empty(0)
+        self.home_advantage = 0.0
+        self.rho = 0.0
+    
+    def fit(self, df):
+        home_ids, away_ids = self._team_ids(df)
+        if len(df) == 0:
+            return
+        self._fingerprint = None
+        num_teams = int(max(home_ids.max(), away_ids.max())) + 1
+        
+        # Fit over the teams actually present, then scatter back to IDs
+        teams, codes = np.unique(np.concatenate([home_ids, away_ids]), return_inverse=True)
+        home_codes, away_codes = codes[:len(df)], codes[len(df):]
+        home_goals = df['home_score'].to_numpy(dtype=float)
+        away_goals = df['away_score'].to_numpy(dtype=float)
+        weights = self._weights(df)
+        
+        n = len(teams)
+        x0 = self._initial_params(teams)
+        bounds = [(None, None)] * (2 * n + 1) + [(-0.3, 0.3)]
+        result = minimize(
+            self._neg_log_likelihood, x0,
+            args=(home_codes, away_codes, home_goals, away_goals, weights, n),
+            jac=True, method="L-BFGS-B", bounds=bounds,
+            options={"maxiter": self.max_iter}
+        )
+        
+        self.attack = np.full(num_teams, np.nan)
+        self.defense = np.full(num_teams, np.nan)
+        self.attack[teams] = result.x[:n]
+        self.defense[teams] = result.x[n:2 * n]
+        self.home_advantage = float(result.x[2 * n])
+        self.rho = float(result.x[2 * n + 1])
+    
+    def _initial_params(self, teams):
+        if len(self.attack) == 0:
+            return np.concatenate([np.zeros(2 * len(teams)), [0.25, -0.05]])
+        # Refitting: start from the previous ratings, zero for new teams
+        attack = np.nan_to_num(_lookup(self.attack, teams))
+        defense = np.nan_to_num(_lookup(self.defense, teams))
+        return np.concatenate([attack, defense, [self.home_advantage, self.rho]])
+    
+    def _weights(self, df):
+        if 'match_date' not in df.columns or self.xi == 0:
+            return np.ones(len(df))
+        dates = pd.to_datetime(df['match_date'], format='mixed', utc=True)
+        days = (dates.max() - dates).dt.total_seconds().to_numpy() / 86400
+        return np.exp(-self.xi * days)
+    
+    @staticmethod
+    def _neg_log_likelihood(params, home_codes, away_codes, home_goals, away_goals, weights, n):
+        attack, defense = params[:n], params[n:2 * n]
+        home_advantage, rho = params[2 * n], params[2 * n + 1]
+        home_rate = np.exp(home_advantage + attack[home_codes] + defense[away_codes])
+        away_rate = np.exp(attack[away_codes] + defense[home_codes])
+        
+        # Low-score correction tau and its derivatives w.r.t. the log rates and rho
+        tau = np.ones(len(weights))
+        d_home = np.zeros(len(weights))
+        d_away = np.zeros(len(weights))
+        d_rho = np.zeros(len(weights))
+        nil_nil = (home_goals == 0) & (away_goals == 0)
+        nil_one = (home_goals == 0) & (away_goals == 1)
+        one_nil = (home_goals == 1) & (away_goals == 0)
+        one_one = (home_goals == 1) & (away_goals == 1)
+        product = home_rate * away_rate
+        tau[nil_nil] = 1 - product[nil_nil] * rho
+        tau[nil_one] = 1 + home_rate[nil_one] * rho
+        tau[one_nil] = 1 + away_rate[one_nil] * rho
+        tau[one_one] = 1 - rho
+        tau = np.maximum(tau, 1e-10)
+        d_home[nil_nil] = -product[nil_nil] * rho
+        d_away[nil_nil] = -product[nil_nil] * rho
+        d_rho[nil_nil] = -product[nil_nil]
+        d_home[nil_one] = home_rate[nil_one] * rho
+        d_rho[nil_one] = home_rate[nil_one]
+        d_away[one_nil] = away_rate[one_nil] * rho
+        d_rho[one_nil] = away_rate[one_nil]
+        d_rho[one_one] = -1.0
+        
+        total = weights.sum()
+        log_likelihood = weights @ (
+            np.log(tau) + home_goals * np.log(home_rate) - home_rate + away_goals * np.log(away_rate) - away_rate
+        )
+        grad_home = weights * (home_goals - home_rate + d_home / tau)
+        grad_away = weights * (away_goals - away_rate + d_away / tau)
+        
+        grad = np.empty_like(params)
+        grad[:n] = np.bincount(home_codes, grad_home, n) + np.bincount(away_codes, grad_away, n)
+        grad[n:2 * n] = np.bincount(away_codes, grad_home, n) + np.bincount(home_codes, grad_away, n)
+        grad[2 * n] = grad_home.sum()
+        grad[2 * n + 1] = weights @ (d_rho / tau)
+        
+        # Attack ratings are only identified up to a constant; pin their sum to zero
+        penalty = attack.sum()
+        objective = -log_likelihood / total + penalty ** 2
+        grad = -grad / total
+        grad[:n] += 2 * penalty
+        return objective, grad
+    
+    def num_teams(self):
+        return len(self.attack)
+    
+    def to_arrays(self):
+        params = {
+            "xi": self.xi,
+            "max_iter": self.max_iter,
+            "home_advantage": self.home_advantage,
+            "rho": self.rho
+        }
+        return params, {"attack": self.attack, "defense": self.defense}
+    
+    @classmethod
+    def from_arrays(cls, params, arrays):
+        model = cls(xi=params["xi"], max_iter=params["max_iter"])
+        model.home_advantage = params["home_advantage"]
+        model.rho = params["rho"]
+        model.attack = arrays["attack"]
+        model.defense = arrays["defense"]
+        return model
+    
+    def predict_probs(self, home_team, away_team):
+        home_team = self._team_key(home_team)
+        away_team = self._team_key(away_team)
+        if home_team is None or away_team is None:
+            return None
+        return self._probs_dict(self.predict_probs_batch([home_team], [away_team])[0])
+    
+    def predict_probs_batch(self, home_ids, away_ids):
+        return outcome_probs(self.predict_scores_batch(home_ids, away_ids))
+    
+    def predict_scores_batch(self, home_ids, away_ids):
+        home_expected = np.exp(self.home_advantage + _lookup(self.attack, home_ids) + _lookup(self.defense, away_ids))
+        away_expected = np.exp(_lookup(self.attack, away_ids) + _lookup(self.defense, home_ids))
+        grid = _poisson_pmf(home_expected)[:, :, None] * _poisson_pmf(away_expected)[:, None, :]
+        grid[:, 0, 0] *= 1 - home_expected * away_expected * self.rho
+        grid[:, 0, 1] *= 1 + home_expected * self.rho
+        grid[:, 1, 0] *= 1 + away_expected * self.rho
+        grid[:, 1, 1] *= 1 - self.rho
+        return grid
 
 
 class EloLogisticModel(SoccerModel):
+    model_type = "elo_logistic"
+    supports_partial_fit = True
+    
     def __init__(self, k_factor=32.0):
         self.k_factor = k_factor
         self.ratings = {}
     
     def fit(self, df):
-        df = df.sort_values('match_date')
-        teams = set(df['home_team']) | set(df['away_team'])
-        for team in teams:
-            self.ratings[team] = 1500.0
+        self.ratings = {}
+        self.partial_fit(df)
+    
+    def partial_fit(self, df):
+        self._fingerprint = None
+        if 'match_date' in df.columns:
+            df = df.sort_values('match_date')
+        home_ids, away_ids = self._team_ids(df)
+        # Home win 1, draw 0.5, away win 0
+        results = (np.sign(df['home_score'].to_numpy() - df['away_score'].to_numpy()) + 1) / 2
         
-        for _, row in df.iterrows():
-            home_team = row['home_team']
-            away_team = row['away_team']
+        ratings = self.ratings
+        for home_team, away_team, result in zip(home_ids.tolist(), away_ids.tolist(), results.tolist()):
+            home_rating = ratings.setdefault(home_team, 1500.0)
+            away_rating = ratings.setdefault(away_team, 1500.0)
             
-            if row['home_score'] > row['away_score']:
-                result = 1.0
-            elif row['home_score'] < row['away_score']:
-                result = 0.0
-            else:
-                result = 0.5
-            
-            rating_diff = self.ratings[home_team] - self.ratings[away_team] + 100
+            rating_diff = home_rating - away_rating + 100
             expected = 1 / (1 + 10 ** (-rating_diff / 400))
             
-            self.ratings[home_team] += self.k_factor * (result - expected)
-            self.ratings[away_team] += self.k_factor * ((1 - result) - (1 - expected))
+            ratings[home_team] = home_rating + self.k_factor * (result - expected)
+            ratings[away_team] = away_rating + self.k_factor * ((1 - result) - (1 - expected))
+    
+    def num_teams(self):
+        return max(self.ratings, default=-1) + 1
+    
+    def to_arrays(self):
+        team_ids = np.array(sorted(self.ratings), dtype=np.int64)
+        ratings = np.array([self.ratings[team] for team in team_ids.tolist()], dtype=float)
+        return {"k_factor": self.k_factor}, {"team_ids": team_ids, "ratings": ratings}
+    
+    @classmethod
+    def from_arrays(cls, params, arrays):
+        model = cls(k_factor=params["k_factor"])
+        model.ratings = dict(zip(arrays["team_ids"].tolist(), arrays["ratings"].tolist()))
+        return model
     
     def predict_probs(self, home_team, away_team):
-        home_rating = self.ratings.get(home_team, 1500.0)
-        away_rating = self.ratings.get(away_team, 1500.0)
+        home_rating = self.ratings.get(self._team_key(home_team), 1500.0)
+        away_rating = self.ratings.get(self._team_key(away_team), 1500.0)
         rating_diff = home_rating - away_rating + 100
         prob_home_or_draw = 1 / (1 + 10 ** (-rating_diff / 400))
         prob_draw = 0.25
@@ -112,3 +461,6 @@ class EloLogisticModel(SoccerModel):
         prob_away = max(0.01, min(0.98, prob_away))
         prob_draw = 1 - prob_home - prob_away
         return {Outcome.HOME: prob_home, Outcome.DRAW: prob_draw, Outcome.AWAY: prob_away}
+
+
+MODEL_TYPES = {cls.model_type: cls for cls in (PoissonModel, DixonColesModel, EloLogisticModel)}
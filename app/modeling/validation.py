@@ -0,0 +1,93 @@
+import multiprocessing
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from app.modeling.metrics import base_rates, brier_score, fill_missing, log_loss, match_outcomes
+from app.modeling.soccer import MODEL_TYPES
+
+
+def walk_forward_splits(num_rows, folds):
+    """(train rows, test rows) pairs over time-ordered data.
+    
+    The data is cut into ``folds + 1`` consecutive blocks; fold k trains on
+    blocks 0..k-1 and tests on block k, so no model sees the future.
+    """
+    block = num_rows // (folds + 1)
+    if block == 0:
+        return []
+    splits = []
+    for k in range(1, folds + 1):
+        end = num_rows if k == folds else (k + 1) * block
+        splits.append((np.arange(k * block), np.arange(k * block, end)))
+    return splits
+
+
+def _evaluate_fold(task):
+    league, model_type, params, train, test = task
+    model = MODEL_TYPES[model_type](**params)
+    model.fit(train)
+    outcomes = match_outcomes(test['home_score'], test['away_score'])
+    probs = model.predict_probs_batch(test['home_id'].to_numpy(), test['away_id'].to_numpy())
+    train_rates = base_rates(match_outcomes(train['home_score'], train['away_score']))
+    probs, missing = fill_missing(probs, train_rates)
+    return league, model_type, len(test), log_loss(probs, outcomes), brier_score(probs, outcomes), int(missing.sum())
+
+
+class CrossValidator:
+    """Walk-forward cross-validation of candidate models, fold-parallel.
+    
+    Every (league, model, fold) fit is an independent task on a process
+    pool, so evaluating many leagues scales with the number of cores.
+    Teams must already be encoded in ``home_id``/``away_id`` columns;
+    workers never touch the team registry.
+    """
+    
+    def __init__(self, folds=5, max_workers=None):
+        self.folds = folds
+        self.max_workers = max_workers or os.cpu_count() or 1
+    
+    def evaluate(self, datasets, candidates):
+        """Score ``candidates`` ({model type: params}) on each league's results.
+        
+        ``datasets`` maps league -> results DataFrame. Returns league ->
+        model type -> {"log_loss", "brier", "n", "missing"}, averaged over
+        every test match.
+        """
+        tasks = []
+        for league, df in datasets.items():
+            df = df.sort_values('match_date', kind='stable').reset_index(drop=True)
+            for train_rows, test_rows in walk_forward_splits(len(df), self.folds):
+                train, test = df.iloc[train_rows], df.iloc[test_rows]
+                for model_type, params in candidates.items():
+                    tasks.append((league, model_type, params, train, test))
+        
+        if self.max_workers > 1 and len(tasks) > 1:
+            # Spawned workers don't inherit the event loop, DB connection or threads
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(min(self.max_workers, len(tasks)), mp_context=context) as pool:
+                results = list(pool.map(_evaluate_fold, tasks))
+        else:
+            results = [_evaluate_fold(task) for task in tasks]
+        
+        totals = defaultdict(lambda: defaultdict(lambda: np.zeros(4)))
+        for league, model_type, n, fold_log_loss, fold_brier, missing in results:
+            totals[league][model_type] += [n, fold_log_loss * n, fold_brier * n, missing]
+        
+        scores = {}
+        for league, models in totals.items():
+            scores[league] = {
+                model_type: {
+                    "log_loss": total[1] / total[0],
+                    "brier": total[2] / total[0],
+                    "n": int(total[0]),
+                    "missing": int(total[3])
+                }
+                for model_type, total in models.items()
+            }
+        return scores
+    
+    @staticmethod
+    def best(scores):
+        """Model type with the lowest log loss, Brier score breaking ties"""
+        return min(scores, key=lambda model_type: (scores[model_type]["log_loss"], scores[model_type]["brier"]))
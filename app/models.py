@@ -33,6 +33,8 @@ class RawOdds(BaseModel):
     outcome: Outcome
     price_decimal: float
     last_updated: datetime
+    home_team_id: Optional[int] = None
+    away_team_id: Optional[int] = None
     class Config:
         frozen = True
 
@@ -44,6 +46,8 @@ class NormalizedEvent(BaseModel):
     home_team: str
     away_team: str
     start_time: datetime
+    home_team_id: Optional[int] = None
+    away_team_id: Optional[int] = None
     class Config:
         frozen = True
 
@@ -100,6 +104,7 @@ class HistoricalResult(BaseModel):
 class ModelPerformance(BaseModel):
     model_name: str
     sport: Sport
+    league: Optional[str] = None
     log_loss: float
     brier_score: float
     accuracy: float
@@ -1,14 +1,43 @@
+import asyncio
+import random
 from abc import ABC, abstractmethod
 from datetime import datetime
 import httpx
 from app.models import RawOdds, Sport
+from app.providers.batch import batches_from_raw_odds
+
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class ProviderError(Exception):
+    pass
 
 
 class OddsProvider(ABC):
-    def __init__(self, timeout=10, max_retries=3):
+    def __init__(self, timeout=10, max_retries=3, max_concurrency=4,
+                 backoff_base=0.5, backoff_max=8.0):
         self.timeout = timeout
         self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.semaphore = asyncio.Semaphore(max(1, max_concurrency))
         self.client = httpx.AsyncClient(timeout=timeout)
+        self.recorder = None
+    
+    @property
+    def exhausted(self):
+        # Only finite sources such as recordings ever run out
+        return False
+    
+    @property
+    def paced(self):
+        # True for sources that deliberately sleep between responses
+        return False
+    
+    def can_hedge(self, leagues):
+        """Whether a duplicate request for ``leagues`` is affordable right now"""
+        return True
     
     @property
     @abstractmethod
@@ -16,9 +45,14 @@ class OddsProvider(ABC):
         pass
     
     @abstractmethod
-    async def fetch_odds(self, sport, leagues=None):
+    async def fetch_odds(self, sport, leagues=None, commence_from=None, commence_to=None):
         pass
     
+    async def fetch_odds_batches(self, sport, leagues=None, commence_from=None, commence_to=None):
+        # Providers without a columnar parser are adapted from their RawOdds
+        raw_odds = await self.fetch_odds(sport, leagues, commence_from, commence_to)
+        return batches_from_raw_odds(raw_odds, self.name)
+    
     @abstractmethod
     def normalize_team_name(self, name):
         pass
@@ -27,5 +61,33 @@ class OddsProvider(ABC):
     def generate_event_id(self, home_team, away_team, start_time):
         pass
     
+    async def _get(self, url, params=None):
+        # Each attempt holds a concurrency slot only while the request is in
+        # flight, so backoff sleeps don't starve other leagues.
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                async with self.semaphore:
+                    response = await asyncio.wait_for(
+                        self.client.get(url, params=params), timeout=self.timeout
+                    )
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                    response.raise_for_status()
+                    return response
+                retry_after = response.headers.get("retry-after")
+            except (httpx.TransportError, asyncio.TimeoutError):
+                if attempt >= self.max_retries:
+                    raise
+            await asyncio.sleep(self._backoff_delay(attempt, retry_after))
+    
+    def _backoff_delay(self, attempt, retry_after=None):
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        # Full jitter keeps concurrent league retries from synchronising
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+    
     async def close(self):
         await self.client.aclose()
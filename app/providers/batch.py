@@ -0,0 +1,124 @@
+from array import array
+import numpy as np
+from app.models import Outcome, RawOdds
+
+
+OUTCOMES = [Outcome.HOME, Outcome.DRAW, Outcome.AWAY]
+OUTCOME_CODES = {outcome: code for code, outcome in enumerate(OUTCOMES)}
+
+
+class OddsBatch:
+    """Columnar odds for one provider response.
+    
+    Per-event fields are stored once and referenced by ``event_codes``;
+    bookmakers are interned into ``bookmakers`` and referenced by
+    ``bookmaker_codes``; outcomes are codes into ``OUTCOMES``.
+    """
+    
+    def __init__(self, provider, sport, league, market, last_updated):
+        self.provider = provider
+        self.sport = sport
+        self.league = league
+        self.market = market
+        self.last_updated = last_updated
+        self.event_ids = []
+        self.home_teams = []
+        self.away_teams = []
+        self.home_team_ids = []
+        self.away_team_ids = []
+        self.start_times = []
+        self.bookmakers = []
+        self.event_codes = np.empty(0, dtype=np.int32)
+        self.bookmaker_codes = np.empty(0, dtype=np.int32)
+        self.outcome_codes = np.empty(0, dtype=np.int8)
+        self.prices = np.empty(0, dtype=np.float64)
+    
+    def __len__(self):
+        return len(self.prices)
+    
+    def to_raw_odds(self):
+        # Fields were already typed by the parser, so skip re-validation
+        rows = []
+        for event_code, book_code, outcome_code, price in zip(
+            self.event_codes.tolist(), self.bookmaker_codes.tolist(),
+            self.outcome_codes.tolist(), self.prices.tolist()
+        ):
+            rows.append(RawOdds.model_construct(
+                provider=self.bookmakers[book_code],
+                event_id=self.event_ids[event_code],
+                sport=self.sport,
+                league=self.league,
+                home_team=self.home_teams[event_code],
+                away_team=self.away_teams[event_code],
+                start_time=self.start_times[event_code],
+                market=self.market,
+                outcome=OUTCOMES[outcome_code],
+                price_decimal=price,
+                last_updated=self.last_updated,
+                home_team_id=self.home_team_ids[event_code],
+                away_team_id=self.away_team_ids[event_code]
+            ))
+        return rows
+
+
+class OddsBatchBuilder:
+    def __init__(self, provider, sport, league, market, last_updated):
+        self.batch = OddsBatch(provider, sport, league, market, last_updated)
+        self._bookmaker_codes = {}
+        self._event_codes = array("i")
+        self._book_codes = array("i")
+        self._outcome_codes = array("b")
+        self._prices = array("d")
+    
+    def add_event(self, event_id, home_team, away_team, start_time, home_team_id=None, away_team_id=None):
+        batch = self.batch
+        batch.event_ids.append(event_id)
+        batch.home_teams.append(home_team)
+        batch.away_teams.append(away_team)
+        batch.home_team_ids.append(home_team_id)
+        batch.away_team_ids.append(away_team_id)
+        batch.start_times.append(start_time)
+        return len(batch.event_ids) - 1
+    
+    def bookmaker_code(self, key):
+        code = self._bookmaker_codes.get(key)
+        if code is None:
+            code = len(self.batch.bookmakers)
+            self._bookmaker_codes[key] = code
+            self.batch.bookmakers.append(key)
+        return code
+    
+    def add_price(self, event_code, bookmaker_code, outcome_code, price):
+        self._event_codes.append(event_code)
+        self._book_codes.append(bookmaker_code)
+        self._outcome_codes.append(outcome_code)
+        self._prices.append(price)
+    
+    def build(self):
+        batch = self.batch
+        batch.event_codes = np.frombuffer(self._event_codes, dtype=np.int32).copy()
+        batch.bookmaker_codes = np.frombuffer(self._book_codes, dtype=np.int32).copy()
+        batch.outcome_codes = np.frombuffer(self._outcome_codes, dtype=np.int8).copy()
+        batch.prices = np.frombuffer(self._prices, dtype=np.float64).copy()
+        return batch
+
+
+def batches_from_raw_odds(raw_odds, provider=""):
+    """Group RawOdds rows into one OddsBatch per (sport, league, market)"""
+    builders = {}
+    event_codes = {}
+    for odds in raw_odds:
+        key = (odds.sport, odds.league, odds.market)
+        builder = builders.get(key)
+        if builder is None:
+            builder = builders[key] = OddsBatchBuilder(provider, odds.sport, odds.league, odds.market, odds.last_updated)
+        event_key = key + (odds.event_id,)
+        event_code = event_codes.get(event_key)
+        if event_code is None:
+            event_code = event_codes[event_key] = builder.add_event(
+                odds.event_id, odds.home_team, odds.away_team, odds.start_time,
+                odds.home_team_id, odds.away_team_id
+            )
+        builder.add_price(event_code, builder.bookmaker_code(odds.provider),
+                          OUTCOME_CODES[odds.outcome], odds.price_decimal)
+    return [builder.build() for builder in builders.values()]
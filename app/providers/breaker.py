@@ -0,0 +1,41 @@
+class CircuitBreaker:
+    """Skips a provider after repeated failures until a cooldown passes.
+    
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    ``allow`` returns False for ``cooldown`` seconds. One call is then let
+    through as a trial while every other caller is still refused: success
+    closes the breaker, failure reopens it.
+    """
+    
+    def __init__(self, failure_threshold=3, cooldown=60.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+    
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+    
+    def allow(self, now):
+        if self.opened_at is None:
+            return True
+        if self.trial or now - self.opened_at < self.cooldown:
+            return False
+        self.trial = True
+        return True
+    
+    def cancel_trial(self):
+        self.trial = False
+    
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+    
+    def record_failure(self, now):
+        self.trial = False
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = now
@@ -0,0 +1,91 @@
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+
+
+class ResponseCache:
+    """File-per-request cache of decoded provider responses.
+    
+    Entries are keyed by provider, league, regions and markets and expire
+    after the league's TTL. An entry also remembers the commence window it
+    was fetched with and is only served for windows it fully covers. When
+    the directory grows past ``max_bytes`` the least recently written
+    entries are evicted.
+    """
+    
+    def __init__(self, directory, default_ttl=60, league_ttls=None, max_bytes=50 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.default_ttl = default_ttl
+        self.league_ttls = league_ttls or {}
+        self.max_bytes = max_bytes
+    
+    def get(self, provider, league, regions, markets, commence_from=None, commence_to=None, max_age=None):
+        path = self._path(provider, league, regions, markets)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        
+        if max_age is None:
+            max_age = self.league_ttls.get(league, self.default_ttl)
+        if time.time() - entry["stored_at"] > max_age:
+            return None
+        if not self._covers(entry, commence_from, commence_to):
+            return None
+        return entry["body"]
+    
+    def put(self, provider, league, regions, markets, body, commence_from=None, commence_to=None):
+        path = self._path(provider, league, regions, markets)
+        entry = {
+            "stored_at": time.time(),
+            "provider": provider,
+            "league": league,
+            "commence_from": commence_from.isoformat() if commence_from else None,
+            "commence_to": commence_to.isoformat() if commence_to else None,
+            "body": body
+        }
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+        self._evict()
+    
+    def _path(self, provider, league, regions, markets):
+        key = "|".join([provider, league, regions, markets])
+        return self.directory / f"{hashlib.sha1(key.encode()).hexdigest()}.json"
+    
+    def _covers(self, entry, commence_from, commence_to):
+        cached_from = entry.get("commence_from")
+        cached_to = entry.get("commence_to")
+        if cached_from is not None:
+            if commence_from is None or commence_from < datetime.fromisoformat(cached_from):
+                return False
+        if cached_to is not None:
+            if commence_to is None or commence_to > datetime.fromisoformat(cached_to):
+                return False
+        return True
+    
+    def _evict(self):
+        files = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json"):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        files.sort()
+        for _, size, path in files:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
@@ -1,54 +1,122 @@
 import asyncio
-from collections import defaultdict
-from datetime import datetime
-from app.models import MarketOdds, NormalizedEvent
-from app.providers.theodds_api import TheOddsAPIProvider
+import time
+from app.config import ProviderSettings, get_config
+from app.frame import OddsFrame
+from app.providers.breaker import CircuitBreaker
+from app.providers.registry import create_providers
 
 
 class ProviderManager:
-    def __init__(self):
-        self.providers = [TheOddsAPIProvider()]
+    def __init__(self, providers=None, settings=None):
+        """``providers`` is a {key: provider} dict or a list (keyed by name).
+        
+        Settings, breakers and error messages are keyed by the registry key,
+        so two sources built from the same class stay independent.
+        """
+        if providers is None:
+            config = get_config()
+            settings = config.providers.provider_settings()
+            providers = create_providers(config)
+        elif not isinstance(providers, dict):
+            providers = {provider.name: provider for provider in providers}
+        settings = settings or {}
+        self.keys = list(providers)
+        self.providers = list(providers.values())
+        self.settings = {}
+        for key, provider in providers.items():
+            key_settings = settings.get(key, ProviderSettings())
+            if provider.paced:
+                # Recordings sleep between responses on purpose; a call
+                # timeout would cancel the wait and trip the breaker
+                key_settings = key_settings.model_copy(update={"timeout_seconds": None})
+            self.settings[key] = key_settings
+        self.breakers = {
+            key: CircuitBreaker(s.failure_threshold, s.cooldown_seconds)
+            for key, s in self.settings.items()
+        }
+    
+    @property
+    def exhausted(self):
+        return all(provider.exhausted for provider in self.providers)
     
-    async def fetch_all_odds(self, sport, leagues=None):
-        tasks = [provider.fetch_odds(sport, leagues) for provider in self.providers]
+    async def fetch_all_odds(self, sport, leagues=None, commence_from=None, commence_to=None):
+        tasks = [self._guarded_fetch(key, provider, "fetch_odds", sport, leagues, commence_from, commence_to)
+                 for key, provider in zip(self.keys, self.providers)]
         results = await asyncio.gather(*tasks, return_exceptions=True)
         all_odds = []
-        for result in results:
+        for key, result in zip(self.keys, results):
             if isinstance(result, Exception):
-                print(f"Provider error: {result}")
+                print(f"Provider error ({key}): {result!r}")
                 continue
             all_odds.extend(result)
         return all_odds
     
-    def aggregate_odds(self, raw_odds):
-        event_groups = defaultdict(list)
-        for odds in raw_odds:
-            event_groups[odds.event_id].append(odds)
-        
-        aggregated = []
-        for event_id, odds_list in event_groups.items():
-            first = odds_list[0]
-            event = NormalizedEvent(
-                event_id=event_id,
-                sport=first.sport,
-                league=first.league,
-                home_team=first.home_team,
-                away_team=first.away_team,
-                start_time=first.start_time
+    async def fetch_frame(self, sport, leagues=None, commence_from=None, commence_to=None):
+        tasks = [self._guarded_fetch(key, provider, "fetch_odds_batches", sport, leagues, commence_from, commence_to)
+                 for key, provider in zip(self.keys, self.providers)]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        batches = []
+        for key, result in zip(self.keys, results):
+            if isinstance(result, Exception):
+                print(f"Provider error ({key}): {result!r}")
+                continue
+            batches.extend(result)
+        return OddsFrame.from_batches(batches)
+    
+    async def _guarded_fetch(self, key, provider, method, sport, leagues, *args):
+        settings = self.settings[key]
+        breaker = self.breakers[key]
+        if not breaker.allow(time.monotonic()):
+            print(f"Skipping {key}: circuit open after {breaker.failures} failures")
+            return []
+        try:
+            result = await asyncio.wait_for(
+                self._hedged(provider, method, settings.hedge_after_seconds, sport, leagues, *args),
+                timeout=settings.timeout_seconds
             )
-            market_groups = defaultdict(lambda: defaultdict(dict))
-            for odds in odds_list:
-                market_groups[odds.market][odds.provider][odds.outcome] = odds.price_decimal
-            
-            for market, provider_odds in market_groups.items():
-                market_odds = MarketOdds(
-                    event=event,
-                    market=market,
-                    odds=dict(provider_odds),
-                    last_updated=datetime.now()
-                )
-                aggregated.append(market_odds)
-        return aggregated
+        except asyncio.CancelledError:
+            # Cancelled from outside: no verdict on the provider
+            breaker.cancel_trial()
+            raise
+        except Exception:
+            breaker.record_failure(time.monotonic())
+            raise
+        breaker.record_success()
+        return result
+    
+    async def _hedged(self, provider, method, hedge_after, sport, leagues, *args):
+        # If the first call is still running after hedge_after seconds, race a
+        # second identical call against it and keep whichever finishes first
+        args = (sport, leagues, *args)
+        if hedge_after is None:
+            return await getattr(provider, method)(*args)
+        tasks = []
+        try:
+            first = asyncio.ensure_future(getattr(provider, method)(*args))
+            tasks.append(first)
+            done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+            if done:
+                return first.result()
+            # A hedge is a second billed request per league
+            if not provider.can_hedge(leagues):
+                return await first
+            tasks.append(asyncio.ensure_future(getattr(provider, method)(*args)))
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+            # Both attempts failed; surface the original error
+            return first.result()
+        finally:
+            # Also reached when cancelled mid-wait, which asyncio.wait does not pass on
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+    
+    def aggregate_odds(self, raw_odds):
+        return OddsFrame.from_raw_odds(raw_odds).to_market_odds()
     
     def get_best_odds(self, market_odds, outcome):
         best_price = 0.0
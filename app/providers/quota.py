@@ -0,0 +1,133 @@
+from datetime import datetime, timezone
+
+
+class LeagueSchedule:
+    def __init__(self):
+        self.next_due = 0.0
+        self.interval = 0.0
+        self.next_kickoff = None
+        self.empty_refreshes = 0
+
+
+class QuotaScheduler:
+    """Decides which leagues to refresh so API spend follows betting value.
+    
+    Leagues with a kickoff inside ``imminent_hours`` refresh every
+    ``base_interval`` seconds; further-out leagues refresh proportionally
+    less often, and leagues with nothing in the betting window back off
+    exponentially up to ``max_interval``. All intervals are stretched if the
+    planned spend rate would use up the remaining quota before it resets
+    at the start of next month, and nothing is requested once only
+    ``reserve`` requests are left.
+    """
+    
+    def __init__(self, base_interval=300, max_interval=3600, imminent_hours=6,
+                 monthly_budget=None, reserve=0, request_cost=1):
+        self.base_interval = base_interval
+        self.max_interval = max(max_interval, base_interval)
+        self.imminent_hours = imminent_hours
+        self.monthly_budget = monthly_budget
+        self.reserve = reserve
+        self.request_cost = request_cost
+        self.remaining = None
+        self.used = None
+        self.period_end = None
+        self.leagues = {}
+    
+    def update_quota(self, headers):
+        remaining = headers.get("x-requests-remaining")
+        used = headers.get("x-requests-used")
+        try:
+            if remaining is not None:
+                self.remaining = float(remaining)
+            if used is not None:
+                self.used = float(used)
+        except ValueError:
+            pass
+    
+    def available(self):
+        available = self.remaining
+        if self.monthly_budget is not None and self.used is not None:
+            budget_left = self.monthly_budget - self.used
+            available = budget_left if available is None else min(available, budget_left)
+        return available
+    
+    def try_acquire(self, league, now):
+        """Return True and reserve quota if ``league`` should be refreshed now."""
+        schedule = self.leagues.setdefault(league, LeagueSchedule())
+        if now < schedule.next_due:
+            return False
+        self._roll_period(now)
+        available = self.available()
+        if available is not None:
+            if available - self.request_cost < self.reserve:
+                return False
+            # Assume the request is spent until the response headers say otherwise,
+            # so concurrent leagues can't all pass the same check
+            if self.remaining is not None:
+                self.remaining -= self.request_cost
+            if self.used is not None:
+                self.used += self.request_cost
+        return True
+    
+    def is_tight(self, now, cost):
+        """True if spending ``cost`` more would dip into the reserve or outpace the sustainable rate"""
+        available = self.available()
+        if available is None:
+            return False
+        return available - cost < self.reserve or self._pacing_factor(now) > 1.0
+    
+    def record_refresh(self, league, kickoffs, now):
+        """Schedule the next refresh from the in-window kickoff times just seen."""
+        schedule = self.leagues.setdefault(league, LeagueSchedule())
+        if kickoffs:
+            schedule.empty_refreshes = 0
+            schedule.next_kickoff = min(kickoffs)
+            hours_to_kickoff = max(0.0, (schedule.next_kickoff.timestamp() - now) / 3600)
+            interval = self.base_interval * max(1.0, hours_to_kickoff / self.imminent_hours)
+        else:
+            schedule.empty_refreshes += 1
+            schedule.next_kickoff = None
+            interval = self.base_interval * 2 ** schedule.empty_refreshes
+        schedule.interval = min(interval, self.max_interval)
+        delay = schedule.interval * self._pacing_factor(now)
+        schedule.next_due = now + min(delay, self._seconds_until_reset(now))
+    
+    def record_failure(self, league, now):
+        # Let a failed league retry on the next cycle rather than waiting out its interval
+        self.leagues.setdefault(league, LeagueSchedule()).next_due = now
+    
+    def _pacing_factor(self, now):
+        available = self.available()
+        if available is None:
+            return 1.0
+        spendable = available - self.reserve
+        if spendable <= 0:
+            return float("inf")
+        planned_rate = sum(
+            self.request_cost / s.interval for s in self.leagues.values() if s.interval > 0
+        )
+        sustainable_rate = spendable / max(1.0, self._seconds_until_reset(now))
+        if planned_rate <= sustainable_rate:
+            return 1.0
+        return planned_rate / sustainable_rate
+    
+    def _roll_period(self, now):
+        # Quota resets monthly; forget the old counts so requests can resume
+        if self.period_end is None:
+            self.period_end = self._reset_time(now)
+        elif now >= self.period_end:
+            self.period_end = self._reset_time(now)
+            self.remaining = None
+            self.used = None
+    
+    def _seconds_until_reset(self, now):
+        return self._reset_time(now) - now
+    
+    def _reset_time(self, now):
+        current = datetime.fromtimestamp(now, tz=timezone.utc)
+        if current.month == 12:
+            reset = datetime(current.year + 1, 1, 1, tzinfo=timezone.utc)
+        else:
+            reset = datetime(current.year, current.month + 1, 1, tzinfo=timezone.utc)
+        return reset.timestamp()
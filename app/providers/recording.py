@@ -0,0 +1,145 @@
+import asyncio
+import json
+import time
+from collections import defaultdict, deque
+from datetime import datetime
+from pathlib import Path
+from app.providers.base import ProviderError
+from app.providers.theodds_api import TheOddsAPIProvider
+
+
+RECORDED_HEADERS = ("x-requests-remaining", "x-requests-used", "x-requests-last")
+
+
+class ResponseRecorder:
+    """Appends raw provider responses to a JSON-lines file.
+    
+    Each line holds the wall-clock time the response arrived, the request
+    (minus credentials) and the decoded body, which is everything a
+    ReplayProvider needs to reproduce the run.
+    """
+    
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+    
+    def record(self, provider, league, params, response, data, commence_from=None, commence_to=None):
+        entry = {
+            "recorded_at": time.time(),
+            "provider": provider,
+            "league": league,
+            "params": {k: v for k, v in params.items() if k != "apiKey"},
+            "window": [
+                commence_from.isoformat() if commence_from else None,
+                commence_to.isoformat() if commence_to else None
+            ],
+            "status": response.status_code,
+            "headers": {k: response.headers[k] for k in RECORDED_HEADERS if k in response.headers},
+            "body": data
+        }
+        with open(self.path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+
+def load_recording(path):
+    entries = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                entries.append(json.loads(line))
+    entries.sort(key=lambda e: e["recorded_at"])
+    return entries
+
+
+class ReplayProvider(TheOddsAPIProvider):
+    """Serves a recording instead of calling the API.
+    
+    Each ``fetch_odds`` call consumes the next recorded response per
+    league, waiting until it is due relative to the first response.
+    ``speed`` scales the recorded gaps (2.0 replays twice as fast);
+    ``speed=0`` replays as fast as the pipeline can consume it. The
+    commence-time window recorded with each response is used instead of
+    the caller's, so fixtures are filtered as they were in production.
+    """
+    
+    def __init__(self, path, speed=1.0):
+        super().__init__()
+        # Every recorded response is replayed; there is no quota to manage
+        # and nothing to cache
+        self.scheduler = None
+        self.cache = None
+        self.speed = speed
+        self.entries = load_recording(path)
+        self._queues = defaultdict(deque)
+        for entry in self.entries:
+            self._queues[entry["league"]].append(entry)
+        self._recorded_start = self.entries[0]["recorded_at"] if self.entries else 0.0
+        self._replay_start = None
+    
+    @property
+    def exhausted(self):
+        return not any(self._queues.values())
+    
+    @property
+    def paced(self):
+        return self.speed > 0
+    
+    async def _fetch_league(self, league, commence_from=None, commence_to=None):
+        queue = self._queues.get(league)
+        if not queue:
+            return None
+        # Pop only once the wait is over, so a cancelled wait keeps the entry
+        entry = queue[0]
+        await self._wait_until_due(entry)
+        queue.popleft()
+        return entry["body"]
+    
+    async def fetch_odds(self, sport, leagues=None, commence_from=None, commence_to=None):
+        return await self._replay_leagues(super().fetch_odds, sport, leagues)
+    
+    async def fetch_odds_batches(self, sport, leagues=None, commence_from=None, commence_to=None):
+        return await self._replay_leagues(super().fetch_odds_batches, sport, leagues)
+    
+    async def _replay_leagues(self, fetch, sport, leagues):
+        # One league at a time, each with the window it was recorded with
+        results = []
+        attempted = failed = 0
+        for league in leagues or []:
+            if not self._queues.get(league):
+                continue
+            attempted += 1
+            try:
+                results.extend(await fetch(sport, [league], *self._recorded_window(league)))
+            except ProviderError:
+                failed += 1
+        if attempted and failed == attempted:
+            raise ProviderError(f"{self.name}: every replayed league failed")
+        return results
+    
+    def _recorded_window(self, league):
+        queue = self._queues.get(league)
+        if not queue:
+            return None, None
+        entry = queue[0]
+        if "window" in entry:
+            return tuple(self._parse_time(value) for value in entry["window"])
+        params = entry["params"]
+        return (self._parse_time(params.get("commenceTimeFrom")),
+                self._parse_time(params.get("commenceTimeTo")))
+    
+    def _parse_time(self, value):
+        if value is None:
+            return None
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    
+    async def _wait_until_due(self, entry):
+        loop = asyncio.get_running_loop()
+        if self._replay_start is None:
+            self._replay_start = loop.time()
+        if self.speed <= 0:
+            return
+        due = self._replay_start + (entry["recorded_at"] - self._recorded_start) / self.speed
+        delay = due - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
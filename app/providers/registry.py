@@ -0,0 +1,46 @@
+from importlib import import_module
+from importlib.metadata import entry_points
+
+
+ENTRY_POINT_GROUP = "evbet.providers"
+
+_registry = {
+    "the_odds_api": "app.providers.theodds_api:TheOddsAPIProvider",
+}
+
+
+def register_provider(key, provider_class):
+    _registry[key] = provider_class
+
+
+def load_object(path):
+    module_name, _, attr = path.partition(":")
+    obj = import_module(module_name)
+    for part in attr.split("."):
+        obj = getattr(obj, part)
+    return obj
+
+
+def get_provider_class(key, settings=None):
+    """Resolve a provider class from config, the built-in registry or entry points"""
+    if settings is not None and settings.class_path:
+        return load_object(settings.class_path)
+    if key in _registry:
+        provider_class = _registry[key]
+        return load_object(provider_class) if isinstance(provider_class, str) else provider_class
+    for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+        if entry_point.name == key:
+            return entry_point.load()
+    raise KeyError(f"Unknown odds provider '{key}'")
+
+
+def create_providers(config):
+    providers = {}
+    for key, settings in config.providers.provider_settings().items():
+        if not settings.enabled:
+            continue
+        try:
+            providers[key] = get_provider_class(key, settings)()
+        except Exception as e:
+            print(f"Could not load provider {key}: {e}")
+    return providers
@@ -1,8 +1,14 @@
-import re
-from datetime import datetime
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
 from app.config import get_config
 from app.models import Market, Outcome, RawOdds, Sport
-from app.providers.base import OddsProvider
+from app.providers.base import OddsProvider, ProviderError
+from app.providers.batch import OUTCOME_CODES, OddsBatchBuilder
+from app.providers.cache import ResponseCache
+from app.providers.quota import QuotaScheduler
+from app.teams import get_team_registry
 
 
 class TheOddsAPIProvider(OddsProvider):
@@ -11,50 +17,178 @@ class TheOddsAPIProvider(OddsProvider):
         return "theodds_api"
     
     def __init__(self):
-        super().__init__()
         config = get_config()
+        super().__init__(
+            timeout=config.providers.request_timeout_seconds,
+            max_retries=config.providers.max_retries,
+            max_concurrency=config.providers.max_concurrent_requests,
+            backoff_base=config.providers.retry_backoff_seconds,
+            backoff_max=config.providers.retry_backoff_max_seconds
+        )
         self.api_key = config.providers.the_odds_api_key
         self.base_url = config.providers.the_odds_api.base_url
+        self.parser = config.providers.parser
+        self.regions = "us,uk,eu"
+        self.markets = "h2h"
+        self.scheduler = None
+        if config.providers.quota_scheduling:
+            self.scheduler = QuotaScheduler(
+                base_interval=config.providers.refresh_interval_seconds,
+                max_interval=config.providers.max_refresh_interval_seconds,
+                imminent_hours=config.providers.imminent_kickoff_hours,
+                monthly_budget=config.providers.monthly_request_budget,
+                reserve=config.providers.quota_reserve,
+                # The API bills one request per region per market
+                request_cost=len(self.regions.split(",")) * len(self.markets.split(","))
+            )
+        self.cache = None
+        self.cache_max_age = None
+        if config.providers.response_cache:
+            self.cache = ResponseCache(
+                Path(config.general.cache_dir) / "responses",
+                default_ttl=config.providers.response_cache_ttl_seconds,
+                league_ttls=config.providers.response_cache_league_ttls,
+                max_bytes=int(config.providers.response_cache_max_mb * 1024 * 1024)
+            )
+        self.teams = get_team_registry()
+        self._last_data = {}
+    
+    def can_hedge(self, leagues):
+        if self.scheduler is None:
+            return True
+        return not self.scheduler.is_tight(time.time(), self.scheduler.request_cost * len(leagues or []))
     
-    async def fetch_odds(self, sport, leagues=None):
+    async def fetch_odds(self, sport, leagues=None, commence_from=None, commence_to=None):
+        """RawOdds for ``leagues``, decoded by the configured ``parser``.
+        
+        The columnar parser only pays off through ``fetch_odds_batches``,
+        which the scanner always uses; here its batches still have to be
+        expanded back into RawOdds, so "objects" is the cheaper choice.
+        """
         all_odds = []
         
         if not leagues:
             return all_odds
         
-        for league in leagues:
-            url = f"{self.base_url}/sports/{league}/odds"
-            params = {
-                "apiKey": self.api_key,
-                "regions": "us,uk,eu",
-                "markets": "h2h",
-                "oddsFormat": "decimal"
-            }
-            
-            try:
-                response = await self.client.get(url, params=params)
-                response.raise_for_status()
-                data = response.json()
-                
-                odds = self._parse_response(data, sport, league)
-                all_odds.extend(odds)
-            except Exception as e:
-                print(f"Error fetching {league}: {e}")
+        if self.parser == "columnar":
+            batches = await self.fetch_odds_batches(sport, leagues, commence_from, commence_to)
+            for batch in batches:
+                all_odds.extend(batch.to_raw_odds())
+            return all_odds
+        
+        results = await self._gather_league_data(leagues, commence_from, commence_to)
+        for league, data in zip(leagues, results):
+            if data is not None:
+                all_odds.extend(self._parse_response(data, sport, league, commence_from, commence_to))
         
         return all_odds
     
-    def _parse_response(self, data, sport, league):
+    async def fetch_odds_batches(self, sport, leagues=None, commence_from=None, commence_to=None):
+        if not leagues:
+            return []
+        
+        results = await self._gather_league_data(leagues, commence_from, commence_to)
+        return [
+            self._parse_response_batch(data, sport, league, commence_from, commence_to)
+            for league, data in zip(leagues, results) if data is not None
+        ]
+    
+    async def _gather_league_data(self, leagues, commence_from=None, commence_to=None):
+        results = await asyncio.gather(*[
+            self._league_data(league, commence_from, commence_to) for league in leagues
+        ])
+        # Individual league errors are tolerated, but a provider that returned
+        # nothing at all has failed and should count against its circuit breaker
+        if all(data is None for data in results):
+            raise ProviderError(f"{self.name}: no league could be fetched")
+        return results
+    
+    async def _league_data(self, league, commence_from=None, commence_to=None):
+        if self.cache is not None:
+            data = self.cache.get(self.name, league, self.regions, self.markets,
+                                  commence_from, commence_to, max_age=self.cache_max_age)
+            if data is not None:
+                return data
+        
+        if self.scheduler is None:
+            return await self._fetch_league(league, commence_from, commence_to)
+        
+        # Leagues that aren't due are served from their last response so
+        # their markets stay visible (and unchanged) to incremental scans
+        now = time.time()
+        if not self.scheduler.try_acquire(league, now):
+            return self._last_data.get(league)
+        
+        data = await self._fetch_league(league, commence_from, commence_to)
+        if data is None:
+            self.scheduler.record_failure(league, now)
+            return self._last_data.get(league)
+        
+        kickoffs = []
+        for event in data:
+            start_time = datetime.fromisoformat(event["commence_time"].replace("Z", "+00:00"))
+            if commence_from is not None and start_time < commence_from:
+                continue
+            if commence_to is not None and start_time > commence_to:
+                continue
+            kickoffs.append(start_time)
+        self.scheduler.record_refresh(league, kickoffs, now)
+        self._last_data[league] = data
+        return data
+    
+    async def _fetch_league(self, league, commence_from=None, commence_to=None):
+        url = f"{self.base_url}/sports/{league}/odds"
+        params = {
+            "apiKey": self.api_key,
+            "regions": self.regions,
+            "markets": self.markets,
+            "oddsFormat": "decimal"
+        }
+        # Widen the requested window to whole hours so a cached response keeps
+        # covering the moving scan window; parsing re-applies the exact one
+        request_from = request_to = None
+        if commence_from is not None:
+            request_from = self._floor_hour(commence_from)
+            params["commenceTimeFrom"] = self._format_commence_time(request_from)
+        if commence_to is not None:
+            request_to = self._floor_hour(commence_to)
+            if request_to < commence_to:
+                request_to += timedelta(hours=1)
+            params["commenceTimeTo"] = self._format_commence_time(request_to)
+        
+        try:
+            response = await self._get(url, params=params)
+            data = response.json()
+            if self.scheduler is not None:
+                self.scheduler.update_quota(response.headers)
+            if self.cache is not None:
+                self.cache.put(self.name, league, self.regions, self.markets, data,
+                               request_from, request_to)
+            if self.recorder is not None:
+                self.recorder.record(self.name, league, params, response, data,
+                                     commence_from, commence_to)
+            return data
+        except Exception as e:
+            print(f"Error fetching {league}: {e}")
+            return None
+    
+    def _parse_response(self, data, sport, league, commence_from=None, commence_to=None):
         all_odds = []
         
         for event in data:
-            event_id = self.generate_event_id(
-                event["home_team"],
-                event["away_team"],
-                datetime.fromisoformat(event["commence_time"].replace("Z", "+00:00"))
-            )
-            
             start_time = datetime.fromisoformat(event["commence_time"].replace("Z", "+00:00"))
             
+            # The API truncates the window to whole seconds, so re-check it
+            # here before building any per-bookmaker objects
+            if commence_from is not None and start_time < commence_from:
+                continue
+            if commence_to is not None and start_time > commence_to:
+                continue
+            
+            event_id = self.generate_event_id(event["home_team"], event["away_team"], start_time)
+            home_team_id = self.teams.team_id(event["home_team"])
+            away_team_id = self.teams.team_id(event["away_team"])
+            
             for bookmaker in event.get("bookmakers", []):
                 for market in bookmaker.get("markets", []):
                     if market["key"] != "h2h":
@@ -86,34 +220,74 @@ class TheOddsAPIProvider(OddsProvider):
                             market=market_type,
                             outcome=outcome_enum,
                             price_decimal=price,
-                            last_updated=datetime.now()
+                            last_updated=datetime.now(),
+                            home_team_id=home_team_id,
+                            away_team_id=away_team_id
                         )
                         all_odds.append(odds)
         
         return all_odds
     
-    def normalize_team_name(self, name):
-        # Convert to lowercase and remove common variations
-        normalized = name.lower()
-    
-        # Remove common words that vary
-        normalized = normalized.replace(' fc', '')
-        normalized = normalized.replace(' afc', '')
-        normalized = normalized.replace(' united', '')
-        normalized = normalized.replace(' city', '')
-        normalized = normalized.replace('manchester', 'man')
-        normalized = normalized.replace('tottenham', 'spurs')
+    def _parse_response_batch(self, data, sport, league, commence_from=None, commence_to=None):
+        market_type = Market.MATCH_WINNER if sport == Sport.SOCCER else Market.MONEYLINE
+        builder = OddsBatchBuilder(self.name, sport, league, market_type, datetime.now())
+        draw_code = OUTCOME_CODES[Outcome.DRAW]
+        
+        for event in data:
+            start_time = datetime.fromisoformat(event["commence_time"].replace("Z", "+00:00"))
+            if commence_from is not None and start_time < commence_from:
+                continue
+            if commence_to is not None and start_time > commence_to:
+                continue
+            
+            home_name = event["home_team"]
+            away_name = event["away_team"]
+            home_team = self.normalize_team_name(home_name)
+            away_team = self.normalize_team_name(away_name)
+            event_code = builder.add_event(
+                self._event_id(home_team, away_team, start_time), home_team, away_team, start_time,
+                self.teams.team_id(home_team), self.teams.team_id(away_team)
+            )
+            outcome_codes = {
+                home_name: OUTCOME_CODES[Outcome.HOME],
+                away_name: OUTCOME_CODES[Outcome.AWAY]
+            }
+            
+            for bookmaker in event.get("bookmakers", []):
+                book_code = None
+                for market in bookmaker.get("markets", []):
+                    if market["key"] != "h2h":
+                        continue
+                    if book_code is None:
+                        book_code = builder.bookmaker_code(bookmaker["key"])
+                    for outcome in market.get("outcomes", []):
+                        outcome_name = outcome["name"]
+                        outcome_code = outcome_codes.get(outcome_name)
+                        if outcome_code is None:
+                            if outcome_name.lower() != "draw":
+                                continue
+                            outcome_code = draw_code
+                        builder.add_price(event_code, book_code, outcome_code, outcome["price"])
+        
+        return builder.build()
     
-        # Remove all non-alphanumeric except spaces
-        normalized = ''.join(c for c in normalized if c.isalnum() or c.isspace())
+    def _floor_hour(self, dt):
+        return dt.replace(minute=0, second=0, microsecond=0)
     
-        # Remove extra spaces
-        normalized = ' '.join(normalized.split())
+    def _format_commence_time(self, dt):
+        # The API only accepts whole-second UTC timestamps with a Z suffix
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
     
-        return normalized
+    def normalize_team_name(self, name):
+        return self.teams.canonical(name)
     
     def generate_event_id(self, home_team, away_team, start_time):
         home_norm = self.normalize_team_name(home_team)
         away_norm = self.normalize_team_name(away_team)
+        return self._event_id(home_norm, away_norm, start_time)
+    
+    def _event_id(self, home_norm, away_norm, start_time):
         date_str = start_time.strftime("%Y%m%d")
         return f"{home_norm}_{away_norm}_{date_str}"
\ No newline at end of file
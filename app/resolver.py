@@ -0,0 +1,127 @@
+import json
+import math
+import os
+from collections import Counter, defaultdict
+from pathlib import Path
+from app.teams import clean_team_name
+
+
+def _ngrams(name, n=3):
+    padded = f"  {name} "
+    return Counter(padded[i:i + n] for i in range(len(padded) - n + 1))
+
+
+class TeamNameIndex:
+    """Character trigram TF-IDF index over a fixed set of team names.
+    
+    Queries only touch the posting lists of their own trigrams, so lookup
+    cost depends on the query length rather than the number of teams.
+    """
+    
+    def __init__(self, names):
+        self.names = sorted(set(names))
+        self._known = set(self.names)
+        document_grams = [_ngrams(clean_team_name(name)) for name in self.names]
+        doc_freq = Counter(gram for grams in document_grams for gram in grams)
+        total = len(self.names)
+        self.idf = {gram: math.log((1 + total) / (1 + df)) + 1.0 for gram, df in doc_freq.items()}
+        self.postings = defaultdict(list)
+        for idx, grams in enumerate(document_grams):
+            weights = {gram: count * self.idf[gram] for gram, count in grams.items()}
+            norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+            for gram, weight in weights.items():
+                self.postings[gram].append((idx, weight / norm))
+    
+    def __contains__(self, name):
+        return name in self._known
+    
+    def search(self, name, limit=2):
+        grams = _ngrams(clean_team_name(name))
+        weights = {gram: count * self.idf[gram] for gram, count in grams.items() if gram in self.idf}
+        # Grams never seen in the index still count towards the query norm
+        norm = math.sqrt(sum((count * self.idf.get(gram, 1.0)) ** 2 for gram, count in grams.items())) or 1.0
+        scores = defaultdict(float)
+        for gram, weight in weights.items():
+            for idx, doc_weight in self.postings[gram]:
+                scores[idx] += weight * doc_weight
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [(self.names[idx], score / norm) for idx, score in best]
+
+
+class FuzzyTeamResolver:
+    """Resolves provider team names that exact normalization missed.
+    
+    Each unknown name is matched against the historical team names once.
+    Accepted matches are persisted with their score, and added to the team
+    registry as aliases, so later scans resolve them with a dict lookup.
+    Rejections are only remembered until the sport's known names change,
+    so a team that gains history gets another chance.
+    """
+    
+    def __init__(self, registry, path=None, threshold=0.6, margin=0.05):
+        self.registry = registry
+        self.path = Path(path) if path else None
+        self.threshold = threshold
+        self.margin = margin
+        self.indexes = {}
+        self.learned = {}
+        self.rejected = {}
+        self.recovered = Counter()
+        self._load()
+    
+    def set_known_names(self, sport, names):
+        self.indexes[sport] = TeamNameIndex(self.registry.canonical(name) for name in names)
+        self.rejected.pop(sport, None)
+    
+    def resolve(self, sport, name):
+        """Return the historical team ``name`` refers to, or None"""
+        index = self.indexes.get(sport)
+        canonical = self.registry.canonical(name)
+        if index is None or not index.names or canonical in index:
+            return canonical
+        
+        key = f"{sport.value}:{canonical}"
+        if key in self.learned:
+            return self.learned[key]["team"]
+        rejected = self.rejected.setdefault(sport, set())
+        if canonical in rejected:
+            return None
+        
+        matches = index.search(canonical)
+        team = None
+        score = matches[0][1] if matches else 0.0
+        if matches and score >= self.threshold:
+            runner_up = matches[1][1] if len(matches) > 1 else 0.0
+            if score - runner_up >= self.margin:
+                team = matches[0][0]
+        if team is None:
+            rejected.add(canonical)
+            return None
+        self.learned[key] = {"name": name, "team": team, "score": round(score, 4)}
+        self.registry.add_alias(canonical, team)
+        self._save()
+        return team
+    
+    def record_recovery(self, name, team):
+        self.recovered[(name, team)] += 1
+    
+    def recovery_report(self):
+        """(provider name, resolved team, fixtures recovered), most useful first"""
+        return [(name, team, count) for (name, team), count in self.recovered.most_common()]
+    
+    def _load(self):
+        if self.path is None or not self.path.exists():
+            return
+        with open(self.path) as f:
+            learned = json.load(f)
+        # Older files also stored rejections
+        self.learned = {key: entry for key, entry in learned.items() if entry.get("team") is not None}
+    
+    def _save(self):
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.learned, f, indent=1)
+        os.replace(tmp_path, self.path)
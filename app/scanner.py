@@ -1,116 +1,229 @@
 import asyncio
 from datetime import datetime, timedelta
 from pathlib import Path
+import numpy as np
 import pandas as pd
 import pytz
 from app.config import get_config
 from app.database import get_db
-from app.devig import Devigger
-from app.models import Outcome, Sport, ValueBet
+from app.engine import ValueBetEngine
+from app.frame import OddsFrame
+from app.models import Sport
+from app.modeling.cache import PredictionCache
 from app.modeling.selector import ModelSelector
+from app.providers.batch import OUTCOMES
 from app.providers.manager import ProviderManager
+from app.resolver import FuzzyTeamResolver
+from app.snapshots import OddsSnapshotStore
+from app.teams import get_team_registry
+from app.writer import BackgroundWriter
+
+
+SPORTS = [Sport.SOCCER, Sport.BASKETBALL, Sport.FOOTBALL]
 
 
 class ValueBetScanner:
-    def __init__(self):
+    def __init__(self, provider_manager=None):
         self.config = get_config()
         self.db = get_db()
-        self.provider_manager = ProviderManager()
+        self.provider_manager = provider_manager or ProviderManager()
         self.model_selector = ModelSelector()
-        self.devigger = Devigger()
+        self.engine = ValueBetEngine()
+        self.predictions = PredictionCache(self.config.modeling.prediction_cache_size)
+        self.snapshots = OddsSnapshotStore(self.db) if self.config.database.odds_snapshots else None
+        self.writer = BackgroundWriter(self.db, self.snapshots)
+        self.resolver = None
+        if self.config.teams.fuzzy_matching:
+            self.resolver = FuzzyTeamResolver(
+                get_team_registry(),
+                Path(self.config.general.cache_dir) / "learned_aliases.json",
+                threshold=self.config.teams.fuzzy_threshold,
+                margin=self.config.teams.fuzzy_margin
+            )
+        self._resolver_fingerprints = {}
+        self._selections = {}
+        self._market_prices = {}
+        self._emitted = {}
     
     async def scan(self):
         value_bets = []
-        tz = pytz.timezone(self.config.general.timezone)
-        now = datetime.now(tz)
-        min_start = now + timedelta(hours=self.config.filters.min_hours_ahead)
-        max_start = now + timedelta(hours=self.config.filters.max_hours_ahead)
+        tz, min_start, max_start = self._scan_window()
         
-        sports = [Sport.SOCCER, Sport.BASKETBALL, Sport.FOOTBALL]
+        for sport in SPORTS:
+            frame = await self._fetch_frame(sport, min_start, max_start)
+            if not len(frame):
+                continue
+            
+            value_bets.extend(self._evaluate_frame(frame, range(len(frame)), sport, tz))
         
-        for sport in sports:
-            leagues = self.config.leagues.soccer
-            if not leagues:
+        await self.writer.put_value_bets(value_bets)
+        self._report_resolutions()
+        value_bets.sort(key=lambda x: (x.ev, x.edge_pct), reverse=True)
+        return value_bets
+    
+    async def scan_changes(self):
+        """Run one incremental cycle, returning only new or changed value bets.
+        
+        Markets whose prices are identical to the previous cycle are skipped
+        entirely, so a quiet cycle costs one fetch and a dict comparison.
+        """
+        changed = []
+        seen = set()
+        tz, min_start, max_start = self._scan_window()
+        
+        for sport in SPORTS:
+            frame = await self._fetch_frame(sport, min_start, max_start)
+            if not len(frame):
                 continue
             
-            print(f"\nScanning {sport.value}...")
-            raw_odds = await self.provider_manager.fetch_all_odds(sport, leagues)
+            changed_rows = []
+            changed_keys = set()
+            for row in range(len(frame)):
+                market_key = (frame.event_ids[row], frame.markets[row])
+                seen.add(market_key)
+                signature = frame.signature(row)
+                if self._market_prices.get(market_key) == signature:
+                    continue
+                self._market_prices[market_key] = signature
+                changed_rows.append(row)
+                changed_keys.add(market_key)
             
-            if not raw_odds:
-                print("No odds found")
-                continue
+            current = {}
+            for value_bet in self._evaluate_frame(frame, changed_rows, sport, tz):
+                bet_key = (value_bet.event_id, value_bet.market, value_bet.outcome)
+                current[bet_key] = (value_bet.bookmaker, value_bet.price_decimal, value_bet.model_prob)
+                if self._emitted.get(bet_key) != current[bet_key]:
+                    changed.append(value_bet)
             
-            market_odds_list = self.provider_manager.aggregate_odds(raw_odds)
-            model = self.model_selector.get_model_for_sport(sport)
+            # Forget outcomes of repriced markets that stopped qualifying so
+            # they are reported again if they come back
+            for bet_key in [k for k in self._emitted if k[:2] in changed_keys and k not in current]:
+                del self._emitted[bet_key]
+            self._emitted.update(current)
+        
+        for market_key in [k for k in self._market_prices if k not in seen]:
+            del self._market_prices[market_key]
+        for bet_key in [k for k in self._emitted if k[:2] not in seen]:
+            del self._emitted[bet_key]
+        
+        await self.writer.put_value_bets(changed)
+        self._report_resolutions()
+        changed.sort(key=lambda x: (x.ev, x.edge_pct), reverse=True)
+        return changed
+    
+    async def watch(self, interval=None):
+        """Poll forever, yielding the list of new or changed value bets per cycle"""
+        if interval is None:
+            interval = self.config.providers.refresh_interval_seconds
+        loop = asyncio.get_running_loop()
+        while not self.provider_manager.exhausted:
+            started = loop.time()
+            yield await self.scan_changes()
+            await asyncio.sleep(max(0.0, interval - (loop.time() - started)))
+    
+    def _scan_window(self):
+        tz = pytz.timezone(self.config.general.timezone)
+        now = datetime.now(tz)
+        min_start = now + timedelta(hours=self.config.filters.min_hours_ahead)
+        max_start = now + timedelta(hours=self.config.filters.max_hours_ahead)
+        return tz, min_start, max_start
+    
+    def _get_model(self, sport, league):
+        # The selector's cache makes this cheap until new results are imported
+        if self.resolver is not None:
+            # Rebuild the name index (and retry rejected names) once new results arrive
+            fingerprint = self.db.get_results_fingerprint(sport.value)
+            if self._resolver_fingerprints.get(sport) != fingerprint:
+                self.resolver.set_known_names(sport, self.db.get_team_names(sport.value))
+                self._resolver_fingerprints[sport] = fingerprint
+        if self.model_selector.needs_selection(sport, league):
+            self._select_in_background(sport, league)
+        return self.model_selector.get_model_for_sport(sport, league)
+    
+    def _select_in_background(self, sport, league):
+        # Cross-validation can take minutes; scans keep the last choice until it finishes
+        task = self._selections.get((sport, league))
+        if task is None or task.done():
+            self._selections[(sport, league)] = asyncio.get_running_loop().create_task(
+                asyncio.to_thread(self.model_selector.select_models, sport, [league])
+            )
+    
+    def _model_probs(self, model, frame, row):
+        sport = frame.sports[row]
+        home_name, away_name = frame.home_teams[row], frame.away_teams[row]
+        home_id, away_id = frame.home_team_ids[row], frame.away_team_ids[row]
+        try:
+            model_probs = model.predict_probs(
+                home_name if home_id < 0 else home_id,
+                away_name if away_id < 0 else away_id
+            )
+            if model_probs is not None or self.resolver is None:
+                return model_probs
             
-            for market_odds in market_odds_list:
-                event = market_odds.event
-                try:
-                    model_probs = model.predict_probs(event.home_team, event.away_team)
-                    if model_probs is None:
-                        continue
-                except:
-                    continue
-                
-                for outcome in [Outcome.HOME, Outcome.DRAW, Outcome.AWAY]:
-                    if outcome not in model_probs:
-                        continue
-                    
-                    model_prob = model_probs[outcome]
-                    best = self.provider_manager.get_best_odds(market_odds, outcome)
-                    if not best:
-                        continue
-                    
-                    best_provider, best_price = best
-                    devigged = self.devigger.devig_market(market_odds, best_provider)
-                    if not devigged or outcome not in devigged.devigged_probs:
-                        continue
-                    
-                    market_prob = devigged.devigged_probs[outcome]
-                    edge = model_prob - market_prob
-                    edge_pct = (edge / market_prob) * 100 if market_prob > 0 else 0
-                    ev = (model_prob * best_price) - 1
-                    
-                    if edge_pct < self.config.filters.min_edge_pct or ev <= self.config.filters.min_ev:
-                        continue
-                    
-                    kelly = self._calculate_kelly_stake(model_prob, best_price)
-                    
-                    value_bet = ValueBet(
-                        event_id=event.event_id,
-                        league=event.league,
-                        home_team=event.home_team,
-                        away_team=event.away_team,
-                        start_time_local=event.start_time.astimezone(tz),
-                        bookmaker=best_provider,
-                        market=market_odds.market,
-                        outcome=outcome,
-                        price_decimal=best_price,
-                        model_prob=model_prob,
-                        market_prob_devig=market_prob,
-                        edge_pct=edge_pct,
-                        ev=ev,
-                        kelly_stake=kelly
-                    )
-                    
-                    value_bets.append(value_bet)
-                    self.db.save_value_bet(value_bet)
+            # Exact normalization missed; retry with fuzzy-resolved names
+            home_team = self.resolver.resolve(sport, home_name)
+            away_team = self.resolver.resolve(sport, away_name)
+            if home_team is None or away_team is None:
+                return None
+            if (home_team, away_team) == (home_name, away_name):
+                return None
+            model_probs = model.predict_probs(home_team, away_team)
+            if model_probs is not None:
+                for name, team in ((home_name, home_team), (away_name, away_team)):
+                    if name != team:
+                        self.resolver.record_recovery(name, team)
+            return model_probs
+        except:
+            return None
+    
+    def _report_resolutions(self):
+        if self.resolver is None or not self.resolver.recovered:
+            return
+        for name, team, count in self.resolver.recovery_report():
+            print(f"  Resolved '{name}' -> '{team}' ({count} fixtures recovered)")
+        self.resolver.recovered.clear()
+    
+    async def _fetch_frame(self, sport, min_start, max_start):
+        leagues = getattr(self.config.leagues, sport.value, [])
+        if not leagues:
+            return OddsFrame.empty()
         
-        value_bets.sort(key=lambda x: (x.ev, x.edge_pct), reverse=True)
-        return value_bets
+        print(f"\nScanning {sport.value}...")
+        frame = await self.provider_manager.fetch_frame(sport, leagues, min_start, max_start)
+        
+        if not len(frame):
+            print("No odds found")
+        else:
+            await self.writer.put_snapshot(frame)
+        
+        return frame
     
-    def _calculate_kelly_stake(self, true_prob, odds):
-        b = odds - 1
-        p = true_prob
-        q = 1 - p
-        if b <= 0 or p <= 0:
-            return 0.0
-        kelly_fraction = (b * p - q) / b
-        kelly_fraction *= self.config.betting.kelly_fraction
-        kelly_fraction = min(kelly_fraction, self.config.betting.kelly_cap)
-        kelly_fraction = max(kelly_fraction, 0.0)
-        stake = self.config.betting.bankroll * kelly_fraction
-        return round(stake, 2)
+    def _evaluate_frame(self, frame, rows, sport, tz):
+        if not len(rows):
+            return []
+        if len(rows) < len(frame):
+            frame = frame.take(rows)
+        
+        model_probs = np.full((len(frame), len(OUTCOMES)), np.nan)
+        for league in np.unique(frame.leagues):
+            model = self._get_model(sport, league)
+            if model is None:
+                continue
+            league_rows = np.flatnonzero(frame.leagues == league)
+            model_probs[league_rows] = self.predictions.predict_probs_batch(
+                model, frame.home_team_ids[league_rows], frame.away_team_ids[league_rows]
+            )
+            # Fixtures the batch could not price go through name and fuzzy matching
+            for row in league_rows[np.isnan(model_probs[league_rows]).all(axis=1)]:
+                probs = self._model_probs(model, frame, row)
+                if probs is None:
+                    continue
+                for k, outcome in enumerate(OUTCOMES):
+                    if outcome in probs:
+                        model_probs[row, k] = probs[outcome]
+        
+        evaluation = self.engine.evaluate(frame, model_probs)
+        return self.engine.value_bets(frame, evaluation, tz)
     
     def export_to_csv(self, value_bets, filename="value_bets.csv"):
         if not value_bets:
@@ -141,4 +254,6 @@ class ValueBetScanner:
         print(f"\nExported {len(value_bets)} value bets to {output_path}")
     
     async def close(self):
+        await asyncio.gather(*self._selections.values(), return_exceptions=True)
         await self.provider_manager.close_all()
+        await asyncio.to_thread(self.writer.close)
@@ -0,0 +1,355 @@
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import pandas as pd
+from app.config import get_config
+from app.database import get_db
+from app.frame import OddsFrame
+from app.providers.batch import OUTCOMES
+
+
+PARTITION_PREFIX = "odds_snapshots_"
+COMPACTIONS_TABLE = "odds_snapshot_compactions"
+SNAPSHOT_COLUMNS = ["provider", "event_id", "market", "outcome", "price_decimal", "captured_at"]
+KEY_COLUMNS = ["provider", "event_id", "market", "outcome"]
+
+
+def _value(item):
+    return getattr(item, "value", item)
+
+
+def _utc(when):
+    """Naive UTC datetime; naive inputs are taken to be UTC already"""
+    if when.tzinfo is not None:
+        when = when.astimezone(timezone.utc).replace(tzinfo=None)
+    return when
+
+
+def _stamp(when):
+    # Fixed-width so timestamps sort as text and SQLite's date functions parse them
+    return _utc(when).isoformat(sep=" ", timespec="milliseconds")
+
+
+def _partition_day(table):
+    return datetime.strptime(table[len(PARTITION_PREFIX):], "%Y%m%d").date()
+
+
+class OddsSnapshotStore:
+    """Append-only odds history, one table per UTC day.
+    
+    A price is appended only when it differs from the latest known price
+    of the same (provider, event, market, outcome), so a quiet poll writes
+    nothing and an event's line movement is just its changed prices.
+    ``raw_odds`` holds that latest state and doubles as the event
+    metadata (teams, start time) for the history.
+    
+    Each new day table starts with a copy of the latest prices of events
+    that have not kicked off, stamped at midnight, so the price in effect
+    at any moment can be read from that moment's day table alone.
+    """
+    
+    def __init__(self, db=None):
+        self.db = db or get_db()
+        self.config = get_config().database
+        self._latest = None
+        self._tables = set()
+    
+    def record(self, odds, captured_at=None):
+        """Append the changed prices of an OddsFrame or iterable of RawOdds.
+        
+        Returns {"changed", "unchanged"} price counts.
+        """
+        captured_at = _utc(captured_at or datetime.now(timezone.utc))
+        if isinstance(odds, OddsFrame):
+            rows = self._rows_from_frame(odds)
+        else:
+            rows = [self._row_from_odds(item) for item in odds]
+        
+        latest = self._latest_prices()
+        pending = {}
+        changed = []
+        for row in rows:
+            key = (row[0], row[1], row[7], row[8])
+            if pending.get(key, latest.get(key)) == row[9]:
+                continue
+            pending[key] = row[9]
+            changed.append(row)
+        
+        if changed:
+            table = self._partition(captured_at.date())
+            stamp = _stamp(captured_at)
+            batch_size = max(1, self.config.batch_size)
+            cursor = self.db.conn.cursor()
+            with self.db.conn:
+                for start in range(0, len(changed), batch_size):
+                    batch = changed[start:start + batch_size]
+                    cursor.executemany(f"""
+                        INSERT INTO {table} (provider, event_id, market, outcome, price_decimal, captured_at)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                    """, [(row[0], row[1], row[7], row[8], row[9], stamp) for row in batch])
+                    cursor.executemany("""
+                        INSERT OR REPLACE INTO raw_odds
+                        (provider, event_id, sport, league, home_team, away_team,
+                         start_time, market, outcome, price_decimal, last_updated)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """, batch)
+            latest.update(pending)
+        return {"changed": len(changed), "unchanged": len(rows) - len(changed)}
+    
+    def history(self, event_id=None, provider=None, market=None, outcome=None, start=None, end=None):
+        """Recorded price changes in time order.
+        
+        ``event_id`` and ``provider`` may be a single value or a list.
+        ``start``/``end`` bound ``captured_at`` and limit which day tables
+        are read at all. With ``start``, the price each key had at ``start``
+        is included too, with the time it was captured.
+        """
+        conditions = []
+        params = []
+        for column, value in (("event_id", event_id), ("provider", provider),
+                              ("market", market), ("outcome", outcome)):
+            if value is None:
+                continue
+            values = [_value(v) for v in value] if isinstance(value, (list, tuple, set)) else [_value(value)]
+            conditions.append(f"{column} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+        key_conditions, key_params = list(conditions), list(params)
+        if start is not None:
+            conditions.append("captured_at >= ?")
+            params.append(_stamp(start))
+        if end is not None:
+            conditions.append("captured_at <= ?")
+            params.append(_stamp(end))
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        
+        frames = []
+        with self.db.reader() as conn:
+            tables = self.partitions(start, end, conn)
+            if start is not None and tables and _partition_day(tables[0]) == _utc(start).date():
+                # The day's seed guarantees every live key has a row before start
+                before = " AND ".join(key_conditions + ["captured_at < ?"])
+                prior = pd.read_sql_query(
+                    f"SELECT {', '.join(SNAPSHOT_COLUMNS)} FROM {tables[0]} WHERE {before} ORDER BY rowid",
+                    conn, params=key_params + [_stamp(start)]
+                )
+                frames.append(prior.groupby(KEY_COLUMNS, as_index=False, sort=False).last())
+            for table in tables:
+                frames.append(pd.read_sql_query(
+                    f"SELECT {', '.join(SNAPSHOT_COLUMNS)} FROM {table}{where}", conn, params=params
+                ))
+        frames = [frame for frame in frames if len(frame)]
+        if not frames:
+            return pd.DataFrame(columns=SNAPSHOT_COLUMNS)
+        df = pd.concat(frames, ignore_index=True)
+        df['captured_at'] = pd.to_datetime(df['captured_at'], utc=True)
+        return df.sort_values('captured_at', kind='stable').reset_index(drop=True)
+    
+    def line_movement(self, event_id, market=None):
+        """Opening, closing, low and high price and number of moves per bookmaker and outcome"""
+        df = self.history(event_id, market=market)
+        if not len(df):
+            return pd.DataFrame(columns=KEY_COLUMNS + ["opening", "closing", "low", "high", "moves",
+                                                      "first_seen", "last_seen"])
+        # Day seeds repeat the previous day's last price; they are not moves
+        df = df[df.groupby(KEY_COLUMNS)['price_decimal'].shift() != df['price_decimal']]
+        grouped = df.groupby(KEY_COLUMNS, sort=True)
+        movement = grouped['price_decimal'].agg(opening="first", closing="last", low="min", high="max")
+        movement['moves'] = grouped.size() - 1
+        movement['first_seen'] = grouped['captured_at'].first()
+        movement['last_seen'] = grouped['captured_at'].last()
+        return movement.reset_index()
+    
+    def closing_prices(self, event_ids=None):
+        """Last price recorded before kick-off per bookmaker, market and outcome"""
+        starts = self._start_times(event_ids)
+        if not len(starts):
+            return pd.DataFrame(columns=KEY_COLUMNS + ["price_decimal", "captured_at"])
+        df = self.history(list(starts.index), end=starts.max())
+        df = df[df['captured_at'] <= df['event_id'].map(starts)]
+        return df.groupby(KEY_COLUMNS, as_index=False).last()
+    
+    def closing_line_value(self, event_ids=None):
+        """Stored value bets with the same bookmaker's closing price.
+        
+        ``clv`` is the bet price over the closing price minus one; positive
+        means the bet beat the close. Bets whose event has no recorded
+        closing price get NaN.
+        """
+        query = "SELECT * FROM value_bets"
+        params = []
+        if event_ids is not None:
+            event_ids = list(event_ids)
+            query += f" WHERE event_id IN ({', '.join('?' * len(event_ids))})"
+            params = event_ids
+        with self.db.reader() as conn:
+            bets = pd.read_sql_query(query, conn, params=params)
+        
+        closing = self.closing_prices(bets['event_id'].unique().tolist() if len(bets) else [])
+        closing = closing.rename(columns={"provider": "bookmaker", "price_decimal": "closing_price",
+                                          "captured_at": "closed_at"})
+        bets = bets.merge(closing, on=["bookmaker", "event_id", "market", "outcome"], how="left")
+        bets['closing_price'] = bets['closing_price'].astype(float)
+        bets['clv'] = bets['price_decimal'] / bets['closing_price'] - 1
+        return bets
+    
+    def prune(self, retention_days=None):
+        """Drop day tables and latest prices older than ``retention_days``"""
+        if retention_days is None:
+            retention_days = self.config.snapshot_retention_days
+        cutoff = datetime.now(timezone.utc).date() - timedelta(days=retention_days)
+        expired = [table for table in self.partitions() if _partition_day(table) < cutoff]
+        with self.db.conn:
+            for table in expired:
+                self.db.conn.execute(f"DROP TABLE {table}")
+            self._create_compactions()
+            self.db.conn.execute(f"DELETE FROM {COMPACTIONS_TABLE} WHERE day < ?", (cutoff.isoformat(),))
+            deleted = self.db.conn.execute(
+                "DELETE FROM raw_odds WHERE substr(start_time, 1, 10) < ?", (cutoff.isoformat(),)
+            ).rowcount
+        self._tables.difference_update(expired)
+        self._latest = None
+        return {"dropped_tables": len(expired), "deleted_latest": deleted}
+    
+    def compact(self, older_than_days=None, interval_minutes=None):
+        """Thin day tables older than ``older_than_days`` to one price per interval.
+        
+        Each (provider, event, market, outcome) keeps its first price of the
+        day and its last price in every ``interval_minutes`` bucket, so the
+        opening and closing prices survive, and then drops rows that no
+        longer differ from the row before them. Each day is compacted once
+        and committed on its own. Returns the number of rows removed.
+        """
+        if older_than_days is None:
+            older_than_days = self.config.snapshot_compact_after_days
+        if interval_minutes is None:
+            interval_minutes = self.config.snapshot_compact_minutes
+        cutoff = datetime.now(timezone.utc).date() - timedelta(days=older_than_days)
+        bucket_seconds = max(1, int(interval_minutes * 60))
+        
+        with self.db.conn:
+            self._create_compactions()
+        compacted = {row[0] for row in self.db.conn.execute(f"SELECT day FROM {COMPACTIONS_TABLE}")}
+        removed = 0
+        for table in self.partitions():
+            day = _partition_day(table)
+            if day >= cutoff or day.isoformat() in compacted:
+                continue
+            with self.db.conn:
+                # rowid follows insertion order, which is capture order
+                removed += self.db.conn.execute(f"""
+                    DELETE FROM {table} WHERE rowid NOT IN (
+                        SELECT MAX(rowid) FROM {table}
+                        GROUP BY provider, event_id, market, outcome,
+                                 CAST(strftime('%s', captured_at) AS INTEGER) / ?
+                        UNION
+                        SELECT MIN(rowid) FROM {table}
+                        GROUP BY provider, event_id, market, outcome
+                    )
+                """, (bucket_seconds,)).rowcount
+                removed += self.db.conn.execute(f"""
+                    DELETE FROM {table} WHERE rowid IN (
+                        SELECT rowid FROM (
+                            SELECT rowid, price_decimal,
+                                   LAG(price_decimal) OVER key_order AS previous,
+                                   LEAD(rowid) OVER key_order AS next_rowid
+                            FROM {table}
+                            WINDOW key_order AS (PARTITION BY provider, event_id, market, outcome ORDER BY rowid)
+                        ) WHERE price_decimal = previous AND next_rowid IS NOT NULL
+                    )
+                """).rowcount
+                self.db.conn.execute(
+                    f"INSERT INTO {COMPACTIONS_TABLE} (day, interval_minutes, compacted_at) VALUES (?, ?, ?)",
+                    (day.isoformat(), interval_minutes, _stamp(datetime.now(timezone.utc)))
+                )
+        return removed
+    
+    def partitions(self, start=None, end=None, conn=None):
+        """Day table names overlapping [start, end], oldest first"""
+        query = "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE ? ESCAPE '\\'"
+        pattern = PARTITION_PREFIX.replace("_", "\\_") + "%"
+        if conn is None:
+            with self.db.reader() as reader:
+                names = [row[0] for row in reader.execute(query, (pattern,))]
+        else:
+            names = [row[0] for row in conn.execute(query, (pattern,))]
+        first = _utc(start).date() if start is not None else None
+        last = _utc(end).date() if end is not None else None
+        return sorted(
+            name for name in names
+            if (first is None or _partition_day(name) >= first) and (last is None or _partition_day(name) <= last)
+        )
+    
+    def _partition(self, day):
+        table = f"{PARTITION_PREFIX}{day.strftime('%Y%m%d')}"
+        if table not in self._tables:
+            exists = self.db.conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+            ).fetchone()
+            with self.db.conn:
+                self.db.conn.execute(f"""
+                    CREATE TABLE IF NOT EXISTS {table} (
+                        provider TEXT, event_id TEXT, market TEXT, outcome TEXT,
+                        price_decimal REAL, captured_at TEXT
+                    )
+                """)
+                self.db.conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_{table}_event ON {table} (event_id, provider, captured_at)"
+                )
+                self.db.conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_{table}_provider ON {table} (provider, captured_at)"
+                )
+                if not exists:
+                    midnight = datetime.combine(day, datetime.min.time())
+                    self.db.conn.execute(f"""
+                        INSERT INTO {table} (provider, event_id, market, outcome, price_decimal, captured_at)
+                        SELECT provider, event_id, market, outcome, price_decimal, ?
+                        FROM raw_odds WHERE start_time >= ?
+                    """, (_stamp(midnight), midnight.isoformat()))
+            self._tables.add(table)
+        return table
+    
+    def _create_compactions(self):
+        self.db.conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {COMPACTIONS_TABLE} (
+                day TEXT PRIMARY KEY, interval_minutes REAL, compacted_at TEXT
+            )
+        """)
+    
+    def _latest_prices(self):
+        if self._latest is None:
+            cursor = self.db.conn.execute(
+                "SELECT provider, event_id, market, outcome, price_decimal FROM raw_odds"
+            )
+            self._latest = {tuple(row[:4]): row[4] for row in cursor}
+        return self._latest
+    
+    def _start_times(self, event_ids):
+        query = "SELECT event_id, MAX(start_time) FROM raw_odds"
+        params = []
+        if event_ids is not None:
+            event_ids = list(event_ids)
+            query += f" WHERE event_id IN ({', '.join('?' * len(event_ids))})"
+            params = event_ids
+        query += " GROUP BY event_id"
+        with self.db.reader() as conn:
+            rows = conn.execute(query, params).fetchall()
+        if not rows:
+            return pd.Series(dtype="datetime64[ns, UTC]")
+        return pd.Series(pd.to_datetime([row[1] for row in rows], utc=True), index=[row[0] for row in rows])
+    
+    def _rows_from_frame(self, frame):
+        last_updated = frame.last_updated.isoformat()
+        events, books, outcomes = np.nonzero(~np.isnan(frame.prices))
+        prices = frame.prices[events, books, outcomes].tolist()
+        return [
+            (frame.bookmakers[book], frame.event_ids[event], _value(frame.sports[event]),
+             frame.leagues[event], frame.home_teams[event], frame.away_teams[event],
+             frame.start_times[event].isoformat(), _value(frame.markets[event]),
+             OUTCOMES[outcome].value, price, last_updated)
+            for event, book, outcome, price in zip(events.tolist(), books.tolist(), outcomes.tolist(), prices)
+        ]
+    
+    def _row_from_odds(self, odds):
+        return (odds.provider, odds.event_id, odds.sport.value, odds.league,
+                odds.home_team, odds.away_team, odds.start_time.isoformat(),
+                odds.market.value, odds.outcome.value, odds.price_decimal,
+                odds.last_updated.isoformat())
@@ -0,0 +1,239 @@
+import json
+import os
+import unicodedata
+from contextlib import contextmanager
+from pathlib import Path
+import numpy as np
+from app.config import get_config
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking
+    fcntl = None
+
+
+# Canonical name -> spellings used by football-data.co.uk, The Odds API and
+# older imports. Keys and aliases are compared after clean_team_name().
+TEAM_ALIASES = {
+    # EPL
+    "manchester united": ["man united", "man utd", "manchester utd"],
+    "manchester city": ["man city"],
+    "tottenham hotspur": ["tottenham", "spurs"],
+    "wolverhampton wanderers": ["wolves", "wolverhampton"],
+    "brighton and hove albion": ["brighton", "brighton hove albion"],
+    "west ham united": ["west ham"],
+    "newcastle united": ["newcastle"],
+    "leeds united": ["leeds"],
+    "leicester city": ["leicester"],
+    "norwich city": ["norwich"],
+    "nottingham forest": ["nottm forest", "nott m forest", "nottingham"],
+    "sheffield united": ["sheffield utd"],
+    "sheffield wednesday": ["sheffield weds"],
+    "luton town": ["luton"],
+    "ipswich town": ["ipswich"],
+    "west bromwich albion": ["west brom"],
+    "bournemouth": ["afc bournemouth"],
+    # La Liga
+    "atletico madrid": ["ath madrid", "atl madrid", "club atletico de madrid"],
+    "athletic bilbao": ["ath bilbao", "athletic club"],
+    "real betis": ["betis"],
+    "real sociedad": ["sociedad"],
+    "celta vigo": ["celta"],
+    "rayo vallecano": ["vallecano"],
+    "espanyol": ["espanol"],
+    "cadiz": ["cadiz cf"],
+    "almeria": ["ud almeria"],
+    "las palmas": ["ud las palmas"],
+    # Bundesliga
+    "bayern munich": ["bayern munchen", "fc bayern munchen"],
+    "borussia dortmund": ["dortmund"],
+    "borussia monchengladbach": ["m gladbach", "monchengladbach", "gladbach"],
+    "bayer leverkusen": ["leverkusen"],
+    "eintracht frankfurt": ["ein frankfurt"],
+    "fc koln": ["koln", "1 koln", "cologne"],
+    "vfb stuttgart": ["stuttgart"],
+    "vfl wolfsburg": ["wolfsburg"],
+    "tsg hoffenheim": ["hoffenheim"],
+    "sc freiburg": ["freiburg"],
+    "union berlin": ["1 union berlin"],
+    "fsv mainz 05": ["mainz", "mainz 05", "1 fsv mainz 05"],
+    "werder bremen": ["sv werder bremen"],
+    "vfl bochum": ["bochum"],
+    # Serie A
+    "inter milan": ["inter", "internazionale"],
+    "ac milan": ["milan"],
+    "as roma": ["roma"],
+    "hellas verona": ["verona"],
+    "ss lazio": ["lazio"],
+    "ssc napoli": ["napoli"],
+    # Ligue 1
+    "paris saint germain": ["paris sg", "psg"],
+    "saint etienne": ["st etienne"],
+    "olympique marseille": ["marseille"],
+    "olympique lyonnais": ["lyon"],
+}
+
+# Club-type tokens that providers add or drop inconsistently
+DROPPED_TOKENS = {"fc", "afc", "cf"}
+
+
+def clean_team_name(name):
+    name = unicodedata.normalize("NFKD", str(name))
+    name = "".join(c for c in name if not unicodedata.combining(c)).lower()
+    name = name.replace("&", " and ")
+    name = "".join(c if c.isalnum() else " " for c in name)
+    tokens = [t for t in name.split() if t not in DROPPED_TOKENS]
+    return " ".join(tokens)
+
+
+class TeamRegistry:
+    """Maps every spelling of a team to one canonical name and integer ID.
+    
+    IDs are dense, assigned on first sight and persisted alongside any
+    aliases added at runtime, so models fitted in one process can be
+    joined on integer keys in another. New IDs are only handed out while
+    holding a lock on the file and after merging what other processes
+    have saved, so a scanner and an importer never give one ID to two teams.
+    """
+    
+    def __init__(self, path=None, aliases=TEAM_ALIASES):
+        self.path = Path(path) if path else None
+        self.aliases = {}
+        self.ids = {}
+        self.names = []
+        self._canonical = {}
+        # Space-free forms, for names stored by older imports such as "westham"
+        self._compact = {}
+        for canonical, spellings in aliases.items():
+            canonical = clean_team_name(canonical)
+            self._compact[canonical.replace(" ", "")] = canonical
+            for spelling in spellings:
+                self._add_alias(clean_team_name(spelling), canonical)
+        self._load()
+    
+    def canonical(self, name):
+        canonical = self._canonical.get(name)
+        if canonical is None:
+            cleaned = clean_team_name(name)
+            canonical = self.aliases.get(cleaned)
+            if canonical is None:
+                canonical = self._compact.get(cleaned.replace(" ", ""), cleaned)
+            self._canonical[name] = canonical
+        return canonical
+    
+    def lookup(self, name):
+        """Return the ID for ``name`` without registering it, or None"""
+        return self.ids.get(self.canonical(name))
+    
+    def team_id(self, name):
+        canonical = self.canonical(name)
+        team_id = self.ids.get(canonical)
+        if team_id is None:
+            team_id = self._assign([canonical])[0]
+        return team_id
+    
+    def team_ids(self, names):
+        """Vectorised team_id over a sequence, resolving each distinct name once"""
+        names = np.asarray(names, dtype=object)
+        if len(names) == 0:
+            return np.empty(0, dtype=np.int64)
+        uniques, inverse = np.unique(names, return_inverse=True)
+        canonicals = [self.canonical(name) for name in uniques]
+        if any(canonical not in self.ids for canonical in canonicals):
+            self._assign(canonicals)
+        codes = np.array([self.ids[canonical] for canonical in canonicals], dtype=np.int64)
+        return codes[inverse]
+    
+    def refresh(self):
+        """Pick up teams and aliases saved by other processes"""
+        self._load()
+    
+    def _assign(self, canonicals):
+        with self._locked():
+            self._load()
+            count = len(self.names)
+            team_ids = [self._register(canonical) for canonical in canonicals]
+            if len(self.names) > count:
+                self._write()
+        return team_ids
+    
+    def _register(self, canonical):
+        team_id = self.ids.get(canonical)
+        if team_id is None:
+            team_id = len(self.names)
+            self.ids[canonical] = team_id
+            self.names.append(canonical)
+            self._compact.setdefault(canonical.replace(" ", ""), canonical)
+        return team_id
+    
+    def name(self, team_id):
+        return self.names[team_id]
+    
+    def add_alias(self, alias, canonical):
+        with self._locked():
+            self._load()
+            self._add_alias(clean_team_name(alias), self.canonical(canonical))
+            self._canonical.clear()
+            self._write()
+    
+    def _add_alias(self, alias, canonical):
+        self.aliases[alias] = canonical
+        self._compact.setdefault(alias.replace(" ", ""), canonical)
+    
+    def _load(self):
+        if self.path is None or not self.path.exists():
+            return
+        with open(self.path) as f:
+            data = json.load(f)
+        # The file only ever grows under the lock, so our names are a prefix of its list
+        names = data.get("teams", [])
+        if names[:len(self.names)] != self.names:
+            raise RuntimeError(f"Team registry {self.path} no longer matches the IDs in use")
+        for name in names[len(self.names):]:
+            self._register(name)
+        for alias, canonical in data.get("aliases", {}).items():
+            if self.aliases.get(alias) != canonical:
+                self._add_alias(alias, canonical)
+                self._canonical.clear()
+    
+    def save(self):
+        with self._locked():
+            self._load()
+            self._write()
+    
+    @contextmanager
+    def _locked(self):
+        if self.path is None or fcntl is None:
+            yield
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_suffix(".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+    
+    def _write(self):
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        builtin = {clean_team_name(s) for spellings in TEAM_ALIASES.values() for s in spellings}
+        data = {
+            "teams": self.names,
+            "aliases": {k: v for k, v in self.aliases.items() if k not in builtin}
+        }
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+
+_registry = None
+
+def get_team_registry():
+    global _registry
+    if _registry is None:
+        config = get_config()
+        _registry = TeamRegistry(Path(config.general.cache_dir) / "teams.json")
+    return _registry
@@ -0,0 +1,198 @@
+import asyncio
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from app.config import get_config
+from app.database import Database, get_db
+from app.snapshots import OddsSnapshotStore
+
+
+_STOP = object()
+
+# Failed writes are retried with doubling delays up to this long
+MAX_RETRY_SECONDS = 30.0
+# Attempts close() makes at a failing write before giving the items up
+CLOSE_RETRIES = 3
+# How often a waiting put checks that the writer thread is still alive
+PUT_POLL_SECONDS = 1.0
+
+
+class BackgroundWriter:
+    """Persists value bets and odds snapshots on a dedicated thread.
+    
+    Producers enqueue whole scan results and return immediately; the
+    thread drains the queue and writes everything it collected in one
+    batch every ``flush_seconds``, or sooner once ``batch_size`` value bets
+    or a queue's worth of scan results are waiting. The queue is bounded:
+    when the writer falls behind, ``put_*`` waits for room (without
+    blocking the event loop) rather than letting memory grow.
+    
+    The thread writes through its own connection to the database file.
+    A failed write keeps its items and is retried with backoff; the
+    queue fills meanwhile, so producers wait instead of losing data.
+    If the thread itself dies, the error is kept in ``error``, queued
+    items are dropped and ``put_*`` raises rather than waiting forever.
+    """
+    
+    def __init__(self, db=None, snapshots=None, queue_size=None, flush_seconds=None, batch_size=None,
+                 retry_seconds=None):
+        config = get_config().database
+        self.db = db or get_db()
+        self.snapshots = snapshots
+        self.flush_seconds = config.writer_flush_seconds if flush_seconds is None else flush_seconds
+        self.retry_seconds = config.writer_retry_seconds if retry_seconds is None else retry_seconds
+        self.batch_size = batch_size or config.batch_size
+        self.queue = queue.Queue(maxsize=queue_size or config.writer_queue_size)
+        self.written = {"value_bets": 0, "snapshots": 0, "errors": 0, "dropped": 0}
+        self.error = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._closing = threading.Event()
+    
+    async def put_value_bets(self, value_bets):
+        """Enqueue value bets, yielding to the event loop while the queue is full"""
+        if value_bets:
+            await self._put_async(("value_bets", list(value_bets)))
+    
+    async def put_snapshot(self, frame, captured_at=None):
+        if self.snapshots is not None and len(frame):
+            await self._put_async(("snapshot", (frame, captured_at or datetime.now(timezone.utc))))
+    
+    def close(self):
+        """Write everything still queued and stop the thread"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            # Caps retries even before the thread gets to the stop marker
+            self._closing.set()
+            while thread.is_alive():
+                try:
+                    self.queue.put(_STOP, timeout=PUT_POLL_SECONDS)
+                    break
+                except queue.Full:
+                    continue
+            thread.join()
+            self._closing.clear()
+    
+    async def _put_async(self, item):
+        self._start()
+        while self.error is None:
+            try:
+                self.queue.put_nowait(item)
+                break
+            except queue.Full:
+                pass
+            try:
+                # Backpressure: wait for the writer off the event loop
+                await asyncio.to_thread(self.queue.put, item, timeout=PUT_POLL_SECONDS)
+                break
+            except queue.Full:
+                continue
+        if self.error is not None:
+            # Nothing drains the queue any more, this item included
+            self._discard_queued()
+            raise RuntimeError(f"Background writer stopped: {self.error!r}")
+    
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="evbet-writer", daemon=True)
+                self._thread.start()
+    
+    def _connect(self):
+        # An in-memory database exists only on its own connection, so share it
+        if self.db.readers is None:
+            return self.db
+        return Database(self.db.db_path)
+    
+    def _run(self):
+        db = None
+        try:
+            db = self._connect()
+            snapshots = OddsSnapshotStore(db) if self.snapshots is not None else None
+            self._drain(db, snapshots)
+        except Exception as e:
+            self.error = e
+            print(f"Background writer stopped, dropping queued writes: {e!r}")
+            self._discard_queued()
+        finally:
+            if db is not None and db is not self.db:
+                db.close()
+    
+    def _discard_queued(self):
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not _STOP:
+                self.written["dropped"] += len(item[1]) if item[0] == "value_bets" else 1
+    
+    def _drain(self, db, snapshots):
+        value_bets = []
+        frames = []
+        taken = 0
+        deadline = None
+        stopping = False
+        failures = 0
+        while taken or not stopping:
+            if failures:
+                # Leave new items in the queue while retrying, so producers wait
+                time.sleep(min(MAX_RETRY_SECONDS, self.retry_seconds * 2 ** (failures - 1)))
+            else:
+                # Nothing pending means nothing to flush, so wait indefinitely
+                timeout = None if not taken else max(0.0, deadline - time.monotonic())
+                try:
+                    item = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+                if item is not None:
+                    if not taken:
+                        deadline = time.monotonic() + self.flush_seconds
+                    taken += 1
+                    if item is _STOP:
+                        stopping = True
+                    elif item[0] == "value_bets":
+                        value_bets.extend(item[1])
+                    else:
+                        frames.append(item[1])
+            
+            # Capping what is held here keeps the bounded queue meaningful
+            full = taken >= self.queue.maxsize or len(value_bets) >= self.batch_size
+            if not taken or not (stopping or full or failures or time.monotonic() >= deadline):
+                continue
+            value_bets, frames = self._write(db, snapshots, value_bets, frames)
+            if value_bets or frames:
+                failures += 1
+                if not (self._closing.is_set() and failures >= CLOSE_RETRIES):
+                    continue
+                self.written["dropped"] += len(value_bets) + len(frames)
+                print(f"Dropping {len(value_bets)} value bets and {len(frames)} odds snapshots "
+                      f"after {failures} failed writes")
+                value_bets, frames = [], []
+            failures = 0
+            for _ in range(taken):
+                self.queue.task_done()
+            taken = 0
+    
+    def _write(self, db, snapshots, value_bets, frames):
+        """Write what it can; returns the value bets and snapshots still unwritten"""
+        if value_bets:
+            try:
+                db.save_value_bets(value_bets)
+                self.written["value_bets"] += len(value_bets)
+                value_bets = []
+            except Exception as e:
+                self.written["errors"] += 1
+                print(f"Error saving {len(value_bets)} value bets (will retry): {e}")
+        unwritten = []
+        for frame, captured_at in frames:
+            try:
+                snapshots.record(frame, captured_at)
+                self.written["snapshots"] += 1
+            except Exception as e:
+                self.written["errors"] += 1
+                unwritten.append((frame, captured_at))
+                print(f"Error recording odds snapshot (will retry): {e}")
+        return value_bets, unwritten
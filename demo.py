@@ -17,6 +17,7 @@ def create_demo_data():
     db = get_db()
     teams = ["arsenal", "chelsea", "liverpool", "manchester united"]
     
+    results = []
     for i in range(50):
         home = random.choice(teams)
         away = random.choice([t for t in teams if t != home])
@@ -30,7 +31,8 @@ def create_demo_data():
             home_score=random.randint(0, 3),
             away_score=random.randint(0, 2)
         )
-        db.save_historical_result(result)
+        results.append(result)
+    db.save_historical_results(results)
     print(f"Created 50 historical matches")
 
 
@@ -2,8 +2,10 @@ import pandas as pd
 from datetime import datetime
 from app.database import get_db
 from app.models import HistoricalResult, Sport
+from app.teams import get_team_registry
 
 db = get_db()
+teams = get_team_registry()
 
 # SOCCER - Football-data.co.uk (FREE)
 print("="*60)
@@ -29,12 +31,12 @@ for league_code, league_name in soccer_leagues.items():
             url = f"https://www.football-data.co.uk/mmz4281/{season}/{league_code}.csv"
             df = pd.read_csv(url)
             
-            count = 0
+            results = []
             for _, row in df.iterrows():
                 try:
                     match_date = datetime.strptime(row['Date'], '%d/%m/%Y')
-                    home_team = row['HomeTeam'].lower().replace(' ', '').replace('united', '').replace('city', '')
-                    away_team = row['AwayTeam'].lower().replace(' ', '').replace('united', '').replace('city', '')
+                    home_team = teams.canonical(row['HomeTeam'])
+                    away_team = teams.canonical(row['AwayTeam'])
                     
                     result = HistoricalResult(
                         event_id=f"{home_team}_{away_team}_{match_date.strftime('%Y%m%d')}",
@@ -50,12 +52,13 @@ for league_code, league_name in soccer_leagues.items():
                         away_odds=float(row['B365A']) if pd.notna(row.get('B365A')) else None
                     )
                     
-                    db.save_historical_result(result)
-                    count += 1
+                    results.append(result)
                 except:
                     continue
             
-            print(f"  Season {season}: {count} matches")
+            counts = db.save_historical_results(results)
+            count = counts['inserted'] + counts['replaced']
+            print(f"  Season {season}: {count} matches ({counts['inserted']} new, {counts['replaced']} updated)")
             total_soccer += count
         except:
             print(f"  Season {season}: Failed")
@@ -3,6 +3,7 @@ import requests
 from datetime import datetime
 from app.database import get_db
 from app.models import HistoricalResult, Sport
+from app.teams import get_team_registry
 
 # Download free soccer data from football-data.co.uk
 print("Downloading EPL historical data...")
@@ -12,7 +13,8 @@ url = "https://www.football-data.co.uk/mmz4281/2324/E0.csv"
 df = pd.read_csv(url)
 
 db = get_db()
-count = 0
+teams = get_team_registry()
+results = []
 
 for _, row in df.iterrows():
     try:
@@ -20,8 +22,8 @@ for _, row in df.iterrows():
         match_date = datetime.strptime(row['Date'], '%d/%m/%Y')
         
         # Normalize team names
-        home_team = row['HomeTeam'].lower().replace(' ', '')
-        away_team = row['AwayTeam'].lower().replace(' ', '')
+        home_team = teams.canonical(row['HomeTeam'])
+        away_team = teams.canonical(row['AwayTeam'])
         
         result = HistoricalResult(
             event_id=f"{home_team}_{away_team}_{match_date.strftime('%Y%m%d')}",
@@ -37,11 +39,11 @@ for _, row in df.iterrows():
             away_odds=float(row['B365A']) if pd.notna(row['B365A']) else None
         )
         
-        db.save_historical_result(result)
-        count += 1
+        results.append(result)
     except Exception as e:
         print(f"Error: {e}")
         continue
 
-print(f"\nImported {count} EPL matches!")
+counts = db.save_historical_results(results)
+print(f"\nImported {counts['inserted'] + counts['replaced']} EPL matches!")
 print("Run 'evbet scan' again to see better predictions.")
\ No newline at end of file
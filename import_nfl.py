@@ -2,8 +2,10 @@ import pandas as pd
 from datetime import datetime
 from app.database import get_db
 from app.models import HistoricalResult, Sport
+from app.teams import get_team_registry
 
 db = get_db()
+teams = get_team_registry()
 
 print("="*60)
 print("IMPORTING NFL GAMES")
@@ -15,7 +17,7 @@ df = pd.read_csv('nfl_games.csv')
 # Filter out rows with missing scores
 df = df.dropna(subset=['score_home', 'score_away'])
 
-count = 0
+results = []
 skipped = 0
 
 for _, row in df.iterrows():
@@ -23,9 +25,9 @@ for _, row in df.iterrows():
         # Parse date
         match_date = pd.to_datetime(row['schedule_date'])
         
-        # Normalize team names (remove spaces, lowercase)
-        home_team = str(row['team_home']).lower().replace(' ', '')
-        away_team = str(row['team_away']).lower().replace(' ', '')
+        # Normalize team names to the shared canonical spelling
+        home_team = teams.canonical(row['team_home'])
+        away_team = teams.canonical(row['team_away'])
         
         # Skip if team names are invalid
         if home_team == 'nan' or away_team == 'nan':
@@ -43,16 +45,15 @@ for _, row in df.iterrows():
             away_score=int(row['score_away'])
         )
         
-        db.save_historical_result(result)
-        count += 1
-        
-        if count % 500 == 0:
-            print(f"  Imported {count} games...")
-            
+        results.append(result)
     except Exception as e:
         skipped += 1
         continue
 
+counts = db.save_historical_results(results)
+skipped += counts['skipped']
+count = counts['inserted'] + counts['replaced']
+
 print(f"\n{'='*60}")
 print(f"IMPORTED: {count} NFL games")
 print(f"SKIPPED: {skipped} games (missing data)")
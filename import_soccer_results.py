@@ -7,29 +7,12 @@ from pathlib import Path
 from app.config import get_config
 from app.database import get_db
 from app.models import HistoricalResult, Sport
+from app.teams import get_team_registry
 
 
 def normalize_team_name(name):
-    """Normalize team names to match odds API format"""
-    # Convert to lowercase and strip whitespace
-    name = str(name).lower().strip()
-    
-    # Common team name mappings
-    replacements = {
-        'man united': 'manchester united',
-        'man city': 'manchester city',
-        'spurs': 'tottenham',
-        'wolves': 'wolverhampton wanderers',
-        'brighton': 'brighton and hove albion',
-        'west ham': 'west ham united',
-        'newcastle': 'newcastle united',
-        'leeds': 'leeds united',
-        'leicester': 'leicester city',
-        'norwich': 'norwich city',
-        'crystal palace': 'crystal palace',
-    }
-    
-    return replacements.get(name, name)
+    """Normalize team names to the canonical spelling shared with the odds providers"""
+    return get_team_registry().canonical(name)
 
 
 def import_soccer_results(csv_path, league='EPL'):
@@ -53,7 +36,7 @@ def import_soccer_results(csv_path, league='EPL'):
         print(f"✗ Could not read CSV with any encoding")
         return 0
     db = get_db()
-    count = 0
+    results = []
     skipped = 0
     
     for _, row in df.iterrows():
@@ -94,15 +77,11 @@ def import_soccer_results(csv_path, league='EPL'):
             away_odds=None
         )
         
-        try:
-            db.save_historical_result(result)
-            count += 1
-            if count % 100 == 0:
-                print(f"  Imported {count} games...")
-        except Exception as e:
-            skipped += 1
-            continue
+        results.append(result)
     
+    counts = db.save_historical_results(results)
+    count = counts['inserted'] + counts['replaced']
+    skipped += counts['skipped']
     print(f"✓ Imported {count} soccer games")
     if skipped > 0:
         print(f"  Skipped {skipped} games (missing data or duplicates)")
@@ -116,14 +95,14 @@ def import_nfl_csv(csv_path):
     
     df = pd.read_csv(csv_path)
     db = get_db()
-    count = 0
+    results = []
     skipped = 0
     
     for _, row in df.iterrows():
         try:
             match_date = pd.to_datetime(row['schedule_date'])
-            home_team = str(row['team_home']).lower().strip()
-            away_team = str(row['team_away']).lower().strip()
+            home_team = normalize_team_name(row['team_home'])
+            away_team = normalize_team_name(row['team_away'])
             home_score = int(row['score_home'])
             away_score = int(row['score_away'])
         except:
@@ -146,14 +125,11 @@ def import_nfl_csv(csv_path):
             away_odds=None
         )
         
-        try:
-            db.save_historical_result(result)
-            count += 1
-            if count % 100 == 0:
-                print(f"  Imported {count} NFL games...")
-        except:
-            skipped += 1
+        results.append(result)
     
+    counts = db.save_historical_results(results)
+    count = counts['inserted'] + counts['replaced']
+    skipped += counts['skipped']
     print(f"✓ Imported {count} NFL games")
     if skipped > 0:
         print(f"  Skipped {skipped} games")
@@ -167,7 +143,7 @@ def import_nba_csv(csv_path):
     
     df = pd.read_csv(csv_path)
     db = get_db()
-    count = 0
+    results = []
     skipped = 0
     
     # Process by game_id to avoid duplicates (CSV has one row per game)
@@ -182,8 +158,8 @@ def import_nba_csv(csv_path):
                 continue
             
             match_date = pd.to_datetime(row['game_date'])
-            home_team = str(row['team_name_home']).lower().strip()
-            away_team = str(row['team_name_away']).lower().strip()
+            home_team = normalize_team_name(row['team_name_home'])
+            away_team = normalize_team_name(row['team_name_away'])
             home_score = int(row['pts_home'])
             away_score = int(row['pts_away'])
             
@@ -203,15 +179,15 @@ def import_nba_csv(csv_path):
                 away_odds=None
             )
             
-            db.save_historical_result(result)
+            results.append(result)
             processed_games.add(game_id)
-            count += 1
-            if count % 100 == 0:
-                print(f"  Imported {count} NBA games...")
         except Exception as e:
             skipped += 1
             continue
     
+    counts = db.save_historical_results(results)
+    count = counts['inserted'] + counts['replaced']
+    skipped += counts['skipped']
     print(f"✓ Imported {count} NBA games")
     if skipped > 0:
         print(f"  Skipped {skipped} games")
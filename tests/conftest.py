@@ -0,0 +1,19 @@
+import pytest
+import app.config
+import app.database
+import app.teams
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    """Run each test against a fresh config, database and team registry in tmp_path"""
+    monkeypatch.chdir(tmp_path)
+    app.config._config = None
+    app.database._db = None
+    app.teams._registry = None
+    yield tmp_path
+    if app.database._db is not None:
+        app.database._db.close()
+    app.config._config = None
+    app.database._db = None
+    app.teams._registry = None
@@ -0,0 +1,67 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from app.modeling.artifacts import HEADER, ArtifactError, load_model, save_model
+from app.modeling.soccer import PoissonModel
+from app.teams import get_team_registry
+
+
+TEAMS = ["arsenal", "chelsea", "everton", "fulham"]
+
+
+def fitted_model(home_goals=(2, 1, 0, 3)):
+    ids = get_team_registry().team_ids(TEAMS)
+    model = PoissonModel()
+    model.fit(pd.DataFrame({
+        "home_id": ids,
+        "away_id": np.roll(ids, -1),
+        "home_score": list(home_goals),
+        "away_score": [1, 0, 1, 2]
+    }))
+    return model
+
+
+def rewrite_header(directory, **changes):
+    header = json.loads((directory / HEADER).read_text())
+    header.update(changes)
+    (directory / HEADER).write_text(json.dumps(header))
+
+
+def test_load_memory_maps_the_saved_arrays(tmp_path):
+    model = fitted_model()
+    save_model(model, tmp_path, {"league": "epl"})
+    loaded, metadata = load_model(tmp_path)
+    
+    assert metadata == {"league": "epl"}
+    assert isinstance(loaded.home_attack, np.memmap) and not loaded.home_attack.flags.writeable
+    assert not isinstance(load_model(tmp_path, mmap=False)[0].home_attack, np.memmap)
+    assert loaded.predict_probs("arsenal", "chelsea") == pytest.approx(model.predict_probs("arsenal", "chelsea"))
+
+
+def test_resave_swaps_the_header_and_removes_old_arrays(tmp_path):
+    save_model(fitted_model(), tmp_path)
+    old_files = set(json.loads((tmp_path / HEADER).read_text())["arrays"].values())
+    
+    refitted = fitted_model(home_goals=(4, 4, 4, 4))
+    save_model(refitted, tmp_path)
+    new_files = set(json.loads((tmp_path / HEADER).read_text())["arrays"].values())
+    assert not old_files & new_files
+    assert {path.name for path in tmp_path.glob("*.npy")} == new_files
+    assert not (tmp_path / f"{HEADER}.tmp").exists()
+    
+    loaded, _ = load_model(tmp_path)
+    assert loaded.predict_probs("arsenal", "chelsea") == pytest.approx(refitted.predict_probs("arsenal", "chelsea"))
+
+
+def test_unknown_versions_and_registry_mismatches_are_refused(tmp_path):
+    save_model(fitted_model(), tmp_path)
+    
+    rewrite_header(tmp_path, format_version=99)
+    with pytest.raises(ArtifactError, match="version 99"):
+        load_model(tmp_path)
+    
+    # IDs fitted against a registry that ordered the teams differently
+    rewrite_header(tmp_path, format_version=1, teams=["chelsea", "arsenal", "everton", "fulham"])
+    with pytest.raises(ArtifactError, match="Team registry"):
+        load_model(tmp_path)
@@ -0,0 +1,104 @@
+import math
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import pandas as pd
+import pytest
+from app.backtest import Backtester
+from app.database import get_db
+from app.models import HistoricalResult, Sport
+from app.modeling.selector import ModelSelector
+
+
+START = datetime(2024, 3, 1, 15, tzinfo=timezone.utc)
+
+# (day, home_score, away_score, home, draw, away odds, home, draw, away model probabilities)
+MATCHES = [
+    (0, 2, 1, 2.1, 3.4, 3.6, 0.55, 0.25, 0.20),
+    (0, 0, 0, 1.8, 3.6, 4.5, 0.40, 0.35, 0.25),
+    (1, 1, 1, 2.5, 3.2, 2.9, 0.30, 0.25, 0.45),
+    (2, 0, 1, 3.0, 3.3, 2.4, 0.45, 0.30, 0.25),
+    (2, 2, 2, 1.9, np.nan, 4.0, 0.50, 0.20, 0.30),
+    (3, 0, 1, 2.2, 3.1, 3.5, np.nan, np.nan, np.nan),
+    (4, 3, 0, 1.6, 4.0, 5.5, 0.75, 0.15, 0.10)
+]
+
+
+def results():
+    columns = ["day", "home_score", "away_score", "home_odds", "draw_odds", "away_odds",
+               "prob_home", "prob_draw", "prob_away"]
+    df = pd.DataFrame(MATCHES, columns=columns)
+    df["match_date"] = [START + timedelta(days=int(day), hours=i) for i, day in enumerate(df.pop("day"))]
+    return df
+
+
+def naive_simulation(df, min_edge, fraction, cap, bankroll):
+    """One bet at a time, staking each day's bets from that morning's bankroll"""
+    equity, peak, drawdown, turnover, bets, wins = bankroll, bankroll, 0.0, 0.0, 0, 0
+    for _, day in df.groupby(df["match_date"].dt.floor("D"), sort=True):
+        morning, growth = equity, 0.0
+        for match in day.itertuples():
+            prices = [match.home_odds, match.draw_odds, match.away_odds]
+            probs = [match.prob_home, match.prob_draw, match.prob_away]
+            overround = sum(1 / price for price in prices if not math.isnan(price))
+            outcome = 0 if match.home_score > match.away_score else 1 if match.home_score == match.away_score else 2
+            for k, (price, p) in enumerate(zip(prices, probs)):
+                if math.isnan(price) or math.isnan(p):
+                    continue
+                market = 1 / price / overround
+                if p * price - 1 <= 0 or (p - market) / market * 100 < min_edge:
+                    continue
+                b = price - 1
+                stake = morning * min(max((b * p - (1 - p)) / b * fraction, 0.0), cap)
+                turnover += stake
+                growth += stake * (b if k == outcome else -1)
+                bets += 1
+                wins += k == outcome
+        equity = max(morning + growth, 0.0)
+        peak = max(peak, equity)
+        drawdown = max(drawdown, 1 - equity / peak)
+    roi = (equity - bankroll) / turnover if turnover > 0 else 0.0
+    return [equity, roi, bets, wins / bets if bets else 0.0, drawdown]
+
+
+def test_simulation_matches_a_per_bet_loop():
+    df = results()
+    summary = Backtester().simulate(df, [0.0, 20.0], [0.25, 1.0], [0.05, 0.5], bankroll=1000.0)
+    assert len(summary) == 8
+    assert set(summary["bets"]) == {5, 6} and summary["max_drawdown"].min() > 0
+    for row in summary.itertuples():
+        expected = naive_simulation(df, row.min_edge_pct, row.kelly_fraction, row.kelly_cap, 1000.0)
+        actual = [row.final_bankroll, row.roi, row.bets, row.hit_rate, row.max_drawdown]
+        assert actual == pytest.approx(expected)
+
+
+def test_chunking_does_not_change_the_summary():
+    df = results()
+    grid = ([0.0, 5.0, 10.0], [0.25, 0.5], [0.05, 0.1])
+    whole = Backtester().simulate(df, *grid, bankroll=1000.0)
+    # 12 configurations in chunks of 5 leave a partial last chunk
+    chunked = Backtester().simulate(df, *grid, bankroll=1000.0, chunk_size=5)
+    pd.testing.assert_frame_equal(whole, chunked)
+
+
+def test_walk_forward_prices_each_block_from_earlier_blocks_only():
+    teams = ["arsenal", "chelsea", "everton", "fulham"]
+    rng = np.random.default_rng(0)
+    get_db().save_historical_results([
+        HistoricalResult(
+            event_id=f"e{i}", sport=Sport.SOCCER, league="epl",
+            home_team=teams[i % 4], away_team=teams[(i + 1 + i // 4 % 3) % 4],
+            match_date=START + timedelta(days=i), home_score=int(rng.poisson(1.5)), away_score=int(rng.poisson(1.1))
+        )
+        for i in range(20)
+    ])
+    selector = ModelSelector()
+    walked = Backtester(selector).walk_forward(Sport.SOCCER, ["epl"], folds=3, model_type="poisson")
+    
+    df = selector.load_results(Sport.SOCCER, "epl").sort_values("match_date").reset_index(drop=True)
+    probs = walked[["prob_home", "prob_draw", "prob_away"]].to_numpy()
+    assert np.isnan(probs[:5]).all()
+    for i in range(5, 20):
+        model = selector.new_model("poisson")
+        model.fit(df.iloc[:min(i // 5, 3) * 5])
+        expected = model.predict_probs_batch(df["home_id"].to_numpy()[[i]], df["away_id"].to_numpy()[[i]])[0]
+        np.testing.assert_allclose(probs[i], expected)
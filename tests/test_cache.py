@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+from app.modeling.cache import PredictionCache
+from app.modeling.soccer import PoissonModel
+
+
+def results(goals):
+    return pd.DataFrame({
+        "home_id": [0, 1, 2, 3],
+        "away_id": [1, 2, 3, 0],
+        "home_score": goals,
+        "away_score": [1, 0, 1, 2]
+    })
+
+
+def test_repeat_fixtures_are_served_from_the_cache(monkeypatch):
+    model = PoissonModel()
+    model.fit(results([2, 1, 0, 3]))
+    cache = PredictionCache()
+    first = cache.predict_probs_batch(model, [0, 1], [2, 3])
+    
+    # The fingerprint is kept from the first lookup rather than rehashed
+    monkeypatch.setattr(model, "to_arrays", lambda: pytest.fail("model arrays were hashed again"))
+    second = cache.predict_probs_batch(model, [0, 1], [2, 3])
+    np.testing.assert_array_equal(first, second)
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 2
+
+
+def test_partial_fit_invalidates_cached_predictions():
+    model = PoissonModel()
+    model.fit(results([2, 1, 0, 3]))
+    cache = PredictionCache()
+    before = cache.predict_probs_batch(model, [0], [2])
+    version = model.fingerprint()
+    
+    model.partial_fit(results([4, 4, 4, 4]))
+    assert model.fingerprint() != version
+    after = cache.predict_probs_batch(model, [0], [2])
+    assert not np.allclose(before, after)
+    assert cache.stats()["misses"] == 2
+
@@ -0,0 +1,81 @@
+import sqlite3
+from datetime import datetime
+import pytest
+from app.database import Database, get_db
+from app.models import HistoricalResult, Sport
+
+
+def result(event_id, league="epl", home="arsenal", away="chelsea", day=1):
+    return HistoricalResult(
+        event_id=event_id, sport=Sport.SOCCER, league=league, home_team=home, away_team=away,
+        match_date=datetime(2024, 1, day), home_score=2, away_score=1
+    )
+
+
+def query_plan(db, sql, params):
+    return " ".join(row[-1] for row in db.conn.execute("EXPLAIN QUERY PLAN " + sql, params))
+
+
+def test_results_fingerprint_filters():
+    db = get_db()
+    db.save_historical_results([
+        result("a"), result("b", day=2), result("c", league="laliga", home="sevilla", away="betis")
+    ])
+    assert db.get_results_fingerprint() == (3, "2024-01-02T00:00:00", 6.0, 3.0)
+    assert db.get_results_fingerprint(sport="soccer", league="epl")[0] == 2
+    assert db.get_results_fingerprint(sport="soccer", league="seriea")[0] == 0
+    assert sorted(db.get_team_names(sport="soccer")) == ["arsenal", "betis", "chelsea", "sevilla"]
+    assert db.get_team_names(sport="basketball") == []
+
+
+def test_results_filters_use_the_index():
+    db = get_db()
+    where, params = db._results_filter("soccer", "epl")
+    plan = query_plan(db, f"SELECT COUNT(*), MAX(match_date) FROM historical_results{where}", params)
+    assert "idx_historical_results_sport_league_date" in plan
+    
+    where, params = db._results_filter("soccer")
+    plan = query_plan(db, f"SELECT home_team FROM historical_results{where}", params)
+    assert "idx_historical_results_sport_league_date" in plan
+
+
+def test_bulk_writes_count_inserts_and_replacements(tmp_path):
+    db = Database(str(tmp_path / "bulk.db"))
+    assert db.save_historical_results([result("a"), result("b")]) == {"inserted": 2, "replaced": 0, "skipped": 0}
+    counts = db.save_historical_results([result("b", day=3), result("c"), result("c", day=4), {"event_id": "d"}])
+    assert counts == {"inserted": 1, "replaced": 2, "skipped": 1}
+    assert db.get_results_fingerprint()[:2] == (3, "2024-01-04T00:00:00")
+    db.close()
+
+
+def test_readers_are_read_only_reused_and_see_commits(tmp_path):
+    db = Database(str(tmp_path / "pool.db"))
+    db.save_historical_results([result("a")])
+    with db.reader() as conn:
+        first = conn
+        assert conn is not db.conn
+        assert conn.execute("SELECT COUNT(*) FROM historical_results").fetchone()[0] == 1
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("DELETE FROM historical_results")
+        # Opened with mode=ro, so lifting query_only doesn't make it writable
+        conn.execute("PRAGMA query_only = OFF")
+        with pytest.raises(sqlite3.OperationalError, match="readonly"):
+            conn.execute("DELETE FROM historical_results")
+        conn.execute("PRAGMA query_only = ON")
+    
+    db.save_historical_results([result("b")])
+    with db.reader() as conn:
+        assert conn is first
+        assert conn.execute("SELECT COUNT(*) FROM historical_results").fetchone()[0] == 2
+    assert db.readers.opened == 1
+    db.close()
+
+
+def test_in_memory_database_reads_through_the_writer():
+    db = Database(":memory:")
+    assert db.readers is None
+    db.save_historical_results([result("a")])
+    with db.reader() as conn:
+        assert conn is db.conn
+        assert conn.execute("SELECT COUNT(*) FROM historical_results").fetchone()[0] == 1
+    db.close()
@@ -0,0 +1,83 @@
+import math
+from datetime import datetime, timezone
+import numpy as np
+import pytest
+from app.config import get_config
+from app.devig import Devigger
+from app.engine import ValueBetEngine
+from app.frame import OddsFrame
+from app.models import Market, Outcome, RawOdds, Sport
+from app.providers.batch import OUTCOMES
+
+
+START = datetime(2024, 1, 6, 15, tzinfo=timezone.utc)
+
+PRICES = {
+    # e1: book2 has no draw price
+    ("e1", "book1"): {Outcome.HOME: 2.1, Outcome.DRAW: 3.4, Outcome.AWAY: 3.8},
+    ("e1", "book2"): {Outcome.HOME: 2.3, Outcome.AWAY: 3.5},
+    # e2: nobody prices the away side
+    ("e2", "book1"): {Outcome.HOME: 1.5, Outcome.DRAW: 4.2},
+    ("e2", "book2"): {Outcome.HOME: 1.6, Outcome.DRAW: 4.0}
+}
+
+MODEL_PROBS = [[0.50, 0.25, 0.35], [0.70, np.nan, 0.10]]
+
+
+def frame():
+    raw_odds = [
+        RawOdds(
+            provider=book, event_id=event_id, sport=Sport.SOCCER, league="epl",
+            home_team="arsenal", away_team="chelsea", start_time=START,
+            market=Market.MATCH_WINNER, outcome=outcome, price_decimal=price, last_updated=START
+        )
+        for (event_id, book), outcomes in PRICES.items() for outcome, price in outcomes.items()
+    ]
+    return OddsFrame.from_raw_odds(raw_odds)
+
+
+def scalar_evaluation(market_odds, model_probs):
+    """The per-bet formulas the engine vectorizes, one outcome at a time"""
+    betting = get_config().betting
+    devigger = Devigger()
+    expected = {}
+    for market, probs in zip(market_odds, model_probs):
+        for outcome, p in zip(OUTCOMES, probs):
+            offers = [(outcomes[outcome], book) for book, outcomes in market.odds.items() if outcome in outcomes]
+            if not offers or math.isnan(p):
+                continue
+            price, book = max(offers)
+            market_prob = devigger.devig_market(market, book).devigged_probs[outcome]
+            b = price - 1
+            kelly = min(max((b * p - (1 - p)) / b * betting.kelly_fraction, 0.0), betting.kelly_cap)
+            expected[(market.event.event_id, outcome)] = (
+                (p - market_prob) / market_prob * 100, p * price - 1, round(betting.bankroll * kelly, 2)
+            )
+    return expected
+
+
+def test_vectorized_evaluation_matches_the_scalar_formulas():
+    filters = get_config().filters
+    filters.min_edge_pct, filters.min_ev = 5.0, 0.02
+    # Low enough that the e2 home stake is capped
+    get_config().betting.kelly_cap = 0.08
+    odds = frame()
+    evaluation = ValueBetEngine().evaluate(odds, MODEL_PROBS)
+    expected = scalar_evaluation(odds.to_market_odds(), MODEL_PROBS)
+    assert len(expected) == 4
+    
+    for row, event_id in enumerate(odds.event_ids):
+        for k, outcome in enumerate(OUTCOMES):
+            if (event_id, outcome) not in expected:
+                assert not evaluation.mask[row, k]
+                continue
+            edge_pct, ev, stake = expected[(event_id, outcome)]
+            assert evaluation.edge_pct[row, k] == pytest.approx(edge_pct)
+            assert evaluation.ev[row, k] == pytest.approx(ev)
+            assert evaluation.kelly_stakes[row, k] == pytest.approx(stake)
+            assert evaluation.mask[row, k] == (edge_pct >= filters.min_edge_pct and ev > filters.min_ev)
+    
+    bets = ValueBetEngine().value_bets(odds, evaluation, timezone.utc)
+    assert [(bet.event_id, bet.outcome, bet.bookmaker, bet.price_decimal) for bet in bets] == [
+        ("e1", Outcome.AWAY, "book1", 3.8)
+    ]
@@ -0,0 +1,65 @@
+import math
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import pytest
+from app.database import get_db
+from app.models import HistoricalResult, Sport
+from app.modeling.evaluation import ModelEvaluator
+from app.modeling.selector import ModelSelector
+
+
+# (day, home_score, away_score); with a two day holdout the last three are held out
+SCORES = [(1, 2, 0), (2, 1, 0), (3, 1, 1), (4, 0, 2), (9, 3, 1), (10, 0, 1), (10, 2, 2)]
+
+HOLDOUT_PROBS = [[0.5, 0.3, 0.2], [0.2, 0.3, 0.5], [np.nan, np.nan, np.nan]]
+
+
+class FixedModel:
+    def __init__(self, fitted_through=None):
+        self.fitted_through = fitted_through
+        self.fitted_on = None
+    
+    def fit(self, df):
+        self.fitted_on = df
+    
+    def predict_probs_batch(self, home_ids, away_ids):
+        return np.array(HOLDOUT_PROBS)
+
+
+def evaluator(monkeypatch, cached):
+    get_db().save_historical_results([
+        HistoricalResult(
+            event_id=f"e{i}", sport=Sport.SOCCER, league="epl", home_team="arsenal", away_team="chelsea",
+            match_date=datetime(2024, 1, day), home_score=home_score, away_score=away_score
+        )
+        for i, (day, home_score, away_score) in enumerate(SCORES)
+    ])
+    selector = ModelSelector()
+    fresh = FixedModel()
+    monkeypatch.setattr(selector, "cached_model", lambda key: cached)
+    monkeypatch.setattr(selector, "new_model", lambda model_type: fresh)
+    return ModelEvaluator(selector, holdout_days=2), fresh
+
+
+def test_metrics_on_a_hand_computed_holdout(monkeypatch):
+    cached = FixedModel(fitted_through=pd.Timestamp("2024-01-04", tz="UTC"))
+    evaluation, fresh = evaluator(monkeypatch, cached)
+    performance = evaluation.evaluate("soccer", "epl", "poisson")
+    assert fresh.fitted_on is None
+    
+    # The unpriced match falls back to the training base rates, (2, 1, 1) smoothed to (3, 2, 2) / 7
+    assert performance.num_predictions == 3
+    assert performance.log_loss == pytest.approx(-(2 * math.log(0.5) + math.log(2 / 7)) / 3)
+    assert performance.brier_score == pytest.approx((0.38 + 0.38 + 38 / 49) / 3)
+    assert performance.accuracy == pytest.approx(2 / 3)
+    # Bins 5, 3, 4 and 2 (0.2, 0.2 and both 2/7) against one observed win in bin 2 and two in bin 5
+    assert performance.calibration_error == pytest.approx((1.0 + 0.6 + 3 / 7 + abs(0.4 + 4 / 7 - 1)) / 9)
+
+
+def test_models_fitted_into_the_holdout_are_refitted(monkeypatch):
+    cached = FixedModel(fitted_through=pd.Timestamp("2024-01-10", tz="UTC"))
+    evaluation, fresh = evaluator(monkeypatch, cached)
+    performance = evaluation.evaluate("soccer", "epl", "poisson")
+    assert list(fresh.fitted_on["event_id"]) == ["e0", "e1", "e2", "e3"]
+    assert performance.num_predictions == 3
@@ -0,0 +1,60 @@
+from datetime import datetime, timezone
+import numpy as np
+from app.frame import OddsFrame
+from app.models import Market, Outcome, RawOdds, Sport
+
+
+START = datetime(2024, 1, 6, 15, tzinfo=timezone.utc)
+
+
+def odds(book, event_id, outcome, price, home_team_id=None):
+    return RawOdds(
+        provider=book, event_id=event_id, sport=Sport.SOCCER, league="epl",
+        home_team=f"{event_id}_home", away_team=f"{event_id}_away", start_time=START,
+        market=Market.MATCH_WINNER, outcome=outcome, price_decimal=price, last_updated=START,
+        home_team_id=home_team_id
+    )
+
+
+RAW_ODDS = [
+    odds("b1", "e1", Outcome.HOME, 2.1, home_team_id=7),
+    odds("b1", "e1", Outcome.DRAW, 3.4, home_team_id=7),
+    odds("b1", "e1", Outcome.AWAY, 3.6, home_team_id=7),
+    # b2 prices e1 without a draw and doesn't price e2 at all
+    odds("b2", "e1", Outcome.HOME, 2.2, home_team_id=7),
+    odds("b2", "e1", Outcome.AWAY, 3.5, home_team_id=7),
+    odds("b1", "e2", Outcome.HOME, 1.8),
+    odds("b1", "e2", Outcome.AWAY, 4.5)
+]
+
+
+def test_prices_are_laid_out_as_events_by_bookmakers_by_outcomes():
+    frame = OddsFrame.from_raw_odds(RAW_ODDS)
+    assert list(frame.event_ids) == ["e1", "e2"]
+    assert frame.bookmakers == ["b1", "b2"]
+    assert frame.prices.shape == (2, 2, 3)
+    np.testing.assert_array_equal(frame.prices, [
+        [[2.1, 3.4, 3.6], [2.2, np.nan, 3.5]],
+        [[1.8, np.nan, 4.5], [np.nan, np.nan, np.nan]]
+    ])
+    assert frame.num_prices == len(RAW_ODDS)
+    assert list(frame.home_team_ids) == [7, -1]
+    
+    best, cols = frame.best_prices()
+    np.testing.assert_array_equal(best, [[2.2, 3.4, 3.6], [1.8, np.nan, 4.5]])
+    np.testing.assert_array_equal(cols, [[1, 0, 0], [0, -1, 0]])
+
+
+def test_round_trip_to_market_odds_keeps_only_quoted_prices():
+    frame = OddsFrame.from_raw_odds(RAW_ODDS)
+    first, second = frame.to_market_odds()
+    assert first.odds == {
+        "b1": {Outcome.HOME: 2.1, Outcome.DRAW: 3.4, Outcome.AWAY: 3.6},
+        "b2": {Outcome.HOME: 2.2, Outcome.AWAY: 3.5}
+    }
+    assert second.odds == {"b1": {Outcome.HOME: 1.8, Outcome.AWAY: 4.5}}
+    assert (first.event.event_id, first.event.home_team_id, second.event.home_team_id) == ("e1", 7, None)
+    assert first.market == Market.MATCH_WINNER and first.event.start_time == START
+    
+    # A frame cut down to e2 no longer carries the bookmaker that only priced e1
+    assert frame.take([1]).bookmakers == ["b1"]
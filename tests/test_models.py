@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+from app.models import Outcome
+from app.modeling.soccer import DixonColesModel, EloLogisticModel, PoissonModel
+
+
+def results(num_matches=200, num_teams=6, seed=0):
+    rng = np.random.default_rng(seed)
+    home_ids = rng.integers(0, num_teams, num_matches)
+    away_ids = (home_ids + rng.integers(1, num_teams, num_matches)) % num_teams
+    return pd.DataFrame({
+        "event_id": [f"e{i}" for i in range(num_matches)],
+        "home_id": home_ids,
+        "away_id": away_ids,
+        "home_score": rng.poisson(1.5, num_matches),
+        "away_score": rng.poisson(1.1, num_matches),
+        "match_date": pd.date_range("2024-01-01", periods=num_matches, freq="D", tz="UTC")
+    })
+
+
+def test_dixon_coles_gradient_matches_finite_differences():
+    df = results()
+    model = DixonColesModel(xi=0.01)
+    teams, codes = np.unique(np.concatenate([df["home_id"], df["away_id"]]), return_inverse=True)
+    n = len(teams)
+    args = (
+        codes[:len(df)], codes[len(df):],
+        df["home_score"].to_numpy(dtype=float), df["away_score"].to_numpy(dtype=float),
+        model._weights(df), n
+    )
+    rng = np.random.default_rng(1)
+    params = np.concatenate([rng.normal(0, 0.3, 2 * n), [0.2, -0.1]])
+    
+    _, grad = DixonColesModel._neg_log_likelihood(params, *args)
+    step = 1e-6
+    numeric = np.empty_like(params)
+    for i in range(len(params)):
+        shift = np.zeros_like(params)
+        shift[i] = step
+        upper, _ = DixonColesModel._neg_log_likelihood(params + shift, *args)
+        lower, _ = DixonColesModel._neg_log_likelihood(params - shift, *args)
+        numeric[i] = (upper - lower) / (2 * step)
+    
+    np.testing.assert_allclose(grad, numeric, rtol=1e-5, atol=1e-7)
+
+
+def test_dixon_coles_fit_prices_every_fixture():
+    model = DixonColesModel()
+    model.fit(results())
+    probs = model.predict_probs_batch([0, 1, 2], [3, 4, 5])
+    assert probs.shape == (3, 3)
+    np.testing.assert_allclose(probs.sum(axis=1), 1.0, atol=1e-3)
+    assert -0.3 <= model.rho <= 0.3
+
+
+def test_poisson_partial_fit_matches_full_fit():
+    df = results()
+    full = PoissonModel()
+    full.fit(df)
+    incremental = PoissonModel()
+    incremental.fit(df.iloc[:120])
+    incremental.partial_fit(df.iloc[120:])
+    np.testing.assert_allclose(incremental.home_attack, full.home_attack)
+    np.testing.assert_allclose(incremental.away_defense, full.away_defense)
+    np.testing.assert_allclose(
+        incremental.predict_probs_batch([0, 1], [2, 3]),
+        full.predict_probs_batch([0, 1], [2, 3])
+    )
+
+
+def test_models_round_trip_through_arrays():
+    df = results()
+    for model in (PoissonModel(), DixonColesModel(), EloLogisticModel()):
+        model.fit(df)
+        params, arrays = model.to_arrays()
+        restored = type(model).from_arrays(params, arrays)
+        assert restored.predict_probs(0, 1) == model.predict_probs(0, 1)
+        assert set(restored.predict_probs(0, 1)) == {Outcome.HOME, Outcome.DRAW, Outcome.AWAY}
+
+
+def test_default_candidates_leave_out_dixon_coles():
+    from app.modeling.selector import ModelSelector
+    assert list(ModelSelector()._candidates()) == ["poisson", "elo_logistic"]
@@ -0,0 +1,49 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from app.models import Sport
+from app.providers.theodds_api import TheOddsAPIProvider
+
+
+def _payload():
+    start = datetime.now(timezone.utc).replace(microsecond=0) + timedelta(hours=30)
+    return [{
+        "home_team": "Arsenal",
+        "away_team": "Chelsea",
+        "commence_time": start.isoformat().replace("+00:00", "Z"),
+        "bookmakers": [
+            {"key": book, "markets": [{"key": "h2h", "outcomes": [
+                {"name": "Arsenal", "price": 2.1 + i / 10},
+                {"name": "Draw", "price": 3.4},
+                {"name": "Chelsea", "price": 3.6 - i / 10}
+            ]}]}
+            for i, book in enumerate(["b1", "b2"])
+        ]
+    }]
+
+
+def _key(odds):
+    return (odds.provider, odds.event_id, odds.home_team, odds.away_team, odds.start_time,
+            odds.market, odds.outcome, odds.price_decimal, odds.home_team_id, odds.away_team_id)
+
+
+def test_columnar_parser_matches_object_parser():
+    provider = TheOddsAPIProvider()
+    data = _payload()
+    objects = provider._parse_response(data, Sport.SOCCER, "soccer_epl")
+    columnar = provider._parse_response_batch(data, Sport.SOCCER, "soccer_epl").to_raw_odds()
+    assert len(objects) == 6
+    assert sorted(map(_key, objects)) == sorted(map(_key, columnar))
+
+
+def test_fetch_odds_returns_raw_odds_in_both_modes():
+    provider = TheOddsAPIProvider()
+    
+    async def fake_gather(leagues, commence_from=None, commence_to=None):
+        return [_payload() for _ in leagues]
+    provider._gather_league_data = fake_gather
+    
+    results = {}
+    for parser in ("objects", "columnar"):
+        provider.parser = parser
+        results[parser] = asyncio.run(provider.fetch_odds(Sport.SOCCER, ["soccer_epl"]))
+    assert sorted(map(_key, results["objects"])) == sorted(map(_key, results["columnar"]))
@@ -0,0 +1,232 @@
+import asyncio
+import json
+import types
+from datetime import datetime, timedelta, timezone
+import httpx
+from app.config import ProviderSettings
+from app.providers import cache as cache_module
+from app.providers.base import OddsProvider
+from app.providers.breaker import CircuitBreaker
+from app.providers.cache import ResponseCache
+from app.providers.manager import ProviderManager
+from app.providers.quota import QuotaScheduler
+from app.providers.recording import ReplayProvider
+
+
+class FakeProvider(OddsProvider):
+    def __init__(self, delay=0.0, fail=False, hedge=True):
+        super().__init__()
+        self.delay = delay
+        self.fail = fail
+        self.hedge = hedge
+        self.calls = 0
+        self.cancelled = 0
+    
+    @property
+    def name(self):
+        return "fake"
+    
+    async def fetch_odds(self, sport, leagues=None, commence_from=None, commence_to=None):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.fail:
+            raise RuntimeError("down")
+        return []
+    
+    def can_hedge(self, leagues):
+        return self.hedge
+    
+    def normalize_team_name(self, name):
+        return name
+    
+    def generate_event_id(self, home_team, away_team, start_time):
+        return f"{home_team}_{away_team}"
+
+
+def mock_responses(provider, monkeypatch, *responses):
+    """Serve ``responses`` in order through the provider's client; returns the delays slept"""
+    responses = iter(responses)
+    provider.client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: next(responses)))
+    delays = []
+    
+    async def sleep(delay):
+        delays.append(delay)
+    
+    monkeypatch.setattr(asyncio, "sleep", sleep)
+    return delays
+
+
+def get(provider):
+    async def run():
+        try:
+            return await provider._get("https://odds.example/sports/soccer_epl/odds")
+        finally:
+            await provider.close()
+    return asyncio.run(run())
+
+
+def test_get_retries_server_errors(monkeypatch):
+    provider = FakeProvider()
+    delays = mock_responses(provider, monkeypatch, httpx.Response(503), httpx.Response(200, json=[]))
+    response = get(provider)
+    assert response.status_code == 200 and response.json() == []
+    assert len(delays) == 1 and 0 <= delays[0] <= provider.backoff_base
+
+
+def test_long_retry_after_is_capped(monkeypatch):
+    provider = FakeProvider()
+    provider.backoff_max = 2.0
+    delays = mock_responses(
+        provider, monkeypatch,
+        httpx.Response(429, headers={"Retry-After": "3600"}), httpx.Response(200, json=[])
+    )
+    assert get(provider).status_code == 200
+    assert delays == [2.0]
+
+
+def test_half_open_breaker_admits_one_trial():
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=10.0)
+    breaker.record_failure(0.0)
+    assert not breaker.allow(5.0)
+    assert breaker.allow(10.0)
+    assert not breaker.allow(10.0)
+    breaker.record_failure(11.0)
+    assert not breaker.allow(12.0)
+    assert breaker.allow(21.0)
+    breaker.record_success()
+    assert breaker.allow(21.0) and breaker.allow(21.0)
+
+
+def test_settings_and_breakers_are_keyed_by_registry_key():
+    manager = ProviderManager(
+        {"primary": FakeProvider(fail=True), "backup": FakeProvider()},
+        {"primary": ProviderSettings(failure_threshold=1)}
+    )
+    asyncio.run(manager.fetch_all_odds("soccer", ["soccer_epl"]))
+    assert manager.breakers["primary"].is_open
+    assert not manager.breakers["backup"].is_open
+
+
+def test_replay_is_not_cut_off_by_the_call_timeout(tmp_path):
+    path = tmp_path / "recording.jsonl"
+    path.write_text(json.dumps({
+        "recorded_at": 0.0, "provider": "theodds_api", "league": "soccer_epl",
+        "params": {}, "window": [None, None], "status": 200, "headers": {}, "body": []
+    }) + "\n")
+    manager = ProviderManager([ReplayProvider(path, speed=1.0)])
+    assert manager.settings["theodds_api"].timeout_seconds is None
+
+
+def test_hedge_skipped_when_provider_declines():
+    for hedge, calls in ((True, 2), (False, 1)):
+        provider = FakeProvider(delay=0.05, hedge=hedge)
+        manager = ProviderManager({"fake": provider}, {"fake": ProviderSettings(hedge_after_seconds=0.01)})
+        asyncio.run(manager.fetch_all_odds("soccer", ["soccer_epl"]))
+        assert provider.calls == calls
+
+
+def test_timeout_during_the_hedge_wait_cancels_the_call():
+    provider = FakeProvider(delay=1.0)
+    settings = ProviderSettings(hedge_after_seconds=0.5, timeout_seconds=0.01)
+    manager = ProviderManager({"fake": provider}, {"fake": settings})
+    
+    async def run():
+        await manager.fetch_all_odds("soccer", ["soccer_epl"])
+        # Checked before asyncio.run cancels whatever is left over
+        await asyncio.sleep(0)
+        return provider.cancelled
+    
+    assert asyncio.run(run()) == 1
+
+
+def test_quota_is_tight_near_reserve():
+    scheduler = QuotaScheduler(reserve=10)
+    scheduler.update_quota({"x-requests-remaining": "12"})
+    assert not scheduler.is_tight(0.0, 1)
+    assert scheduler.is_tight(0.0, 3)
+
+
+NOW = datetime(2024, 3, 10, 12, tzinfo=timezone.utc).timestamp()
+
+
+def test_league_due_times_follow_the_next_kickoff():
+    scheduler = QuotaScheduler(base_interval=300, max_interval=3600, imminent_hours=6)
+    kickoff = datetime.fromtimestamp(NOW, tz=timezone.utc)
+    
+    scheduler.record_refresh("soon", [kickoff + timedelta(hours=2)], NOW)
+    scheduler.record_refresh("later", [kickoff + timedelta(hours=24)], NOW)
+    assert not scheduler.try_acquire("soon", NOW + 299)
+    assert scheduler.try_acquire("soon", NOW + 300)
+    assert not scheduler.try_acquire("later", NOW + 1199)
+    assert scheduler.try_acquire("later", NOW + 1200)
+    
+    # Nothing in the window backs off exponentially, up to max_interval
+    intervals = []
+    for _ in range(5):
+        scheduler.record_refresh("quiet", [], NOW)
+        intervals.append(scheduler.leagues["quiet"].interval)
+    assert intervals == [600, 1200, 2400, 3600, 3600]
+
+
+def test_everything_is_due_without_quota_headers():
+    scheduler = QuotaScheduler(base_interval=300, reserve=50)
+    leagues = [f"league{i}" for i in range(20)]
+    assert all(scheduler.try_acquire(league, NOW) for league in leagues)
+    assert scheduler.available() is None
+    
+    # Unknown quota never stretches the intervals either
+    for league in leagues:
+        scheduler.record_refresh(league, [], NOW)
+    assert scheduler.leagues["league0"].next_due == NOW + 600
+
+
+def test_quota_headers_reserve_requests_and_stretch_intervals():
+    scheduler = QuotaScheduler(base_interval=300, monthly_budget=100, reserve=2)
+    scheduler.update_quota({"x-requests-remaining": "400", "x-requests-used": "96"})
+    assert scheduler.available() == 4
+    assert scheduler.try_acquire("a", NOW) and scheduler.try_acquire("b", NOW)
+    assert scheduler.used == 98
+    assert not scheduler.try_acquire("c", NOW)
+    
+    # Two requests left for the rest of the month can't sustain a 10 minute interval
+    scheduler.update_quota({"x-requests-remaining": "400", "x-requests-used": "96"})
+    scheduler.record_refresh("a", [], NOW)
+    assert scheduler.leagues["a"].next_due - NOW > 600
+
+
+def response_cache(tmp_path, monkeypatch):
+    clock = [NOW]
+    monkeypatch.setattr(cache_module, "time", types.SimpleNamespace(time=lambda: clock[0]))
+    return ResponseCache(tmp_path / "responses", default_ttl=60, league_ttls={"soccer_epl": 30}), clock
+
+
+def test_response_cache_expires_after_the_league_ttl(tmp_path, monkeypatch):
+    cache, clock = response_cache(tmp_path, monkeypatch)
+    cache.put("theodds_api", "soccer_epl", "uk", "h2h", [{"id": "e1"}])
+    cache.put("theodds_api", "soccer_spain_la_liga", "uk", "h2h", [{"id": "e2"}])
+    
+    clock[0] += 30
+    assert cache.get("theodds_api", "soccer_epl", "uk", "h2h") == [{"id": "e1"}]
+    clock[0] += 1
+    assert cache.get("theodds_api", "soccer_epl", "uk", "h2h") is None
+    assert cache.get("theodds_api", "soccer_spain_la_liga", "uk", "h2h") == [{"id": "e2"}]
+    clock[0] += 30
+    assert cache.get("theodds_api", "soccer_spain_la_liga", "uk", "h2h") is None
+
+
+def test_response_cache_keys_by_league_and_window(tmp_path, monkeypatch):
+    cache, clock = response_cache(tmp_path, monkeypatch)
+    start = datetime.fromtimestamp(NOW, tz=timezone.utc)
+    window = (start + timedelta(hours=24), start + timedelta(hours=48))
+    cache.put("theodds_api", "soccer_epl", "uk", "h2h", [{"id": "e1"}], *window)
+    
+    assert cache.get("theodds_api", "soccer_epl", "uk", "h2h", *window) == [{"id": "e1"}]
+    assert cache.get("theodds_api", "soccer_epl", "uk", "h2h", window[0] + timedelta(hours=1), window[1]) == [{"id": "e1"}]
+    assert cache.get("theodds_api", "soccer_epl", "uk", "h2h", window[0] - timedelta(hours=1), window[1]) is None
+    assert cache.get("theodds_api", "soccer_epl", "uk", "h2h") is None
+    assert cache.get("theodds_api", "soccer_epl", "eu", "h2h", *window) is None
+    assert cache.get("theodds_api", "soccer_germany_bundesliga", "uk", "h2h", *window) is None
@@ -0,0 +1,29 @@
+import asyncio
+import json
+import pytest
+from app.providers.recording import ReplayProvider
+
+
+def _write_recording(path, gaps):
+    with open(path, "w") as f:
+        for i, recorded_at in enumerate(gaps):
+            f.write(json.dumps({
+                "recorded_at": recorded_at, "provider": "theodds_api", "league": "soccer_epl",
+                "params": {}, "window": [None, None], "status": 200, "headers": {}, "body": [{"n": i}]
+            }) + "\n")
+
+
+def test_cancelled_wait_keeps_the_entry(tmp_path):
+    path = tmp_path / "recording.jsonl"
+    _write_recording(path, [0.0, 0.5])
+    provider = ReplayProvider(path, speed=1.0)
+    
+    async def run():
+        assert await provider._fetch_league("soccer_epl") == [{"n": 0}]
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(provider._fetch_league("soccer_epl"), 0.05)
+        assert not provider.exhausted
+        return await provider._fetch_league("soccer_epl")
+    
+    assert asyncio.run(run()) == [{"n": 1}]
+    assert provider.exhausted
@@ -0,0 +1,26 @@
+from app.models import Sport
+from app.resolver import FuzzyTeamResolver
+from app.teams import TeamRegistry
+
+
+def test_rejections_are_retried_once_known_names_change(tmp_path):
+    registry = TeamRegistry(tmp_path / "teams.json", aliases={})
+    path = tmp_path / "learned.json"
+    resolver = FuzzyTeamResolver(registry, path)
+    resolver.set_known_names(Sport.SOCCER, ["arsenal", "chelsea"])
+    assert resolver.resolve(Sport.SOCCER, "Brentford FC Londres") is None
+    
+    resolver.set_known_names(Sport.SOCCER, ["arsenal", "chelsea", "brentford"])
+    assert resolver.resolve(Sport.SOCCER, "Brentford FC Londres") == "brentford"
+    
+    reloaded = FuzzyTeamResolver(registry, path)
+    assert [entry["team"] for entry in reloaded.learned.values()] == ["brentford"]
+
+
+def test_rejections_are_not_persisted(tmp_path):
+    registry = TeamRegistry(tmp_path / "teams.json", aliases={})
+    path = tmp_path / "learned.json"
+    resolver = FuzzyTeamResolver(registry, path)
+    resolver.set_known_names(Sport.SOCCER, ["arsenal", "chelsea"])
+    assert resolver.resolve(Sport.SOCCER, "Real Madrid") is None
+    assert FuzzyTeamResolver(registry, path).learned == {}
@@ -0,0 +1,163 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from app.config import get_config
+from app.database import get_db
+from app.frame import OddsFrame
+from app.models import Market, Outcome, RawOdds, Sport
+from app.providers.manager import ProviderManager
+from app.providers.recording import ReplayProvider
+from app.scanner import ValueBetScanner
+
+
+def payload(home_price=2.1):
+    start = datetime.now(timezone.utc).replace(microsecond=0) + timedelta(hours=30)
+    return [{
+        "home_team": "Arsenal",
+        "away_team": "Chelsea",
+        "commence_time": start.isoformat().replace("+00:00", "Z"),
+        "bookmakers": [{"key": "b1", "markets": [{"key": "h2h", "outcomes": [
+            {"name": "Arsenal", "price": home_price},
+            {"name": "Draw", "price": 3.4},
+            {"name": "Chelsea", "price": 3.6}
+        ]}]}]
+    }]
+
+
+def write_recording(path, entries):
+    with open(path, "w") as f:
+        for i, (league, body) in enumerate(entries):
+            f.write(json.dumps({
+                "recorded_at": float(i), "provider": "theodds_api", "league": league,
+                "params": {}, "window": [None, None], "status": 200, "headers": {}, "body": body
+            }) + "\n")
+
+
+def replay_scanner(path):
+    config = get_config()
+    config.leagues.soccer = ["soccer_epl"]
+    config.leagues.basketball = []
+    config.leagues.football = []
+    return ValueBetScanner(ProviderManager([ReplayProvider(path, speed=0)]))
+
+
+def run_scan(scanner):
+    async def run():
+        try:
+            return await scanner.scan()
+        finally:
+            await scanner.close()
+    return asyncio.run(run())
+
+
+def run_watch(scanner):
+    async def run():
+        cycles = []
+        try:
+            async for value_bets in scanner.watch(interval=0):
+                cycles.append(value_bets)
+        finally:
+            await scanner.close()
+        return cycles
+    return asyncio.run(run())
+
+
+def test_replay_serves_one_recorded_cycle_per_watch_cycle(tmp_path):
+    path = tmp_path / "recording.jsonl"
+    write_recording(path, [("soccer_epl", payload(2.1 + i / 10)) for i in range(3)])
+    assert len(run_watch(replay_scanner(path))) == 3
+
+
+def test_one_fetch_cycle_records_each_market_once(tmp_path):
+    path = tmp_path / "recording.jsonl"
+    write_recording(path, [("soccer_epl", payload()) for _ in range(3)])
+    scanner = replay_scanner(path)
+    run_scan(scanner)
+    
+    rows = []
+    for table in scanner.snapshots.partitions():
+        rows += get_db().conn.execute(f"SELECT event_id, market, provider, outcome FROM {table}").fetchall()
+    assert len(rows) == 3 and len(set(rows)) == 3
+    assert {row[1] for row in rows} == {"match_winner"}
+
+
+def odds_frame(prices):
+    start = datetime.now(timezone.utc) + timedelta(hours=30)
+    return OddsFrame.from_raw_odds([
+        RawOdds(
+            provider="book", event_id=event_id, sport=Sport.SOCCER, league="epl",
+            home_team=f"{event_id}_home", away_team=f"{event_id}_away", start_time=start,
+            market=Market.MATCH_WINNER, outcome=outcome, price_decimal=price, last_updated=start
+        )
+        for event_id, event_prices in prices.items()
+        for outcome, price in zip((Outcome.HOME, Outcome.DRAW, Outcome.AWAY), event_prices)
+    ])
+
+
+def changes_scanner(monkeypatch, frames):
+    """Scanner fed one frame per cycle and a fixed model, recording what it prices"""
+    scanner = ValueBetScanner(ProviderManager({}))
+    frames = iter(frames)
+    priced = []
+    
+    async def fetch_frame(sport, min_start, max_start):
+        return next(frames) if sport == Sport.SOCCER else OddsFrame.empty()
+    
+    evaluate = scanner.engine.evaluate
+    
+    def record_evaluate(frame, model_probs):
+        priced.append(list(frame.event_ids))
+        return evaluate(frame, model_probs)
+    
+    monkeypatch.setattr(scanner, "_fetch_frame", fetch_frame)
+    monkeypatch.setattr(scanner, "_get_model", lambda sport, league: object())
+    monkeypatch.setattr(scanner.predictions, "predict_probs_batch",
+                        lambda model, home_ids, away_ids: np.tile([0.6, 0.2, 0.2], (len(home_ids), 1)))
+    monkeypatch.setattr(scanner.engine, "evaluate", record_evaluate)
+    return scanner, priced
+
+
+def run_changes(scanner, cycles):
+    async def run():
+        try:
+            return [await scanner.scan_changes() for _ in range(cycles)]
+        finally:
+            await scanner.close()
+    return asyncio.run(run())
+
+
+def bet_keys(value_bets):
+    return sorted((bet.event_id, bet.outcome) for bet in value_bets)
+
+
+def test_unchanged_markets_are_skipped(monkeypatch):
+    prices = {"e1": (2.0, 3.5, 4.0), "e2": (1.5, 4.0, 6.0)}
+    scanner, priced = changes_scanner(monkeypatch, [odds_frame(prices), odds_frame(prices)])
+    first, second = run_changes(scanner, 2)
+    assert bet_keys(first) == [("e1", Outcome.HOME), ("e2", Outcome.AWAY)]
+    assert second == []
+    assert priced == [["e1", "e2"]]
+
+
+def test_a_changed_price_reprices_only_its_market(monkeypatch):
+    scanner, priced = changes_scanner(monkeypatch, [
+        odds_frame({"e1": (2.0, 3.5, 4.0), "e2": (1.5, 4.0, 6.0)}),
+        odds_frame({"e1": (2.0, 3.5, 4.0), "e2": (1.5, 4.0, 6.5)})
+    ])
+    first, second = run_changes(scanner, 2)
+    assert priced == [["e1", "e2"], ["e2"]]
+    assert bet_keys(second) == [("e2", Outcome.AWAY)]
+    assert second[0].price_decimal == 6.5
+
+
+def test_emitted_bets_are_not_emitted_again(monkeypatch):
+    # The draw moves, so e1 is repriced, but its value bet on the home side is unchanged
+    scanner, priced = changes_scanner(monkeypatch, [
+        odds_frame({"e1": (2.0, 3.5, 4.0)}),
+        odds_frame({"e1": (2.0, 3.6, 4.0)})
+    ])
+    first, second = run_changes(scanner, 2)
+    assert bet_keys(first) == [("e1", Outcome.HOME)]
+    assert priced == [["e1"], ["e1"]]
+    assert second == []
@@ -0,0 +1,132 @@
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import pytest
+from app.config import get_config
+from app.database import get_db
+from app.models import HistoricalResult, Sport
+from app.modeling.selector import ModelSelector, _model_lru
+
+
+TEAMS = ["arsenal", "chelsea", "everton", "fulham", "liverpool", "brentford"]
+
+
+def add_results(start, count):
+    rng = np.random.default_rng(start)
+    today = datetime.now(timezone.utc).replace(hour=15, minute=0, second=0, microsecond=0)
+    results = []
+    for i in range(start, start + count):
+        home, away = rng.choice(len(TEAMS), 2, replace=False)
+        results.append(HistoricalResult(
+            event_id=f"e{i}", sport=Sport.SOCCER, league="epl",
+            home_team=TEAMS[home], away_team=TEAMS[away],
+            match_date=today - timedelta(days=400 - i),
+            home_score=int(rng.poisson(1.5)), away_score=int(rng.poisson(1.1))
+        ))
+    get_db().save_historical_results(results)
+
+
+def selector_for(model_type, monkeypatch):
+    _model_lru.clear()
+    selector = ModelSelector()
+    monkeypatch.setattr(selector, "_model_type", lambda sport, league, num_results: model_type)
+    return selector
+
+
+def test_partial_fit_keeps_the_full_fit_time(monkeypatch):
+    add_results(0, 60)
+    selector = selector_for("poisson", monkeypatch)
+    model = selector.get_model_for_sport(Sport.SOCCER, "epl")
+    fitted_at = model.fitted_at
+    
+    add_results(60, 5)
+    _model_lru.clear()
+    updated = selector.get_model_for_sport(Sport.SOCCER, "epl")
+    assert updated.num_matches == 65
+    assert updated.fitted_at == fitted_at
+
+
+def test_old_full_fit_forces_a_refit(monkeypatch):
+    add_results(0, 60)
+    selector = selector_for("poisson", monkeypatch)
+    model = selector.get_model_for_sport(Sport.SOCCER, "epl")
+    model.fitted_at -= timedelta(days=get_config().modeling.model_cache_days)
+    selector._save(("soccer", "epl", "poisson"), model)
+    
+    add_results(60, 5)
+    _model_lru.clear()
+    refitted = selector.get_model_for_sport(Sport.SOCCER, "epl")
+    assert refitted.fitted_at > model.fitted_at
+    assert refitted.num_matches == 65
+
+
+def test_models_without_partial_fit_are_refitted(monkeypatch):
+    add_results(0, 60)
+    selector = selector_for("dixon_coles", monkeypatch)
+    model = selector.get_model_for_sport(Sport.SOCCER, "epl")
+    assert not model.supports_partial_fit
+    
+    add_results(60, 5)
+    refitted = selector.get_model_for_sport(Sport.SOCCER, "epl")
+    assert refitted.data_fingerprint[0] == 65
+    assert refitted.predict_probs("arsenal", "chelsea") is not None
+
+
+def test_scan_path_keeps_a_stale_selection(monkeypatch):
+    add_results(0, 60)
+    get_config().modeling.min_historical_games = 50
+    selector = ModelSelector()
+    stale = datetime.now() - timedelta(days=get_config().modeling.model_cache_days + 1)
+    selector._save_selection({"soccer:epl": {
+        "model_type": "elo_logistic", "selected_at": stale.isoformat(), "scores": {}
+    }})
+    monkeypatch.setattr(selector, "select_models", lambda sport, leagues: pytest.fail("cross-validated"))
+    
+    assert selector.needs_selection(Sport.SOCCER, "epl")
+    assert selector.get_model_for_sport(Sport.SOCCER, "epl").model_type == "elo_logistic"
+
+
+def test_leagues_without_enough_results_are_recorded(monkeypatch):
+    add_results(0, 60)
+    get_config().modeling.min_historical_games = 50
+    selector = ModelSelector()
+    # Only the last two years count towards cross-validation
+    monkeypatch.setattr(selector, "_recent", lambda df: df.iloc[:10])
+    
+    assert selector.select_models(Sport.SOCCER, ["epl"]) == {}
+    assert selector._load_selection()["soccer:epl"]["model_type"] is None
+    assert not selector.needs_selection(Sport.SOCCER, "epl")
+    assert selector.model_type_for(Sport.SOCCER, "epl") == "poisson"
+
+
+def test_an_edit_next_to_new_results_forces_a_refit(monkeypatch):
+    add_results(0, 60)
+    selector = selector_for("poisson", monkeypatch)
+    model = selector.get_model_for_sport(Sport.SOCCER, "epl")
+    fitted_at = model.fitted_at
+    
+    edited = get_db().get_historical_results(sport="soccer", league="epl").set_index("event_id").loc["e5"]
+    get_db().save_historical_results([HistoricalResult(
+        event_id="e5", sport=Sport.SOCCER, league="epl", home_team=edited.home_team,
+        away_team=edited.away_team, match_date=datetime.fromisoformat(edited.match_date),
+        home_score=int(edited.home_score) + 3, away_score=int(edited.away_score)
+    )])
+    add_results(60, 5)
+    _model_lru.clear()
+    refitted = selector.get_model_for_sport(Sport.SOCCER, "epl")
+    assert refitted.fitted_at > fitted_at
+    assert refitted.num_matches == 65
+    
+    fresh = selector.new_model("poisson")
+    fresh.fit(selector.load_results(Sport.SOCCER, "epl"))
+    assert refitted.predict_probs("arsenal", "chelsea") == pytest.approx(fresh.predict_probs("arsenal", "chelsea"))
+
+
+def test_sports_without_results_get_no_model(monkeypatch):
+    add_results(0, 60)
+    selector = selector_for("poisson", monkeypatch)
+    assert selector.get_model_for_sport(Sport.BASKETBALL, "NBA") is None
+    assert selector.get_model_for_sport(Sport.FOOTBALL) is None
+    assert selector.cached_models() == []
+    
+    assert selector.get_model_for_sport(Sport.SOCCER, "epl") is not None
+    assert selector.cached_models() == [("soccer", "epl", "poisson")]
@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta, timezone
+from app.database import get_db
+from app.models import Market, Outcome, RawOdds, Sport
+from app.snapshots import OddsSnapshotStore
+
+
+DAY = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=10)
+
+
+def odds(price, event_id="e1", outcome=Outcome.HOME):
+    return RawOdds(
+        provider="book", event_id=event_id, sport=Sport.SOCCER, league="epl",
+        home_team="arsenal", away_team="chelsea", start_time=DAY + timedelta(days=3),
+        market=Market.MATCH_WINNER, outcome=outcome, price_decimal=price, last_updated=DAY
+    )
+
+
+def record(store, hours, *items):
+    store.record(list(items), DAY + timedelta(hours=hours))
+
+
+def rows(table):
+    return get_db().conn.execute(f"SELECT outcome, price_decimal FROM {table} ORDER BY rowid").fetchall()
+
+
+def test_new_days_are_seeded_with_current_prices():
+    store = OddsSnapshotStore()
+    record(store, 10, odds(2.0), odds(3.5, outcome=Outcome.AWAY))
+    record(store, 30, odds(2.1))
+    
+    assert rows(store.partitions()[1]) == [("home", 2.0), ("away", 3.5), ("home", 2.1)]
+    history = store.history("e1", start=DAY + timedelta(hours=36))
+    assert sorted(zip(history["outcome"], history["price_decimal"])) == [("away", 3.5), ("home", 2.1)]
+    
+    movement = store.line_movement("e1").set_index("outcome")
+    assert movement.loc["home", "moves"] == 1
+    assert movement.loc["away", "moves"] == 0
+
+
+def test_compaction_keeps_first_and_last_prices_and_runs_once():
+    store = OddsSnapshotStore()
+    for minute, price in enumerate([2.0, 2.1, 2.0, 2.2, 2.3]):
+        record(store, 10 + minute / 60, odds(price))
+    table = store.partitions()[0]
+    
+    assert store.compact(older_than_days=1, interval_minutes=60) == 3
+    assert rows(table) == [("home", 2.0), ("home", 2.3)]
+    record_count = get_db().conn.execute("SELECT COUNT(*) FROM odds_snapshot_compactions").fetchone()[0]
+    assert record_count == 1
+    
+    # An already compacted day is left alone
+    get_db().conn.execute(f"INSERT INTO {table} VALUES ('book', 'e1', 'match_winner', 'home', 2.4, '{DAY:%Y-%m-%d} 23:00:00.000')")
+    assert store.compact(older_than_days=1, interval_minutes=60) == 0
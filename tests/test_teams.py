@@ -0,0 +1,66 @@
+import multiprocessing
+import sqlite3
+from app.database import Database
+from app.teams import TeamRegistry
+
+
+def _register_many(args):
+    path, prefix = args
+    registry = TeamRegistry(path, aliases={})
+    return {f"{prefix} {i}": registry.team_id(f"{prefix} {i}") for i in range(30)}
+
+
+def test_registries_sharing_a_file_never_reuse_an_id(tmp_path):
+    path = tmp_path / "teams.json"
+    first = TeamRegistry(path, aliases={})
+    second = TeamRegistry(path, aliases={})
+    assert first.team_id("Arsenal") == 0
+    assert second.team_id("Chelsea") == 1
+    assert first.team_id("Everton") == 2
+    assert first.lookup("Chelsea") == 1
+    assert TeamRegistry(path, aliases={}).names == ["arsenal", "chelsea", "everton"]
+
+
+def test_concurrent_processes_agree_on_ids(tmp_path):
+    path = str(tmp_path / "teams.json")
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(4) as pool:
+        assigned = pool.map(_register_many, [(path, f"team {p}") for p in "abcd"])
+    registry = TeamRegistry(path, aliases={})
+    assert len(registry.names) == 120
+    for ids in assigned:
+        for name, team_id in ids.items():
+            assert registry.names[team_id] == name
+
+
+def test_results_from_old_imports_are_rekeyed(tmp_path):
+    path = tmp_path / "evbet.db"
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE historical_results (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_id TEXT UNIQUE, sport TEXT, league TEXT,
+            home_team TEXT, away_team TEXT, match_date TEXT,
+            home_score INTEGER, away_score INTEGER,
+            home_odds REAL, draw_odds REAL, away_odds REAL
+        )
+    """)
+    rows = [
+        ("westham_chelsea_20240101", "westham", "chelsea", "2024-01-01T00:00:00"),
+        ("west ham united_chelsea_20240101", "west ham united", "chelsea", "2024-01-01T00:00:00"),
+        ("manutd_everton_20240108", "manutd", "everton", "2024-01-08T00:00:00"),
+        ("hist_1", "wolves", "everton", "2024-01-15T00:00:00"),
+    ]
+    conn.executemany(
+        "INSERT INTO historical_results (event_id, sport, league, home_team, away_team, match_date, home_score, away_score) "
+        "VALUES (?, 'soccer', 'soccer_epl', ?, ?, ?, 1, 0)", rows
+    )
+    conn.commit()
+    conn.close()
+    
+    db = Database(str(path))
+    df = db.get_historical_results()
+    db.close()
+    assert sorted(df['event_id']) == [
+        "hist_1", "manchester united_everton_20240108", "west ham united_chelsea_20240101"
+    ]
@@ -0,0 +1,119 @@
+import asyncio
+import threading
+import pytest
+from datetime import datetime
+from app.database import Database, get_db
+from app.models import Market, Outcome, ValueBet
+from app.writer import BackgroundWriter
+
+
+def bet(event_id):
+    return ValueBet(
+        event_id=event_id, league="epl", home_team="arsenal", away_team="chelsea",
+        start_time_local=datetime(2024, 1, 1, 15), bookmaker="book", market=Market.MATCH_WINNER,
+        outcome=Outcome.HOME, price_decimal=2.2, model_prob=0.5, market_prob_devig=0.45,
+        edge_pct=10.0, ev=0.1, kelly_stake=5.0
+    )
+
+
+def saved_bets():
+    return get_db().conn.execute("SELECT COUNT(*) FROM value_bets").fetchone()[0]
+
+
+def test_close_writes_everything_queued():
+    writer = BackgroundWriter(flush_seconds=60)
+    
+    async def produce():
+        for i in range(5):
+            await writer.put_value_bets([bet(f"e{i}")])
+    
+    asyncio.run(produce())
+    writer.close()
+    assert saved_bets() == 5
+    assert writer.written["value_bets"] == 5
+
+
+def test_full_queue_holds_producers_without_blocking_the_loop(monkeypatch):
+    release = threading.Event()
+    save = Database.save_value_bets
+    
+    def slow_save(self, bets):
+        release.wait()
+        return save(self, bets)
+    
+    monkeypatch.setattr(Database, "save_value_bets", slow_save)
+    writer = BackgroundWriter(queue_size=1, flush_seconds=0, batch_size=1)
+    
+    async def produce():
+        ticks = 0
+        producer = asyncio.gather(*(writer.put_value_bets([bet(f"e{i}")]) for i in range(4)))
+        while ticks < 20:
+            await asyncio.sleep(0.01)
+            ticks += 1
+        # The writer holds one batch and the queue one more; the rest wait
+        assert not producer.done()
+        release.set()
+        await producer
+        return ticks
+    
+    assert asyncio.run(produce()) == 20
+    writer.close()
+    assert saved_bets() == 4
+
+
+def test_failed_writes_are_retried(monkeypatch):
+    save = Database.save_value_bets
+    calls = []
+    
+    def flaky_save(self, bets):
+        calls.append(len(bets))
+        if len(calls) == 1:
+            raise RuntimeError("database is locked")
+        return save(self, bets)
+    
+    monkeypatch.setattr(Database, "save_value_bets", flaky_save)
+    writer = BackgroundWriter(flush_seconds=0, retry_seconds=0.01)
+    asyncio.run(writer.put_value_bets([bet("e1"), bet("e2")]))
+    writer.close()
+    assert calls == [2, 2]
+    assert saved_bets() == 2
+    assert writer.written == {"value_bets": 2, "snapshots": 0, "errors": 1, "dropped": 0}
+
+
+def test_writer_uses_its_own_connection(monkeypatch):
+    connections = []
+    save = Database.save_value_bets
+    
+    def record_connection(self, bets):
+        connections.append(self.conn)
+        return save(self, bets)
+    
+    monkeypatch.setattr(Database, "save_value_bets", record_connection)
+    writer = BackgroundWriter(flush_seconds=0)
+    asyncio.run(writer.put_value_bets([bet("e1")]))
+    writer.close()
+    assert len(connections) == 1 and connections[0] is not get_db().conn
+
+
+def test_dead_writer_raises_instead_of_blocking(monkeypatch):
+    release = threading.Event()
+    
+    def broken_connect(self):
+        release.wait()
+        raise RuntimeError("unable to open database file")
+    
+    monkeypatch.setattr(BackgroundWriter, "_connect", broken_connect)
+    writer = BackgroundWriter(queue_size=1, flush_seconds=0)
+    
+    async def produce():
+        await writer.put_value_bets([bet("e1")])
+        release.set()
+        writer._thread.join()
+        await writer.put_value_bets([bet("e2")])
+    
+    with pytest.raises(RuntimeError, match="Background writer stopped"):
+        asyncio.run(produce())
+    writer.close()
+    assert isinstance(writer.error, RuntimeError)
+    assert writer.written["dropped"] == 1
+    assert saved_bets() == 0